@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AnimalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'animal'
+
+    def ready(self):
+        from animal import signals  # noqa: F401
+        from animal.search import ensure_search_index
+
+        post_migrate.connect(ensure_search_index, sender=self)
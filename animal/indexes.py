@@ -0,0 +1,32 @@
+from django.contrib.postgres.indexes import OpClass
+from django.db import models
+from django.db.models.functions import (
+    Cast,
+    Collate,
+    Upper,
+)
+
+
+class CaseInsensitivePrefixIndex(models.Index):
+    """
+    The index of the case insensitive prefix search (istartswith) of the field.
+    SQLite uses for LIKE 'x%' only the index with NOCASE collation, PostgreSQL runs
+    UPPER(field::text) LIKE UPPER('x%') and needs the index of the same expression with text_pattern_ops.
+    """
+
+    def __init__(self, field_name: str, *, name: str):
+        self.field_name = field_name
+        super().__init__(Collate(field_name, "NOCASE"), name=name)
+
+    def deconstruct(self):
+        path, _, kwargs = super().deconstruct()
+        return path, (self.field_name,), {"name": kwargs["name"]}
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor == "postgresql":
+            index = models.Index(
+                OpClass(Upper(Cast(self.field_name, output_field=models.TextField())), name="text_pattern_ops"),
+                name=self.name,
+            )
+            return index.create_sql(model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
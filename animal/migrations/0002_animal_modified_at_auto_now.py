@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:54
+
+import animal.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mark', '0002_alter_mark_modified_at'),
+        ('category', '0002_alter_category_modified_at'),
+        ('image', '0001_initial'),
+        ('animal', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='animal',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=animal.models.set_null_and_touch, to='category.category'),
+        ),
+        migrations.AlterField(
+            model_name='animal',
+            name='image',
+            field=models.ForeignKey(null=True, on_delete=animal.models.set_null_and_touch, to='image.image'),
+        ),
+        migrations.AlterField(
+            model_name='animal',
+            name='mark',
+            field=models.ForeignKey(null=True, on_delete=animal.models.set_null_and_touch, to='mark.mark'),
+        ),
+        migrations.AlterField(
+            model_name='animal',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
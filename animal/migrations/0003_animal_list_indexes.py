@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animal', '0002_animal_modified_at_auto_now'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['status', 'created_at'], name='animal_status_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['category', 'status'], name='animal_category_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['mark', 'status'], name='animal_mark_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['created_at'], name='animal_created_at_idx'),
+        ),
+    ]
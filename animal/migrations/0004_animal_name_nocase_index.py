@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:56
+
+from django.db import migrations
+import animal.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animal', '0003_animal_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            # The same index as Collate('name', 'NOCASE') on SQLite, UPPER(name::text) text_pattern_ops on PostgreSQL
+            index=animal.indexes.CaseInsensitivePrefixIndex('name', name='animal_name_nocase_idx'),
+        ),
+    ]
@@ -2,11 +2,30 @@ from django.db import models
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
+from animal.indexes import CaseInsensitivePrefixIndex
 from category.models import Category
 from image.models import Image
 from mark.models import Mark
 
 
+def set_null_and_touch(collector, field, sub_objs, using):
+    """
+    SET_NULL which also updates modified_at of the animals, so the animals which lost
+    the deleted relation are picked up by the incremental sync
+    """
+    # The lazy sub_objs is the QuerySet filtered by the relation, so modified_at has to be updated before
+    # the relation is set to NULL. The updates run in the order their (field, value) were added, so all relations
+    # share one timestamp and its UPDATE stays the first one.
+    if not hasattr(collector, "touched_at"):
+        collector.touched_at = timezone.now()
+    collector.add_field_update(Animal._meta.get_field("modified_at"), collector.touched_at, sub_objs)
+    collector.add_field_update(field, None, sub_objs)
+
+
+# The animals aren't fetched, they are updated by one UPDATE like SET_NULL
+set_null_and_touch.lazy_sub_objs = True
+
+
 class Animal(models.Model):
 
     STATUS_CHOICES = [
@@ -16,14 +35,24 @@ class Animal(models.Model):
     ]
 
     created_at = models.DateTimeField(default=timezone.now, editable=False)
-    modified_at = models.DateTimeField(default=timezone.now)
+    modified_at = models.DateTimeField(auto_now=True, db_index=True)
     animal_id = models.PositiveIntegerField(unique=True)
     name = models.CharField(max_length=32)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES)
     # Relationships
-    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
-    mark = models.ForeignKey(Mark, on_delete=models.SET_NULL, null=True)
-    image = models.ForeignKey(Image, on_delete=models.SET_NULL, null=True)
+    category = models.ForeignKey(Category, on_delete=set_null_and_touch, null=True)
+    mark = models.ForeignKey(Mark, on_delete=set_null_and_touch, null=True)
+    image = models.ForeignKey(Image, on_delete=set_null_and_touch, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="animal_status_created_at_idx"),
+            models.Index(fields=["category", "status"], name="animal_category_status_idx"),
+            models.Index(fields=["mark", "status"], name="animal_mark_status_idx"),
+            models.Index(fields=["created_at"], name="animal_created_at_idx"),
+            # The case insensitive prefix search (LIKE 'x%') can use only the index with the same collation
+            CaseInsensitivePrefixIndex("name", name="animal_name_nocase_idx"),
+        ]
 
     def __str__(self):
         return f"{self.animal_id} - {self.name}"
@@ -1,13 +1,251 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import (
+    QuerySet,
+    Value,
+)
+from django.utils import timezone
+
 from animal.models import Animal
+from animal.search import (
+    search_animal_ids,
+    trigram_index,
+)
+from category.models import Category
+from category.queries import category_cache
+from mark.models import Mark
+from mark.queries import mark_cache
+from pet_shop.conditional import bump_table_version
+from pet_shop.routers import read_replica
+
+# Columns read by AnimalSerializer and its nested serializers, the relations are joined
+# in the same query instead of being fetched per animal.
+ANIMAL_RELATED_FIELDS = ["category", "mark", "image"]
+ANIMAL_SERIALIZED_FIELDS = [
+    "id",
+    "created_at",
+    "modified_at",
+    "animal_id",
+    "name",
+    "status",
+    "category__id",
+    "category__name",
+    "mark__id",
+    "mark__name",
+    "image__id",
+    "image__path",
+    "image__renditions",
+]
+
+
+def get_animals_with_relations() -> QuerySet[Animal]:
+    return Animal.objects.select_related(*ANIMAL_RELATED_FIELDS).only(*ANIMAL_SERIALIZED_FIELDS)
 
 
+@read_replica
+def filter_animals(
+        _status: str | None = None,
+        _category_id: int | None = None,
+        _mark_id: int | None = None,
+        _has_image: bool | None = None,
+        _created_after: datetime | None = None,
+        _created_before: datetime | None = None,
+        _name_prefix: str | None = None,
+) -> QuerySet[Animal]:
+    animals = get_animals_with_relations()
+    if _status:
+        animals = animals.filter(status=_status)
+    if _category_id:
+        animals = animals.filter(category_id=_category_id)
+    if _mark_id:
+        animals = animals.filter(mark_id=_mark_id)
+    if _has_image is not None:
+        animals = animals.filter(image__isnull=not _has_image)
+    if _created_after:
+        animals = animals.filter(created_at__gte=_created_after)
+    if _created_before:
+        animals = animals.filter(created_at__lt=_created_before)
+    if _name_prefix:
+        animals = animals.filter(name__istartswith=_name_prefix)
+    return animals
+
+
+def search_animals(_term: str, _limit: int) -> list[Animal]:
+    ids = search_animal_ids(term=_term, limit=_limit)
+    animals = get_animals_with_relations().in_bulk(ids)
+    return [animals[_id] for _id in ids if _id in animals]
+
+
+@read_replica
 def get_animal_by_id(_id: int) -> Animal | None:
     return Animal.objects.filter(id=_id).first()
 
 
+@read_replica
+def get_animals_by_ids(_ids: set[int]) -> dict[int, Animal]:
+    return Animal.objects.select_related("image").in_bulk(_ids)
+
+
+@read_replica
+def get_animal_with_relations_by_id(_id: int) -> Animal | None:
+    return get_animals_with_relations().filter(id=_id).first()
+
+
+async def aget_animal_with_relations_by_id(_id: int) -> Animal | None:
+    return await get_animals_with_relations().filter(id=_id).afirst()
+
+
+@read_replica
+def get_existing_relations(_category_id: int, _mark_id: int, _id: int | None = None) -> set[str]:
+    """
+    Check the category, the mark and the animal (by ID - record of the animal), the category and the mark
+    are looked up in their caches first and the rest is checked with one query
+    :return: set[str] - the existing ones of "category", "mark" and "animal"
+    """
+    cached = set()
+    if category_cache.peek(key=_category_id) is not None:
+        cached.add("category")
+    if mark_cache.peek(key=_mark_id) is not None:
+        cached.add("mark")
+    relations = _get_relations(
+        _category_id=None if "category" in cached else _category_id,
+        _mark_id=None if "mark" in cached else _mark_id,
+        _id=_id,
+    )
+    if relations is None:
+        return cached
+    return cached | {relation for relation, in relations}
+
+
+def _get_relations(_category_id: int | None, _mark_id: int | None, _id: int | None = None) -> QuerySet | None:
+    relations = []
+    if _category_id is not None:
+        relations.append(
+            Category.objects.filter(id=_category_id).annotate(relation=Value("category")).values_list("relation"))
+    if _mark_id is not None:
+        relations.append(Mark.objects.filter(id=_mark_id).annotate(relation=Value("mark")).values_list("relation"))
+    if _id is not None:
+        relations.append(Animal.objects.filter(id=_id).annotate(relation=Value("animal")).values_list("relation"))
+    if not relations:
+        return None
+    return relations[0].union(*relations[1:])
+
+
+def create_animal(_animal_id: int, _name: str, _status: str, _category_id: int, _mark_id: int) -> Animal:
+    """
+    Create the animal with one INSERT, the duplicate animal_id is refused by the unique constraint
+    :return: Animal
+    :raise IntegrityError: if the animal_id exists or the category/mark is deleted in the meantime
+    """
+    with transaction.atomic():
+        return Animal.objects.create(
+            animal_id=_animal_id,
+            name=_name,
+            status=_status,
+            category_id=_category_id,
+            mark_id=_mark_id,
+        )
+
+
+def get_animal_for_update(_id: int) -> Animal | None:
+    """
+    Lock the row of the animal until the end of the transaction, the concurrent writes of the animal wait
+    """
+    return Animal.objects.select_for_update(of=("self",)).select_related("image").filter(id=_id).first()
+
+
+def get_animals_for_update(_ids: set[int]) -> dict[int, Animal]:
+    """
+    Lock the rows of the animals until the end of the transaction, the concurrent image jobs wait
+    """
+    return Animal.objects.select_for_update(of=("self",)).select_related("image").in_bulk(_ids)
+
+
+def set_animal_image(_id: int, _image_id: int) -> bool:
+    """
+    Link the animal to the image with one UPDATE of the image column only, the other columns
+    of the animal could be edited in the meantime
+    :return: bool - False if the animal doesn't exist
+    """
+    updated = Animal.objects.filter(id=_id).update(image_id=_image_id, modified_at=timezone.now())
+    if updated:
+        bump_table_version(Animal)
+    return bool(updated)
+
+
+def update_animal(_id: int, _animal_id: int, _name: str, _status: str, _category_id: int, _mark_id: int) -> bool:
+    """
+    Update the animal with one UPDATE statement, the duplicate animal_id is refused by the unique constraint
+    :return: bool - False if the animal doesn't exist
+    :raise IntegrityError: if the animal_id exists or the category/mark is deleted in the meantime
+    """
+    with transaction.atomic():
+        updated = Animal.objects.filter(id=_id).update(
+            animal_id=_animal_id,
+            name=_name,
+            status=_status,
+            category_id=_category_id,
+            mark_id=_mark_id,
+            modified_at=timezone.now(),
+        )
+    if updated:
+        # The update skips the signals of the model
+        bump_table_version(Animal)
+        trigram_index.add(_id=_id, name=_name)
+    return bool(updated)
+
+
+async def aget_existing_relations(_category_id: int, _mark_id: int, _id: int | None = None) -> set[str]:
+    return {
+        relation async for relation, in _get_relations(_category_id=_category_id, _mark_id=_mark_id, _id=_id)
+    }
+
+
+async def acreate_animal(_animal_id: int, _name: str, _status: str, _category_id: int, _mark_id: int) -> Animal:
+    """
+    Create the animal with one INSERT, it runs in the autocommit mode (the async ORM has no atomic block),
+    so the refused INSERT doesn't break the connection
+    :return: Animal
+    :raise IntegrityError: if the animal_id exists or the category/mark is deleted in the meantime
+    """
+    return await Animal.objects.acreate(
+        animal_id=_animal_id,
+        name=_name,
+        status=_status,
+        category_id=_category_id,
+        mark_id=_mark_id,
+    )
+
+
+# The changes are read from the primary database, the next sync starts at synced_at
+# and the rows missing on the lagging replica would be skipped
+def get_animals_modified_since(_modified_since: datetime) -> QuerySet[Animal]:
+    return get_animals_with_relations().filter(modified_at__gte=_modified_since).order_by("modified_at", "id")
+
+
+@read_replica
 def get_all_animals() -> list[Animal] | None:
-    return Animal.objects.all()
+    return get_animals_with_relations()
+
+
+@read_replica
+def get_existing_animal_ids(_animal_ids: set[int]) -> set[int]:
+    return set(Animal.objects.filter(animal_id__in=_animal_ids).values_list("animal_id", flat=True))
 
 
-def get_animal_by_animal_id(_animal_id: int) -> Animal | None:
-    return Animal.objects.filter(animal_id=_animal_id).first()
+def update_animals_status(_status: str, _ids: list[int] | None = None, _from_status: str | None = None) -> int:
+    """
+    Move the animals to the status with one UPDATE statement,
+    the animals which already have the status are not touched
+    :return: int - the number of updated animals
+    """
+    animals = Animal.objects.exclude(status=_status)
+    if _ids:
+        animals = animals.filter(id__in=_ids)
+    if _from_status:
+        animals = animals.filter(status=_from_status)
+    updated = animals.update(status=_status, modified_at=timezone.now())
+    if updated:
+        bump_table_version(Animal)
+    return updated
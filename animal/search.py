@@ -0,0 +1,273 @@
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from django.db import (
+    DatabaseError,
+    connection,
+    connections,
+)
+
+from animal.models import Animal
+
+logger = logging.getLogger(__name__)
+
+# Word index with prefix indexes of 2 and 3 characters for the prefix search
+FTS_TABLE = "animal_animal_fts"
+# Trigram index for the fuzzy search
+TRIGRAM_TABLE = "animal_animal_trigram"
+
+# Minimal trigram similarity of the fuzzy match
+FUZZY_THRESHOLD = 0.3
+# The index returns the best limit * SEARCH_CANDIDATES candidates of all matches by bm25, without the ordering
+# LIMIT would keep the first matches by rowid, the candidates are reranked by the similarity.
+# ORDER BY bm25() LIMIT keeps only the best candidates in the sorter (ORDER BY rank sorts all matches),
+# the search term has at least 2 characters (AnimalSearchSerializer), so the prefix index is used.
+SEARCH_CANDIDATES = 10
+# The search tables of the database aliases, they are checked once per process
+_search_tables: dict[str, bool] = {}
+
+# Both tables use animal_animal as external content, so only the index is stored and the triggers
+# keep it in sync with every insert, update and delete (also bulk_create and update()).
+SEARCH_INDEX_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+    USING fts5(name, content='animal_animal', content_rowid='id', prefix='2 3')
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE}
+    USING fts5(name, content='animal_animal', content_rowid='id', tokenize='trigram')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS animal_animal_search_insert AFTER INSERT ON animal_animal BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+        INSERT INTO {TRIGRAM_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS animal_animal_search_delete AFTER DELETE ON animal_animal BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS animal_animal_search_update AFTER UPDATE OF name ON animal_animal BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+        INSERT INTO {TRIGRAM_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+]
+SEARCH_TRIGGERS = [
+    "animal_animal_search_insert",
+    "animal_animal_search_delete",
+    "animal_animal_search_update",
+]
+
+
+def get_words(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def get_trigrams(text: str) -> set[str]:
+    trigrams = set()
+    for word in get_words(text=text):
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def get_similarity(term: str, name: str) -> float:
+    """
+    Jaccard similarity of the trigrams of both texts
+    :return: float
+    """
+    term_trigrams = get_trigrams(text=term)
+    name_trigrams = get_trigrams(text=name)
+    if not term_trigrams or not name_trigrams:
+        return 0.0
+    return len(term_trigrams & name_trigrams) / len(term_trigrams | name_trigrams)
+
+
+def is_prefix_match(term: str, name: str) -> bool:
+    name_words = get_words(text=name)
+    return all(any(name_word.startswith(word) for name_word in name_words) for word in get_words(text=term))
+
+
+def _has_search_tables() -> bool:
+    if connection.vendor != "sqlite":
+        return False
+    if connection.alias not in _search_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s, %s)",
+                [FTS_TABLE, TRIGRAM_TABLE] + SEARCH_TRIGGERS,
+            )
+            _search_tables[connection.alias] = len(cursor.fetchall()) == 2 + len(SEARCH_TRIGGERS)
+    return _search_tables[connection.alias]
+
+
+def ensure_search_index(using: str = "default", **kwargs) -> bool:
+    """
+    Create the FTS5 tables and the triggers if they are missing, it runs after every migrate
+    because the table rebuild of SQLite migrations drops the triggers of the table
+    :return: bool - whether the FTS5 index is available
+    """
+    _connection = connections[using]
+    if _connection.vendor != "sqlite":
+        return False
+    _search_tables.pop(using, None)
+    try:
+        with _connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                SEARCH_TRIGGERS,
+            )
+            if cursor.fetchone()[0] == len(SEARCH_TRIGGERS):
+                return True
+            for sql in SEARCH_INDEX_SQL:
+                cursor.execute(sql)
+            # Index the animals created while the triggers didn't exist
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}) VALUES ('rebuild')")
+    except DatabaseError as ex:
+        logger.warning(f"The FTS5 search index cannot be created, the in-process index is used! ex:{ex}")
+        return False
+    return True
+
+
+def _quote(word: str) -> str:
+    return '"' + word.replace('"', '""') + '"'
+
+
+def _ranked_matches_sql(table: str) -> str:
+    """
+    The best matches by bm25 of all matches of the table
+    :return: str
+    """
+    return f"SELECT rowid, name FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}) LIMIT %s"
+
+
+def _search_fts(term: str, limit: int) -> list[int]:
+    words = get_words(text=term)
+    if not words:
+        return []
+    candidates = limit * SEARCH_CANDIDATES
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _ranked_matches_sql(table=FTS_TABLE),
+            [" ".join(f"{_quote(word=word)}*" for word in words), candidates],
+        )
+        ids = _rank_prefix(term=term, candidates=cursor.fetchall(), limit=limit)
+        if len(ids) >= limit:
+            return ids
+
+        # The trigram tokenizer matches substrings of at least 3 characters
+        trigrams = {trigram.strip() for trigram in get_trigrams(text=term)}
+        trigrams = [trigram for trigram in trigrams if len(trigram) == 3]
+        if not trigrams:
+            return ids
+        cursor.execute(
+            _ranked_matches_sql(table=TRIGRAM_TABLE),
+            [" OR ".join(_quote(word=trigram) for trigram in trigrams), candidates],
+        )
+        fuzzy_candidates = cursor.fetchall()
+    return ids + _rank_fuzzy(term=term, candidates=fuzzy_candidates, exclude=set(ids), limit=limit - len(ids))
+
+
+def _rank_prefix(term: str, candidates: list[tuple[int, str]], limit: int) -> list[int]:
+    """
+    The closest names are first, e.g. Max before Maximilian for "max"
+    :return: list[int]
+    """
+    similarities = sorted(
+        (-get_similarity(term=term, name=name), _id)
+        for _id, name in candidates
+        if is_prefix_match(term=term, name=name)
+    )
+    return [_id for _, _id in similarities[:limit]]
+
+
+def _rank_fuzzy(term: str, candidates: list[tuple[int, str]], exclude: set[int], limit: int) -> list[int]:
+    similarities = [
+        (get_similarity(term=term, name=name), _id)
+        for _id, name in candidates
+        if _id not in exclude
+    ]
+    similarities = [(-similarity, _id) for similarity, _id in similarities if similarity >= FUZZY_THRESHOLD]
+    return [_id for _, _id in sorted(similarities)[:limit]]
+
+
+class TrigramIndex:
+    """
+    In-process trigram index of the animal names, it is used when the database has no FTS5.
+    It is loaded on the first search and kept in sync by the signals of Animal.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._names: dict[int, str] = {}
+        self._trigrams: dict[str, set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            if self.loaded:
+                return
+            for _id, name in Animal.objects.values_list("id", "name").iterator(chunk_size=10000):
+                self._add(_id=_id, name=name)
+            self.loaded = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._names.clear()
+            self._trigrams.clear()
+            self.loaded = False
+
+    def _add(self, _id: int, name: str) -> None:
+        self._remove(_id=_id)
+        self._names[_id] = name
+        for trigram in get_trigrams(text=name):
+            self._trigrams[trigram].add(_id)
+
+    def _remove(self, _id: int) -> None:
+        name = self._names.pop(_id, None)
+        if name is None:
+            return
+        for trigram in get_trigrams(text=name):
+            self._trigrams[trigram].discard(_id)
+
+    def add(self, _id: int, name: str) -> None:
+        with self._lock:
+            if self.loaded:
+                self._add(_id=_id, name=name)
+
+    def remove(self, _id: int) -> None:
+        with self._lock:
+            if self.loaded:
+                self._remove(_id=_id)
+
+    def search(self, term: str, limit: int) -> list[int]:
+        self.load()
+        with self._lock:
+            candidates = set()
+            for trigram in get_trigrams(text=term):
+                candidates |= self._trigrams.get(trigram, set())
+            candidates = [(_id, self._names[_id]) for _id in candidates]
+        ids = _rank_prefix(term=term, candidates=candidates, limit=limit)
+        return ids + _rank_fuzzy(term=term, candidates=candidates, exclude=set(ids), limit=limit - len(ids))
+
+
+trigram_index = TrigramIndex()
+
+
+def search_animal_ids(term: str, limit: int) -> list[int]:
+    """
+    Search the animals by the name, the prefix matches are first and the fuzzy (similar) matches follow
+    :return: list[int] - IDs of the animals ordered by the rank
+    """
+    if _has_search_tables():
+        return _search_fts(term=term, limit=limit)
+    return trigram_index.search(term=term, limit=limit)
@@ -1,14 +1,20 @@
 from django.core.validators import MinValueValidator
 from rest_framework import serializers
 from rest_framework.fields import (
+    BooleanField,
     CharField,
+    ChoiceField,
+    DateTimeField,
     IntegerField,
+    ListField,
 )
 
 from animal.models import Animal
-from animal.queries import get_animal_by_animal_id
+from pet_shop.settings import MAX_BULK_SIZE
+from sync.serializers import ChangesSerializer
 from category.models import Category
 from image.models import Image
+from image.serializers import ImageRenditionSerializer
 from mark.models import Mark
 
 
@@ -33,12 +39,14 @@ class AnimalMarkSerializer(serializers.HyperlinkedModelSerializer):
 
 
 class AnimalImageSerializer(serializers.HyperlinkedModelSerializer):
+    renditions = ImageRenditionSerializer(many=True, help_text="The smaller copies of the image from the smallest")
 
     class Meta:
         model = Image
         fields = [
             "id",
             "path",
+            "renditions",
         ]
 
 
@@ -62,6 +70,48 @@ class AnimalSerializer(serializers.HyperlinkedModelSerializer):
         ]
 
 
+class AnimalChangesSerializer(ChangesSerializer):
+
+    changed = AnimalSerializer(many=True)
+
+
+class AnimalFilterSerializer(serializers.Serializer):
+
+    ORDERING_CHOICES = [
+        "id",
+        "-id",
+        "created_at",
+        "-created_at",
+        "modified_at",
+        "-modified_at",
+    ]
+
+    status: ChoiceField = serializers.ChoiceField(
+        choices=Animal.STATUS_CHOICES, required=False, help_text="Only the animals with the status")
+    category_id: IntegerField = serializers.IntegerField(
+        validators=[MinValueValidator(1)], required=False, help_text="Only the animals of the category")
+    mark_id: IntegerField = serializers.IntegerField(
+        validators=[MinValueValidator(1)], required=False, help_text="Only the animals of the mark")
+    has_image: BooleanField = serializers.BooleanField(
+        required=False, allow_null=True, default=None, help_text="Only the animals with/without the image")
+    created_after: DateTimeField = serializers.DateTimeField(
+        required=False, help_text="Only the animals created at or after the datetime")
+    created_before: DateTimeField = serializers.DateTimeField(
+        required=False, help_text="Only the animals created before the datetime")
+    search: CharField = serializers.CharField(
+        max_length=32, required=False, help_text="Only the animals which name starts with it (case insensitive)")
+    ordering: ChoiceField = serializers.ChoiceField(
+        choices=ORDERING_CHOICES, required=False, default="id", help_text="The order of the animals, - is descending")
+
+
+class AnimalSearchSerializer(serializers.Serializer):
+
+    q: CharField = serializers.CharField(
+        min_length=2, max_length=32, help_text="The name or the beginning of the name, similar names are found too")
+    limit: IntegerField = serializers.IntegerField(
+        min_value=1, max_value=100, required=False, default=20, help_text="The maximal number of the animals")
+
+
 class NewAnimalSerializer(serializers.Serializer):
 
     animal_id: IntegerField = serializers.IntegerField(
@@ -73,13 +123,45 @@ class NewAnimalSerializer(serializers.Serializer):
     mark_id: IntegerField = serializers.IntegerField(
         validators=[MinValueValidator(1)], help_text="ID of some specific mark")
 
-    def duplicate_animal_id(self, _animal_id: int, _id: int = None) -> bool:
-        animal = get_animal_by_animal_id(_animal_id=_animal_id)
-        if animal and _id and animal.id == _id:
-            return False
-        if not _id and not animal:
-            return False
-        return True
+
+class BulkAnimalErrorSerializer(serializers.Serializer):
+
+    index: IntegerField = serializers.IntegerField(help_text="The position of the animal in the request body")
+    error: CharField = serializers.CharField(help_text="The reason why the animal is skipped")
+
+
+class BulkNewAnimalResultSerializer(serializers.Serializer):
+
+    created: IntegerField = serializers.IntegerField(help_text="The number of created animals")
+    errors = BulkAnimalErrorSerializer(many=True)
+
+
+class BulkAnimalStatusSerializer(serializers.Serializer):
+
+    status: ChoiceField = serializers.ChoiceField(
+        choices=Animal.STATUS_CHOICES, help_text="The new status of the animals, could be set/approved/delivered")
+    ids: ListField = serializers.ListField(
+        child=serializers.IntegerField(validators=[MinValueValidator(1)]),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_BULK_SIZE,
+        help_text="IDs of the animals which should be moved to the new status")
+    from_status: ChoiceField = serializers.ChoiceField(
+        choices=Animal.STATUS_CHOICES,
+        required=False,
+        help_text="Only the animals with this status are moved to the new status, e.g. approved")
+
+    def validate(self, attrs):
+        if not attrs.get("ids") and not attrs.get("from_status"):
+            raise serializers.ValidationError("The ids or from_status is required!")
+        return attrs
+
+
+class BulkAnimalStatusResultSerializer(serializers.Serializer):
+
+    updated: IntegerField = serializers.IntegerField(help_text="The number of animals moved to the new status")
+    skipped: IntegerField = serializers.IntegerField(
+        help_text="The number of requested IDs which don't exist, already have the status or don't match from_status")
 
 
 class EditAnimalSerializer(NewAnimalSerializer):
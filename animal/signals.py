@@ -0,0 +1,24 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from animal.models import Animal
+from animal.search import trigram_index
+from pet_shop.conditional import bump_table_version
+
+
+@receiver([post_save, post_delete], sender=Animal)
+def bump_animal_version(sender, **kwargs):
+    bump_table_version(Animal)
+
+
+@receiver(post_save, sender=Animal)
+def index_animal_name(sender, instance: Animal, **kwargs):
+    trigram_index.add(_id=instance.id, name=instance.name)
+
+
+@receiver(post_delete, sender=Animal)
+def remove_animal_name(sender, instance: Animal, **kwargs):
+    trigram_index.remove(_id=instance.id)
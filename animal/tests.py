@@ -1,16 +1,38 @@
 import json
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
 
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from animal.models import Animal
-from animal.queries import get_animal_by_id
+from animal.queries import (
+    filter_animals,
+    get_all_animals,
+    get_animal_by_id,
+    get_animals_modified_since,
+    search_animals,
+)
+from animal.search import TrigramIndex
+from animal.serializers import AnimalSerializer
 from category.models import Category
+from category.queries import get_category_by_id
 from image.models import Image
 from mark.models import Mark
+from mark.queries import get_mark_by_id
 from pet_shop.error_messages import *
 from pet_shop.ok_messages import *
+from pet_shop.settings import SYNC_TOMBSTONE_RETENTION
+from pet_shop.streaming import iter_json_array
 from pet_shop.tests import (
     BaseTestCase,
+    async_client,
+    call_async,
     client,
 )
 
@@ -64,6 +86,569 @@ class TestAnimalListApiView(BaseTestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(content, ANIMALS_NOT_FOUND)
 
+    def test_get_constant_number_of_queries(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        number_of_queries = []
+        for animal_id in range(1, 11):
+            image = Image(
+                name=f"test_image_{animal_id}",
+                path=f"test_image_{animal_id}.jpg",
+                format="jpg",
+            )
+            image.save()
+
+            animal = Animal(
+                name="test_animal_name",
+                animal_id=animal_id,
+                status="set",
+                category=category,
+                mark=mark,
+                image=image,
+            )
+            animal.save()
+
+            if animal_id in (1, 10):
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(path=reverse("all_animals"))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(json.loads(response.content)), animal_id)
+                number_of_queries.append(len(queries))
+
+        self.assertEqual(number_of_queries[0], number_of_queries[1])
+        self.assertEqual(number_of_queries[0], 1)
+
+    def test_get_pass_cursor_pagination(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        for animal_id in range(1, 4):
+            animal = Animal(
+                name="test_animal_name",
+                animal_id=animal_id,
+                status="set",
+                category=category,
+                mark=mark,
+            )
+            animal.save()
+
+        response = client.get(path=reverse("all_animals"), data={"page_size": 2})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content], [1, 2])
+        self.assertIn('rel="next"', response.headers.get("Link"))
+        self.assertNotIn('rel="prev"', response.headers.get("Link"))
+
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = client.get(path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content], [3])
+        self.assertNotIn('rel="next"', response.headers.get("Link"))
+        self.assertIn('rel="prev"', response.headers.get("Link"))
+
+    def test_get_pass_filters(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        category_2 = Category(name="test_category_2")
+        category_2.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        image = Image(
+            name="test_image",
+            path="test_image.jpg",
+            format="jpg",
+        )
+        image.save()
+
+        now = timezone.now()
+        for animal_id, name, status, animal_category, animal_image, days in [
+            (1, "Max", "set", category, image, 3),
+            (2, "Maya", "approved", category, None, 2),
+            (3, "Bella", "approved", category_2, None, 1),
+            (4, "max junior", "delivered", category, None, 0),
+        ]:
+            animal = Animal(
+                name=name,
+                animal_id=animal_id,
+                status=status,
+                category=animal_category,
+                mark=mark,
+                image=animal_image,
+                created_at=now - timedelta(days=days),
+            )
+            animal.save()
+
+        for query_parameters, animal_ids in [
+            ({"status": "approved"}, [2, 3]),
+            ({"category_id": category.id, "status": "approved"}, [2]),
+            ({"mark_id": mark.id}, [1, 2, 3, 4]),
+            ({"has_image": "true"}, [1]),
+            ({"has_image": "false"}, [2, 3, 4]),
+            ({"created_after": (now - timedelta(days=2, hours=1)).isoformat()}, [2, 3, 4]),
+            ({"created_before": (now - timedelta(hours=1)).isoformat()}, [1, 2, 3]),
+            ({"search": "max"}, [1, 4]),
+            ({"search": "ma", "ordering": "-created_at"}, [4, 2, 1]),
+            ({"ordering": "-id", "page_size": 2}, [4, 3]),
+        ]:
+            response = client.get(path=reverse("all_animals"), data=query_parameters)
+            content = json.loads(response.content)
+
+            self.assertEqual(response.status_code, 200, msg=query_parameters)
+            self.assertEqual([animal.get("animal_id") for animal in content], animal_ids, msg=query_parameters)
+
+        response = client.get(path=reverse("all_animals"), data={"status": "set", "category_id": category_2.id})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(content, ANIMALS_NOT_FOUND)
+
+    def test_get_pass_ordering_cursor_pagination(self):
+
+        now = timezone.now()
+        for animal_id in range(1, 4):
+            animal = Animal(
+                name="test_animal_name",
+                animal_id=animal_id,
+                status="set",
+                created_at=now - timedelta(days=animal_id),
+            )
+            animal.save()
+
+        response = client.get(path=reverse("all_animals"), data={"ordering": "created_at", "page_size": 2})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content], [3, 2])
+
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = client.get(path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content], [1])
+
+    def test_get_wrong_data_invalid_filter(self):
+
+        for query_parameters in [
+            {"status": "invalid_status"},
+            {"category_id": "first"},
+            {"created_after": "yesterday"},
+            {"ordering": "name"},
+        ]:
+            response = client.get(path=reverse("all_animals"), data=query_parameters)
+            content = json.loads(response.content)
+
+            self.assertEqual(response.status_code, 400, msg=query_parameters)
+            self.assertEqual(content, WRONG_DATA)
+
+
+@skipUnless(connection.vendor == "sqlite", "The query plans are checked on SQLite")
+class TestAnimalQueryPlans(BaseTestCase):
+
+    def assertUsesIndex(self, queryset, sorted_by_index: bool = True):
+        query_plan = queryset.explain()
+        for line in query_plan.splitlines():
+            if "animal_animal" in line:
+                self.assertNotRegex(line, r"SCAN (TABLE )?animal_animal$", msg=query_plan)
+        if sorted_by_index:
+            self.assertNotIn("USE TEMP B-TREE", query_plan, msg=query_plan)
+
+    def test_list_cursor_page(self):
+
+        self.assertUsesIndex(get_all_animals().filter(id__gt=100).order_by("id")[:10])
+
+    def test_filter_by_status_order_by_created_at(self):
+
+        self.assertUsesIndex(get_all_animals().filter(status="approved").order_by("created_at"))
+
+    def test_filter_by_category_and_status(self):
+
+        self.assertUsesIndex(get_all_animals().filter(category_id=1, status="approved").order_by("id"))
+
+    def test_filter_by_mark_and_status(self):
+
+        self.assertUsesIndex(get_all_animals().filter(mark_id=1, status="approved").order_by("id"))
+
+    def test_filter_by_created_at_range(self):
+
+        now = timezone.now()
+        self.assertUsesIndex(
+            get_all_animals().filter(created_at__gte=now - timedelta(days=7), created_at__lt=now).order_by("created_at")
+        )
+
+    def test_modified_since(self):
+
+        self.assertUsesIndex(get_animals_modified_since(_modified_since=timezone.now()))
+
+    def test_filter_by_status_and_image_order_by_created_at_descending(self):
+
+        self.assertUsesIndex(filter_animals(_status="set", _has_image=True).order_by("-created_at", "-id"))
+
+    def test_search_by_name_prefix(self):
+
+        # Only the found animals are sorted
+        self.assertUsesIndex(filter_animals(_name_prefix="max").order_by("id"), sorted_by_index=False)
+
+
+class TestAnimalSearchApiView(BaseTestCase):
+
+    def create_animals(self) -> list[Animal]:
+        animals = []
+        for animal_id, name in enumerate(["Max", "Maya", "Bella", "Max Junior", "Rocky"], start=1):
+            animal = Animal(
+                name=name,
+                animal_id=animal_id,
+                status="set",
+            )
+            animal.save()
+            animals.append(animal)
+        return animals
+
+    def test_get_pass_prefix(self):
+
+        self.create_animals()
+
+        response = client.get(path=reverse("search_animals"), data={"q": "ma"})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(animal.get("name") for animal in content), ["Max", "Max Junior", "Maya"])
+
+        response = client.get(path=reverse("search_animals"), data={"q": "max jun"})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content[0].get("name"), "Max Junior")
+        self.assertNotIn("Maya", [animal.get("name") for animal in content])
+
+    def test_get_pass_fuzzy(self):
+
+        self.create_animals()
+
+        response = client.get(path=reverse("search_animals"), data={"q": "bela"})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("name") for animal in content], ["Bella"])
+
+    def test_get_pass_limit(self):
+
+        self.create_animals()
+
+        response = client.get(path=reverse("search_animals"), data={"q": "max", "limit": 1})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content), 1)
+
+    @skipUnless(connection.vendor == "sqlite", "The candidates are ranked by FTS5 on SQLite")
+    def test_get_pass_best_candidates(self):
+
+        for animal_id, name in enumerate(["Maxwell Junior Senior", "Maximus the Great", "Max"], start=1):
+            Animal(name=name, animal_id=animal_id, status="set").save()
+
+        # Only one candidate, the best match by bm25 isn't the first one by rowid
+        with patch("animal.search.SEARCH_CANDIDATES", 1):
+            response = client.get(path=reverse("search_animals"), data={"q": "max", "limit": 1})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("name") for animal in content], ["Max"])
+
+    def test_get_pass_index_in_sync(self):
+
+        animals = self.create_animals()
+
+        response = client.patch(
+            path=reverse("edit_animal", kwargs={'_id': animals[4].id}),
+            data=json.dumps({
+                "name": "Charlie",
+                "animal_id": animals[4].animal_id,
+                "status": "set",
+                "category_id": Category.objects.create(name="test_category").id,
+                "mark_id": Mark.objects.create(name="test_mark").id,
+            }),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.get(path=reverse("search_animals"), data={"q": "charlie"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0].get("id"), animals[4].id)
+
+        response = client.get(path=reverse("search_animals"), data={"q": "rocky"})
+
+        self.assertEqual(response.status_code, 404)
+
+        animals[2].delete()
+        response = client.get(path=reverse("search_animals"), data={"q": "bella"})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_not_found(self):
+
+        self.create_animals()
+
+        response = client.get(path=reverse("search_animals"), data={"q": "zzz"})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(content, ANIMALS_NOT_FOUND)
+
+    def test_get_wrong_data_without_query(self):
+
+        response = client.get(path=reverse("search_animals"))
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
+    def test_get_wrong_data_short_query(self):
+
+        response = client.get(path=reverse("search_animals"), data={"q": "m"})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
+    def test_trigram_index(self):
+
+        animals = self.create_animals()
+        trigram_index = TrigramIndex()
+
+        self.assertEqual(
+            sorted(trigram_index.search(term="ma", limit=10)),
+            [animals[0].id, animals[1].id, animals[3].id],
+        )
+        self.assertEqual(trigram_index.search(term="max", limit=1), [animals[0].id])
+        self.assertEqual(trigram_index.search(term="bela", limit=10), [animals[2].id])
+
+        trigram_index.add(_id=100, name="Belle")
+        trigram_index.remove(_id=animals[2].id)
+
+        self.assertEqual(trigram_index.search(term="bella", limit=10), [100])
+
+
+class TestAnimalExportApiView(BaseTestCase):
+
+    def test_get_pass(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        for animal_id in range(1, 4):
+            animal = Animal(
+                name="test_animal_name",
+                animal_id=animal_id,
+                status="set",
+                category=category,
+                mark=mark,
+            )
+            animal.save()
+
+        response = client.get(path=reverse("export_animals"))
+        content = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(type(content), list)
+        self.assertEqual([animal.get("animal_id") for animal in content], [1, 2, 3])
+        self.assertEqual(content[0].get("category", {}).get("id"), category.id)
+        self.assertEqual(content[0].get("mark", {}).get("id"), mark.id)
+
+    def test_get_pass_in_chunks(self):
+
+        for animal_id in range(1, 6):
+            animal = Animal(
+                name="test_animal_name",
+                animal_id=animal_id,
+                status="set",
+            )
+            animal.save()
+
+        chunks = list(iter_json_array(queryset=get_all_animals(), serializer_class=AnimalSerializer, chunk_size=2))
+        content = json.loads(b"".join(chunks))
+
+        # The opening bracket, three chunks (2 + 2 + 1 animals) and the closing bracket
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual([animal.get("animal_id") for animal in content], [1, 2, 3, 4, 5])
+
+    def test_get_pass_empty(self):
+
+        response = client.get(path=reverse("export_animals"))
+        content = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, [])
+
+
+class TestAnimalChangesApiView(BaseTestCase):
+
+    @patch("sync.helper.SYNC_SAFETY_MARGIN", 0)
+    def test_get_pass(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        animals = []
+        for animal_id in range(1, 4):
+            animal = Animal(
+                name="test_animal_name",
+                animal_id=animal_id,
+                status="set",
+                category=category,
+                mark=mark,
+            )
+            animal.save()
+            animals.append(animal)
+
+        modified_since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = client.get(path=reverse("changes_animals"), data={"modified_since": modified_since})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content.get("changed")], [1, 2, 3])
+        self.assertEqual(content.get("deleted"), [])
+
+        synced_at = content.get("synced_at")
+        created_at = animals[0].modified_at
+
+        response = client.patch(
+            path=reverse("edit_animal", kwargs={'_id': animals[0].id}),
+            data=json.dumps({
+                "name": "test_animal_name_updated",
+                "animal_id": animals[0].animal_id,
+                "status": "approved",
+                "category_id": category.id,
+                "mark_id": mark.id,
+            }),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assertGreater(get_animal_by_id(_id=animals[0].id).modified_at, created_at)
+
+        response = client.delete(path=reverse("delete_animal", kwargs={'_id': animals[1].id}))
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.get(path=reverse("changes_animals"), data={"modified_since": synced_at})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("name") for animal in content.get("changed")], ["test_animal_name_updated"])
+        self.assertEqual(content.get("deleted"), [animals[1].id])
+
+        synced_at = content.get("synced_at")
+        category.delete()
+
+        # The animals lost the deleted category, so they are changed too
+        response = client.get(path=reverse("changes_animals"), data={"modified_since": synced_at})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(animal.get("animal_id") for animal in content.get("changed")), [1, 3])
+        self.assertEqual([animal.get("category") for animal in content.get("changed")], [None, None])
+
+    def test_get_changed_in_safety_margin(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        animal = Animal(name="test_animal_name", animal_id=1, status="set", category=category, mark=mark)
+        animal.save()
+
+        modified_since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = client.get(path=reverse("changes_animals"), data={"modified_since": modified_since})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(parse_datetime(content.get("synced_at")), animal.modified_at)
+
+        # The animal committed late could be missed by the previous sync, so it is returned again
+        response = client.get(path=reverse("changes_animals"), data={"modified_since": content.get("synced_at")})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content.get("changed")], [1])
+
+    def test_get_pass_pagination(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        for animal_id in range(1, 5):
+            Animal(name="test_animal_name", animal_id=animal_id, status="set", category=category, mark=mark).save()
+        Animal.objects.get(animal_id=4).delete()
+
+        modified_since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = client.get(
+            path=reverse("changes_animals"), data={"modified_since": modified_since, "page_size": 2})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content.get("changed")], [1, 2])
+        self.assertEqual(len(content.get("deleted")), 1)
+        self.assertIn('rel="next"', response.headers.get("Link"))
+
+        # The animal edited after the first page is moved to the end
+        Animal.objects.filter(animal_id=1).update(modified_at=timezone.now())
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = client.get(path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal.get("animal_id") for animal in content.get("changed")], [3, 1])
+        self.assertEqual(content.get("deleted"), [])
+        self.assertNotIn('rel="next"', response.headers.get("Link"))
+
+    def test_get_full_sync_required(self):
+
+        modified_since = timezone.now() - timedelta(seconds=SYNC_TOMBSTONE_RETENTION + 1)
+        response = client.get(path=reverse("changes_animals"), data={"modified_since": modified_since.isoformat()})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(content, FULL_SYNC_REQUIRED)
+
+    def test_get_wrong_data_invalid_modified_since(self):
+
+        response = client.get(path=reverse("changes_animals"), data={"modified_since": "yesterday"})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
 
 class TestNewAnimalApiView(BaseTestCase):
 
@@ -98,6 +683,65 @@ class TestNewAnimalApiView(BaseTestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(content, ANIMAL_SUCCESSFULLY_CREATED)
 
+    # The coalesced writes run on the connection of the writer thread
+    @override_settings(WRITE_COALESCING=False)
+    def test_post_two_statements(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                path=reverse("new_animal"),
+                data=json.dumps({
+                    "name": "test_animal_name",
+                    "animal_id": 5720385832,
+                    "status": "set",
+                    "category_id": category.id,
+                    "mark_id": mark.id,
+                }),
+                content_type='application/json',
+            )
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+
+        self.assertEqual(response.status_code, 201)
+        # The check of the category and the mark and the INSERT, the duplicate animal_id is refused by the database
+        self.assertEqual([statement for statement in statements if statement not in ("BEGIN", "COMMIT")],
+                         ["SELECT", "INSERT"])
+
+    @override_settings(WRITE_COALESCING=False)
+    def test_post_cached_relations_insert_only(self):
+
+        category = Category(name="test_category")
+        category.save()
+        get_category_by_id(_id=category.id)
+
+        mark = Mark(name="test_mark")
+        mark.save()
+        get_mark_by_id(_id=mark.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                path=reverse("new_animal"),
+                data=json.dumps({
+                    "name": "test_animal_name",
+                    "animal_id": 5720385832,
+                    "status": "set",
+                    "category_id": category.id,
+                    "mark_id": mark.id,
+                }),
+                content_type='application/json',
+            )
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+
+        self.assertEqual(response.status_code, 201)
+        # The category and the mark are found in the lookup caches, only the INSERT is left
+        self.assertEqual([statement for statement in statements if statement not in ("BEGIN", "COMMIT")],
+                         ["INSERT"])
+
     def test_post_wrong_data_body_validation(self):
 
         image = Image(
@@ -250,6 +894,112 @@ class TestNewAnimalApiView(BaseTestCase):
         self.assertEqual(content, WRONG_DATA)
 
 
+class TestBulkNewAnimalApiView(BaseTestCase):
+
+    def test_post_pass(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        animal = Animal(
+            name="test_animal_name",
+            animal_id=1,
+            status="set",
+            category=category,
+            mark=mark,
+        )
+        animal.save()
+
+        response = client.post(
+            path=reverse("bulk_new_animals"),
+            data=json.dumps([
+                {"name": "test_animal_2", "animal_id": 2, "status": "set", "category_id": category.id, "mark_id": mark.id},
+                {"name": "test_animal_3", "animal_id": 3, "status": "approved", "category_id": category.id, "mark_id": mark.id},
+                {"name": "test_animal_4", "animal_id": 4, "status": "set"},
+                {"name": "test_animal_5", "animal_id": 5, "status": "set", "category_id": 100, "mark_id": mark.id},
+                {"name": "test_animal_6", "animal_id": 6, "status": "set", "category_id": category.id, "mark_id": 100},
+                {"name": "test_animal_7", "animal_id": 7, "status": "invalid", "category_id": category.id, "mark_id": mark.id},
+                {"name": "test_animal_1", "animal_id": 1, "status": "set", "category_id": category.id, "mark_id": mark.id},
+                {"name": "test_animal_2", "animal_id": 2, "status": "set", "category_id": category.id, "mark_id": mark.id},
+            ]),
+            content_type='application/json',
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(content.get("created"), 2)
+        self.assertEqual(content.get("errors"), [
+            {"index": 2, "error": WRONG_DATA},
+            {"index": 3, "error": CATEGORY_NOT_FOUND},
+            {"index": 4, "error": MARK_NOT_FOUND},
+            {"index": 5, "error": INVALID_STATUS},
+            {"index": 6, "error": DUPLICATE_ANIMAL_ID},
+            {"index": 7, "error": DUPLICATE_ANIMAL_ID},
+        ])
+        self.assertEqual(sorted(Animal.objects.values_list("animal_id", flat=True)), [1, 2, 3])
+
+    def test_post_constant_number_of_queries(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        number_of_queries = []
+        for first_animal_id, number_of_animals in [(1, 1), (100, 50)]:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(
+                    path=reverse("bulk_new_animals"),
+                    data=json.dumps([
+                        {
+                            "name": "test_animal_name",
+                            "animal_id": animal_id,
+                            "status": "set",
+                            "category_id": category.id,
+                            "mark_id": mark.id,
+                        }
+                        for animal_id in range(first_animal_id, first_animal_id + number_of_animals)
+                    ]),
+                    content_type='application/json',
+                )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(json.loads(response.content).get("created"), number_of_animals)
+            number_of_queries.append(len(queries))
+
+        self.assertEqual(number_of_queries[0], number_of_queries[1])
+
+    def test_post_wrong_data_not_list(self):
+
+        response = client.post(
+            path=reverse("bulk_new_animals"),
+            data=json.dumps({"name": "test_animal_name", "animal_id": 1, "status": "set"}),
+            content_type='application/json',
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
+    def test_post_wrong_data_no_valid_animal(self):
+
+        response = client.post(
+            path=reverse("bulk_new_animals"),
+            data=json.dumps([
+                {"name": "test_animal_name", "animal_id": 1, "status": "set", "category_id": 1, "mark_id": 1},
+            ]),
+            content_type='application/json',
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+        self.assertEqual(Animal.objects.count(), 0)
+
+
 class TestEditAnimalApiView(BaseTestCase):
 
     def test_patch_pass(self):
@@ -295,6 +1045,47 @@ class TestEditAnimalApiView(BaseTestCase):
         self.assertEqual(updated_animal.category, category)
         self.assertEqual(updated_animal.mark, mark)
 
+    # The coalesced writes run on the connection of the writer thread
+    @override_settings(WRITE_COALESCING=False)
+    def test_patch_two_statements(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        animal = Animal(
+            name="test_animal_name",
+            animal_id=5720385832,
+            status="set",
+            category=category,
+            mark=mark,
+        )
+        animal.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(
+                path=reverse("edit_animal", kwargs={'_id': animal.id}),
+                data=json.dumps({
+                    "name": "new_name",
+                    "animal_id": animal.animal_id,
+                    "status": "approved",
+                    "category_id": category.id,
+                    "mark_id": mark.id,
+                }),
+                content_type='application/json',
+            )
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+
+        self.assertEqual(response.status_code, 204)
+        # The check of the animal, the category and the mark and the UPDATE
+        self.assertEqual([statement for statement in statements if statement not in ("BEGIN", "COMMIT")],
+                         ["SELECT", "UPDATE"])
+        animal.refresh_from_db()
+        self.assertEqual((animal.name, animal.status), ("new_name", "approved"))
+        self.assertEqual(search_animals(_term="new_name", _limit=10), [animal])
+
     def test_patch_not_found(self):
 
         category = Category(name="test_category")
@@ -513,6 +1304,94 @@ class TestEditAnimalApiView(BaseTestCase):
         self.assertEqual(content, WRONG_DATA)
 
 
+class TestBulkAnimalStatusApiView(BaseTestCase):
+
+    def create_animals(self) -> list[Animal]:
+        animals = []
+        for animal_id, status in enumerate(["approved", "approved", "delivered", "set"], start=1):
+            animal = Animal(
+                name="test_animal_name",
+                animal_id=animal_id,
+                status=status,
+            )
+            animal.save()
+            animals.append(animal)
+        return animals
+
+    def test_patch_pass_by_ids(self):
+
+        animals = self.create_animals()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(
+                path=reverse("bulk_animals_status"),
+                data=json.dumps({
+                    "status": "delivered",
+                    "ids": [animal.id for animal in animals[:3]] + [100],
+                }),
+                content_type='application/json',
+            )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, {"updated": 2, "skipped": 2})
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            list(Animal.objects.order_by("id").values_list("status", flat=True)),
+            ["delivered", "delivered", "delivered", "set"],
+        )
+
+    def test_patch_pass_by_from_status(self):
+
+        self.create_animals()
+
+        response = client.patch(
+            path=reverse("bulk_animals_status"),
+            data=json.dumps({
+                "status": "delivered",
+                "from_status": "approved",
+            }),
+            content_type='application/json',
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, {"updated": 2, "skipped": 0})
+        self.assertEqual(
+            list(Animal.objects.order_by("id").values_list("status", flat=True)),
+            ["delivered", "delivered", "delivered", "set"],
+        )
+
+    def test_patch_wrong_data_invalid_status(self):
+
+        animals = self.create_animals()
+
+        response = client.patch(
+            path=reverse("bulk_animals_status"),
+            data=json.dumps({
+                "status": "invalid_status",
+                "ids": [animal.id for animal in animals],
+            }),
+            content_type='application/json',
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
+    def test_patch_wrong_data_without_ids_and_from_status(self):
+
+        response = client.patch(
+            path=reverse("bulk_animals_status"),
+            data=json.dumps({"status": "delivered"}),
+            content_type='application/json',
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
+
 class TestDeleteAnimalApiView(BaseTestCase):
 
     def test_delete_pass(self):
@@ -600,3 +1479,207 @@ class TestAnimalApiView(BaseTestCase):
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(content, ANIMAL_NOT_FOUND)
+
+    def test_get_not_modified(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        animal = Animal(
+            name="test_animal_name",
+            animal_id=5720385832,
+            status="set",
+            category=category,
+            mark=mark,
+        )
+        animal.save()
+
+        response = client.get(path=reverse("get_animal", kwargs={'_id': animal.id}))
+        etag = response.headers.get("ETag")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(etag)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path=reverse("get_animal", kwargs={'_id': animal.id}), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        # The animal shows the name of the category, so changing the category changes the animal too
+        category.name = "test_category_updated"
+        category.save()
+
+        response = client.get(path=reverse("get_animal", kwargs={'_id': animal.id}), HTTP_IF_NONE_MATCH=etag)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content.get("category", {}).get("name"), category.name)
+
+        etag = response.headers.get("ETag")
+        response = client.patch(
+            path=reverse("bulk_animals_status"),
+            data=json.dumps({"status": "approved", "ids": [animal.id]}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        response = client.get(path=reverse("get_animal", kwargs={'_id': animal.id}), HTTP_IF_NONE_MATCH=etag)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content.get("status"), "approved")
+
+
+class TestAsyncAnimalViews(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.category = Category(name="test_category")
+        self.category.save()
+        self.mark = Mark(name="test_mark")
+        self.mark.save()
+
+    def test_get_list_pass(self):
+
+        for number in range(1, 4):
+            animal = Animal(
+                name=f"test_animal_{number}",
+                animal_id=number,
+                status="approved" if number == 2 else "set",
+                category=self.category,
+                mark=self.mark,
+            )
+            animal.save()
+
+        response = call_async(
+            async_client.get,
+            path=reverse("all_animals_async"), data={"status": "set", "page_size": 1})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.get("animal_id") for item in content], [1])
+        self.assertEqual(content[0].get("category", {}).get("name"), self.category.name)
+
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = call_async(async_client.get, path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual([item.get("animal_id") for item in content], [3])
+        self.assertNotIn('rel="next"', response.headers.get("Link"))
+
+        response = call_async(async_client.get, path=reverse("all_animals_async"), data={"status": "invalid"})
+
+        self.assertEqual(response.status_code, 400)
+
+        response = call_async(async_client.get, path=reverse("all_animals_async"), data={"status": "delivered"})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), ANIMALS_NOT_FOUND)
+
+    def test_get_pass(self):
+
+        animal = Animal(
+            name="test_animal_name",
+            animal_id=5720385832,
+            status="set",
+            category=self.category,
+            mark=self.mark,
+        )
+        animal.save()
+
+        response = call_async(async_client.get, path=reverse("get_animal_async", kwargs={"_id": animal.id}))
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        response = client.get(path=reverse("get_animal", kwargs={"_id": animal.id}))
+        self.assertEqual(content, json.loads(response.content))
+
+        response = call_async(async_client.get, path=reverse("get_animal_async", kwargs={"_id": 100}))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), ANIMAL_NOT_FOUND)
+
+    def test_post_pass(self):
+
+        response = call_async(
+            async_client.post,
+            path=reverse("new_animal_async"),
+            data=json.dumps({
+                "name": "test_animal_name",
+                "animal_id": 5720385832,
+                "status": "set",
+                "category_id": self.category.id,
+                "mark_id": self.mark.id,
+            }),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), ANIMAL_SUCCESSFULLY_CREATED)
+        animal = Animal.objects.get()
+        self.assertEqual(animal.animal_id, 5720385832)
+        self.assertEqual(animal.category_id, self.category.id)
+        self.assertEqual(animal.mark_id, self.mark.id)
+
+    def test_post_wrong_data(self):
+
+        animal = Animal(
+            name="test_animal_name",
+            animal_id=1,
+            status="set",
+            category=self.category,
+            mark=self.mark,
+        )
+        animal.save()
+
+        data = {
+            "name": "test_animal_name",
+            "animal_id": 2,
+            "status": "set",
+            "category_id": self.category.id,
+            "mark_id": self.mark.id,
+        }
+        for wrong_data in (
+            {"category_id": 100},
+            {"mark_id": 100},
+            {"status": "invalid"},
+            {"animal_id": 1},
+            {"name": None},
+        ):
+            with self.subTest(data=wrong_data):
+                response = call_async(
+                    async_client.post,
+                    path=reverse("new_animal_async"),
+                    data=json.dumps({**data, **wrong_data}),
+                    content_type="application/json",
+                )
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content), WRONG_DATA)
+        self.assertEqual(Animal.objects.count(), 1)
+
+    def test_post_wrong_data_category_deleted_after_check(self):
+
+        with patch("animal.views.aget_existing_relations", return_value={"category", "mark"}):
+            response = call_async(
+                async_client.post,
+                path=reverse("new_animal_async"),
+                data=json.dumps({
+                    "name": "test_animal_name",
+                    "animal_id": 1,
+                    "status": "set",
+                    "category_id": 100,
+                    "mark_id": self.mark.id,
+                }),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), WRONG_DATA)
+        self.assertEqual(Animal.objects.count(), 0)
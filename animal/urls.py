@@ -1,17 +1,33 @@
 from django.urls import path
 
 from animal.views import (
+    AsyncAnimalListView,
+    AsyncAnimalView,
+    AsyncNewAnimalView,
     AnimalApiView,
     AnimalListApiView,
+    AnimalExportApiView,
+    AnimalSearchApiView,
+    AnimalChangesApiView,
     NewAnimalApiView,
+    BulkNewAnimalApiView,
     EditAnimalApiView,
+    BulkAnimalStatusApiView,
     DeleteAnimalApiView,
 )
 
 urlpatterns = [
     path('', AnimalListApiView.as_view(), name="all_animals"),
+    path('export', AnimalExportApiView.as_view(), name="export_animals"),
+    path('search', AnimalSearchApiView.as_view(), name="search_animals"),
+    path('changes', AnimalChangesApiView.as_view(), name="changes_animals"),
     path('<int:_id>', AnimalApiView.as_view(), name="get_animal"),
     path('new', NewAnimalApiView.as_view(), name="new_animal"),
+    path('bulk', BulkNewAnimalApiView.as_view(), name="bulk_new_animals"),
     path('<int:_id>/edit', EditAnimalApiView.as_view(), name="edit_animal"),
+    path('status', BulkAnimalStatusApiView.as_view(), name="bulk_animals_status"),
     path('<int:_id>/delete', DeleteAnimalApiView.as_view(), name="delete_animal"),
+    path('async', AsyncAnimalListView.as_view(), name="all_animals_async"),
+    path('async/new', AsyncNewAnimalView.as_view(), name="new_animal_async"),
+    path('async/<int:_id>', AsyncAnimalView.as_view(), name="get_animal_async"),
 ]
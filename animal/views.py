@@ -1,23 +1,69 @@
 import logging
 
+from django.db import (
+    IntegrityError,
+    transaction,
+)
 from drf_spectacular.utils import extend_schema
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from animal.models import Animal
 from animal.queries import (
+    acreate_animal,
+    aget_animal_with_relations_by_id,
+    aget_existing_relations,
+    create_animal,
+    filter_animals,
     get_all_animals,
     get_animal_by_id,
+    get_animal_with_relations_by_id,
+    get_animals_modified_since,
+    get_existing_animal_ids,
+    get_existing_relations,
+    search_animals,
+    update_animal,
+    update_animals_status,
 )
+from animal.search import trigram_index
 from animal.serializers import (
+    AnimalChangesSerializer,
+    AnimalFilterSerializer,
+    AnimalSearchSerializer,
     AnimalSerializer,
+    BulkAnimalStatusResultSerializer,
+    BulkAnimalStatusSerializer,
+    BulkNewAnimalResultSerializer,
     NewAnimalSerializer,
     EditAnimalSerializer,
 )
-from category.queries import get_category_by_id
-from mark.queries import get_mark_by_id
+from category.models import Category
+from category.queries import get_existing_category_ids
+from image.helper import remove_image
+from image.models import Image
+from mark.models import Mark
+from mark.queries import get_existing_mark_ids
+from pet_shop.async_views import AsyncApiView
+from pet_shop.coalescing import run_write
+from pet_shop.conditional import (
+    bump_table_version,
+    conditional_get,
+)
 from pet_shop.error_messages import *
 from pet_shop.ok_messages import *
+from pet_shop.pagination import (
+    CURSOR_PAGINATION_PARAMETERS,
+    IdCursorPagination,
+)
+from pet_shop.settings import MAX_BULK_SIZE
+from pet_shop.streaming import streaming_json_response
+from sync.helper import (
+    MODIFIED_SINCE_PARAMETER,
+    get_synced_at,
+    is_full_sync_required,
+    parse_modified_since,
+)
+from sync.queries import get_deleted_ids_since
 
 logger = logging.getLogger(__name__)
 
@@ -28,16 +74,70 @@ class AnimalListApiView(APIView):
         methods=["get"],
         description=f"""
             - An endpoint to retrieve all existing animals.
+            - The animals can be filtered by status, category, mark, image and the time of creation, 
+            searched by the beginning of the name and sorted by ID or the time of creation/modification.
+            - The animals are paginated, the cursors of the next/previous page are in the Link header.
+            - If one of the query parameters is wrong it will return an error 400 - {WRONG_DATA}
             - If there is no animals it will return an error 404 - {ANIMALS_NOT_FOUND}
             """,
+        parameters=[AnimalFilterSerializer] + CURSOR_PAGINATION_PARAMETERS,
         responses={
             200: AnimalSerializer(many=True),
+            400: {"description": WRONG_DATA},
             404: {"description": ANIMALS_NOT_FOUND},
         },
     )
     def get(self, request, *args, **kwargs):
 
-        animals = get_all_animals()
+        filters = AnimalFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            logger.error("The query parameters are wrong!")
+            return Response(WRONG_DATA, status=400)
+
+        animals = filter_animals(
+            _status=filters.validated_data.get("status"),
+            _category_id=filters.validated_data.get("category_id"),
+            _mark_id=filters.validated_data.get("mark_id"),
+            _has_image=filters.validated_data.get("has_image"),
+            _created_after=filters.validated_data.get("created_after"),
+            _created_before=filters.validated_data.get("created_before"),
+            _name_prefix=filters.validated_data.get("search"),
+        )
+        paginator = IdCursorPagination(ordering=filters.validated_data.get("ordering"))
+        animals = paginator.paginate_queryset(animals, request, view=self)
+        if not animals:
+            return Response(ANIMALS_NOT_FOUND, status=404)
+        response = AnimalSerializer(instance=animals, many=True).data
+
+        return paginator.get_paginated_response(response)
+
+
+class AnimalSearchApiView(APIView):
+
+    @extend_schema(
+        methods=["get"],
+        description=f"""
+            - An endpoint to search the animals by the name.
+            - The animals which name starts with the searched words are first, the animals with similar name 
+            (e.g. with a typo) follow, both are ordered by the rank.
+            - If the query parameters are wrong it will return an error 400 - {WRONG_DATA}
+            - If there is no animals it will return an error 404 - {ANIMALS_NOT_FOUND}
+            """,
+        parameters=[AnimalSearchSerializer],
+        responses={
+            200: AnimalSerializer(many=True),
+            400: {"description": WRONG_DATA},
+            404: {"description": ANIMALS_NOT_FOUND},
+        },
+    )
+    def get(self, request, *args, **kwargs):
+
+        data = AnimalSearchSerializer(data=request.query_params)
+        if not data.is_valid():
+            logger.error("The query parameters are wrong!")
+            return Response(WRONG_DATA, status=400)
+
+        animals = search_animals(_term=data.validated_data.get("q"), _limit=data.validated_data.get("limit"))
         if not animals:
             return Response(ANIMALS_NOT_FOUND, status=404)
         response = AnimalSerializer(instance=animals, many=True).data
@@ -45,6 +145,72 @@ class AnimalListApiView(APIView):
         return Response(data=response, status=200)
 
 
+class AnimalExportApiView(APIView):
+
+    @extend_schema(
+        methods=["get"],
+        description="""
+            - An endpoint to export all existing animals at once.
+            - The response is streamed as a JSON array, the animals are serialized in chunks.
+            - If there is no animals it will return an empty list.
+            """,
+        responses={
+            200: AnimalSerializer(many=True),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+
+        return streaming_json_response(queryset=get_all_animals(), serializer_class=AnimalSerializer)
+
+
+class AnimalChangesApiView(APIView):
+
+    @extend_schema(
+        methods=["get"],
+        description=f"""
+            - An endpoint for incremental sync, it retrieves the animals created or edited since modified_since 
+            and IDs of the animals deleted since modified_since.
+            - The next sync should use synced_at of the response as modified_since. synced_at is earlier than 
+            the time of the request by the safety margin, so the animals changed shortly before the sync are 
+            returned by the next sync again, the client should update them by ID.
+            - The changed animals are paginated by the time of the modification, the cursor of the next page 
+            is in the Link header. The deleted IDs are returned with the first page only and the next sync 
+            should use synced_at of the first page.
+            - If modified_since is missing or it isn't valid datetime it will return an error 400 - {WRONG_DATA}
+            - The deletions are kept for SYNC_TOMBSTONE_RETENTION, if modified_since is older it will return 
+            an error 410 - {FULL_SYNC_REQUIRED}.
+            """,
+        parameters=[MODIFIED_SINCE_PARAMETER] + CURSOR_PAGINATION_PARAMETERS,
+        responses={
+            200: AnimalChangesSerializer(many=False),
+            400: {"description": WRONG_DATA},
+            410: {"description": FULL_SYNC_REQUIRED},
+        },
+    )
+    def get(self, request, *args, **kwargs):
+
+        modified_since = parse_modified_since(value=request.query_params.get("modified_since"))
+        if not modified_since:
+            logger.error(f"Invalid modified_since: {request.query_params.get("modified_since")}!")
+            return Response(WRONG_DATA, status=400)
+        if is_full_sync_required(modified_since=modified_since):
+            logger.error(f"The deletions since {modified_since} aren't kept!")
+            return Response(FULL_SYNC_REQUIRED, status=410)
+
+        synced_at = get_synced_at()
+        paginator = IdCursorPagination(ordering="modified_at")
+        changed = paginator.paginate_queryset(
+            get_animals_modified_since(_modified_since=modified_since), request, view=self)
+        # The next pages are read after synced_at of the first page, their deletions come with the next sync
+        deleted = [] if paginator.cursor else get_deleted_ids_since(_model=Animal, _deleted_since=modified_since)
+        response = AnimalChangesSerializer(
+            instance={"synced_at": synced_at, "changed": changed, "deleted": deleted},
+            many=False,
+        ).data
+
+        return paginator.get_paginated_response(response)
+
+
 class NewAnimalApiView(APIView):
 
     @extend_schema(
@@ -67,34 +233,118 @@ class NewAnimalApiView(APIView):
             logger.error("The data is wrong!")
             return Response(WRONG_DATA, status=400)
 
-        category = get_category_by_id(_id=data.validated_data.get("category_id"))
-        if not category:
-            logger.error(f"The category {data.validated_data.get("category_id")} doesn't exist!")
+        if not Animal(status=data.validated_data.get("status")).is_valid_status():
+            logger.error(f"Invalid status: {data.validated_data.get("status")}!")
             return Response(WRONG_DATA, status=400)
 
-        mark = get_mark_by_id(_id=data.validated_data.get("mark_id"))
-        if not mark:
+        relations = get_existing_relations(
+            _category_id=data.validated_data.get("category_id"),
+            _mark_id=data.validated_data.get("mark_id"),
+        )
+        if "category" not in relations:
+            logger.error(f"The category {data.validated_data.get("category_id")} doesn't exist!")
+            return Response(WRONG_DATA, status=400)
+        if "mark" not in relations:
             logger.error(f"The mark {data.validated_data.get("mark_id")} doesn't exist!")
             return Response(WRONG_DATA, status=400)
 
-        animal = Animal(
-            animal_id=data.validated_data.get("animal_id"),
-            name=data.validated_data.get("name"),
-            status=data.validated_data.get("status"),
-            category=category,
-            mark=mark,
-        )
-        if not animal.is_valid_status():
-            logger.error(f"Invalid status: {data.validated_data.get("status")}!")
-            return Response(WRONG_DATA, status=400)
-        if data.duplicate_animal_id(_animal_id=data.validated_data.get("animal_id")):
-            logger.error(f"Duplicate animal_id: {data.validated_data.get("animal_id")}!")
+        try:
+            run_write(lambda: create_animal(
+                _animal_id=data.validated_data.get("animal_id"),
+                _name=data.validated_data.get("name"),
+                _status=data.validated_data.get("status"),
+                _category_id=data.validated_data.get("category_id"),
+                _mark_id=data.validated_data.get("mark_id"),
+            ))
+        except IntegrityError as ex:
+            logger.error(f"Duplicate animal_id: {data.validated_data.get("animal_id")}! ex:{ex}")
             return Response(WRONG_DATA, status=400)
-        animal.save()
 
         return Response(ANIMAL_SUCCESSFULLY_CREATED, status=201)
 
 
+class BulkNewAnimalApiView(APIView):
+
+    @extend_schema(
+        methods=["post"],
+        description=f"""
+            - An endpoint to create many animals at once (at most {MAX_BULK_SIZE} per request).
+            - The body is a list of animals, every animal has the same fields as in the endpoint for new animal.
+            - The categories, marks and animal_ids of all animals are checked together and the valid animals 
+            are created in one transaction, the invalid animals are skipped and reported in errors by their index.
+            - If the body is not a list or none of the animals is valid it will return an error 400 - {WRONG_DATA}
+            """,
+        request=NewAnimalSerializer(many=True),
+        responses={
+            201: BulkNewAnimalResultSerializer(many=False),
+            400: {"description": WRONG_DATA},
+        },
+    )
+    def post(self, request, *args, **kwargs):
+
+        if not isinstance(request.data, list) or not request.data or len(request.data) > MAX_BULK_SIZE:
+            logger.error("The data is wrong!")
+            return Response(WRONG_DATA, status=400)
+
+        errors = []
+        valid_items = []
+        for index, item in enumerate(request.data):
+            data = NewAnimalSerializer(data=item)
+            if not data.is_valid():
+                errors.append({"index": index, "error": WRONG_DATA})
+                continue
+            valid_items.append((index, data.validated_data))
+
+        category_ids = get_existing_category_ids(_ids={item.get("category_id") for _, item in valid_items})
+        mark_ids = get_existing_mark_ids(_ids={item.get("mark_id") for _, item in valid_items})
+        animal_ids = get_existing_animal_ids(_animal_ids={item.get("animal_id") for _, item in valid_items})
+
+        animals = []
+        for index, item in valid_items:
+            animal = Animal(
+                animal_id=item.get("animal_id"),
+                name=item.get("name"),
+                status=item.get("status"),
+                category_id=item.get("category_id"),
+                mark_id=item.get("mark_id"),
+            )
+            if item.get("category_id") not in category_ids:
+                errors.append({"index": index, "error": CATEGORY_NOT_FOUND})
+            elif item.get("mark_id") not in mark_ids:
+                errors.append({"index": index, "error": MARK_NOT_FOUND})
+            elif not animal.is_valid_status():
+                errors.append({"index": index, "error": INVALID_STATUS})
+            elif animal.animal_id in animal_ids:
+                errors.append({"index": index, "error": DUPLICATE_ANIMAL_ID})
+            else:
+                # The animal_id is also taken for the rest of the batch
+                animal_ids.add(animal.animal_id)
+                animals.append(animal)
+
+        if not animals:
+            logger.error(f"None of {len(request.data)} animals is valid!")
+            return Response(WRONG_DATA, status=400)
+        try:
+            with transaction.atomic():
+                Animal.objects.bulk_create(animals)
+        except IntegrityError as ex:
+            logger.error(f"The animals cannot be created! ex:{ex}")
+            return Response(WRONG_DATA, status=400)
+        bump_table_version(Animal)
+        for animal in animals:
+            trigram_index.add(_id=animal.id, name=animal.name)
+
+        response = BulkNewAnimalResultSerializer(
+            instance={
+                "created": len(animals),
+                "errors": sorted(errors, key=lambda error: error.get("index")),
+            },
+            many=False,
+        ).data
+
+        return Response(data=response, status=201)
+
+
 class EditAnimalApiView(APIView):
 
     @extend_schema(
@@ -119,37 +369,84 @@ class EditAnimalApiView(APIView):
             logger.error("The data is wrong!")
             return Response(WRONG_DATA, status=400)
 
-        animal = get_animal_by_id(_id=_id)
-        if not animal:
+        relations = get_existing_relations(
+            _category_id=data.validated_data.get("category_id"),
+            _mark_id=data.validated_data.get("mark_id"),
+            _id=_id,
+        )
+        if "animal" not in relations:
             logger.error(f"The animal {_id} doesn't exist!")
             return Response(ANIMAL_NOT_FOUND, status=404)
-
-        category = get_category_by_id(_id=data.validated_data.get("category_id"))
-        if not category:
+        if "category" not in relations:
             logger.error(f"The category {data.validated_data.get("category_id")} doesn't exist!")
             return Response(WRONG_DATA, status=400)
-
-        mark = get_mark_by_id(_id=data.validated_data.get("mark_id"))
-        if not mark:
+        if "mark" not in relations:
             logger.error(f"The mark {data.validated_data.get("mark_id")} doesn't exist!")
             return Response(WRONG_DATA, status=400)
-
-        animal.animal_id = data.validated_data.get("animal_id")
-        animal.name = data.validated_data.get("name")
-        animal.status = data.validated_data.get("status")
-        animal.category = category
-        animal.mark = mark
-        if not animal.is_valid_status():
+        if not Animal(status=data.validated_data.get("status")).is_valid_status():
             logger.error(f"Invalid status: {data.validated_data.get("status")}!")
             return Response(WRONG_DATA, status=400)
-        if data.duplicate_animal_id(_animal_id=data.validated_data.get("animal_id"), _id=animal.id):
-            logger.error(f"Duplicate animal_id: {data.validated_data.get("animal_id")}!")
+
+        try:
+            updated = run_write(lambda: update_animal(
+                _id=_id,
+                _animal_id=data.validated_data.get("animal_id"),
+                _name=data.validated_data.get("name"),
+                _status=data.validated_data.get("status"),
+                _category_id=data.validated_data.get("category_id"),
+                _mark_id=data.validated_data.get("mark_id"),
+            ))
+        except IntegrityError as ex:
+            logger.error(f"Duplicate animal_id: {data.validated_data.get("animal_id")}! ex:{ex}")
             return Response(WRONG_DATA, status=400)
-        animal.save()
+        if not updated:
+            # The animal is deleted in the meantime
+            logger.error(f"The animal {_id} doesn't exist!")
+            return Response(ANIMAL_NOT_FOUND, status=404)
 
         return Response(ANIMAL_SUCCESSFULLY_EDITED, status=204)
 
 
+class BulkAnimalStatusApiView(APIView):
+
+    @extend_schema(
+        methods=["patch"],
+        description=f"""
+            - An endpoint to move many animals to a new status at once, e.g. from approved to delivered.
+            - The animals are chosen by the list of IDs (records of the animals), by from_status or by both.
+            - All animals are updated with one query, the animals which already have the status are skipped.
+            - If one of the body data is wrong it will return an error 400 - {WRONG_DATA}
+            """,
+        request=BulkAnimalStatusSerializer(many=False),
+        responses={
+            200: BulkAnimalStatusResultSerializer(many=False),
+            400: {"description": WRONG_DATA},
+        },
+    )
+    def patch(self, request, *args, **kwargs):
+
+        data = BulkAnimalStatusSerializer(data=request.data)
+        if not data.is_valid():
+            logger.error("The data is wrong!")
+            return Response(WRONG_DATA, status=400)
+
+        ids = set(data.validated_data.get("ids", []))
+        updated = update_animals_status(
+            _status=data.validated_data.get("status"),
+            _ids=list(ids),
+            _from_status=data.validated_data.get("from_status"),
+        )
+        response = BulkAnimalStatusResultSerializer(
+            instance={
+                "updated": updated,
+                "skipped": len(ids) - updated if ids else 0,
+            },
+            many=False,
+        ).data
+
+        return Response(data=response, status=200)
+
+
 class DeleteAnimalApiView(APIView):
 
     @extend_schema(
@@ -169,7 +466,12 @@ class DeleteAnimalApiView(APIView):
         if not animal:
             logger.error(f"The animal {_id} doesn't exist!")
             return Response(ANIMAL_NOT_FOUND, status=404)
-        animal.delete()
+        image = animal.image
+        with transaction.atomic():
+            animal.delete()
+            # The files of the image are removed with the last animal
+            if image:
+                remove_image(image=image)
 
         return Response(ANIMAL_SUCCESSFULLY_DELETED, status=204)
 
@@ -180,19 +482,112 @@ class AnimalApiView(APIView):
         methods=["get"],
         description=f"""
             - An endpoint to retrieve some specific animal (by ID - record of the animal).
+            - The response has ETag and Last-Modified headers, if the animal isn't changed since then 
+            the request with If-None-Match or If-Modified-Since header will return 304 - Not Modified.
             - If non existing animal is trying to retrieve it will return an error 404 - {ANIMAL_NOT_FOUND}.
             """,
         responses={
             200: AnimalSerializer(many=False),
+            304: {"description": NOT_MODIFIED},
             404: {"description": ANIMAL_NOT_FOUND},
         },
     )
+    @conditional_get(Animal, Category, Mark, Image)
     def get(self, request, _id, *args, **kwargs):
 
-        animal = get_animal_by_id(_id=_id)
+        animal = get_animal_with_relations_by_id(_id=_id)
         if not animal:
             logger.error(f"The animal {_id} doesn't exist!")
             return Response(ANIMAL_NOT_FOUND, status=404)
         response = AnimalSerializer(instance=animal, many=False).data
 
         return Response(data=response, status=200)
+
+
+class AsyncAnimalListView(AsyncApiView):
+    """
+    The async variant of AnimalListApiView for ASGI
+    """
+
+    async def get(self, request, *args, **kwargs):
+
+        query_request = self.get_query_request(request=request)
+        filters = AnimalFilterSerializer(data=query_request.query_params)
+        if not filters.is_valid():
+            logger.error("The query parameters are wrong!")
+            return self.response(WRONG_DATA, status=400)
+
+        animals = filter_animals(
+            _status=filters.validated_data.get("status"),
+            _category_id=filters.validated_data.get("category_id"),
+            _mark_id=filters.validated_data.get("mark_id"),
+            _has_image=filters.validated_data.get("has_image"),
+            _created_after=filters.validated_data.get("created_after"),
+            _created_before=filters.validated_data.get("created_before"),
+            _name_prefix=filters.validated_data.get("search"),
+        )
+        paginator = IdCursorPagination(ordering=filters.validated_data.get("ordering"))
+        animals = await paginator.apaginate_queryset(animals, query_request, view=self)
+        if not animals:
+            return self.response(ANIMALS_NOT_FOUND, status=404)
+        response = AnimalSerializer(instance=animals, many=True).data
+
+        return self.response(response, status=200, headers=paginator.get_paginated_headers())
+
+
+class AsyncAnimalView(AsyncApiView):
+    """
+    The async variant of AnimalApiView for ASGI, without the conditional GET
+    """
+
+    async def get(self, request, _id, *args, **kwargs):
+
+        animal = await aget_animal_with_relations_by_id(_id=_id)
+        if not animal:
+            logger.error(f"The animal {_id} doesn't exist!")
+            return self.response(ANIMAL_NOT_FOUND, status=404)
+        response = AnimalSerializer(instance=animal, many=False).data
+
+        return self.response(response, status=200)
+
+
+class AsyncNewAnimalView(AsyncApiView):
+    """
+    The async variant of NewAnimalApiView for ASGI, the body is JSON
+    """
+
+    async def post(self, request, *args, **kwargs):
+
+        data = NewAnimalSerializer(data=self.parse_json(request=request))
+        if not data.is_valid():
+            logger.error("The data is wrong!")
+            return self.response(WRONG_DATA, status=400)
+
+        if not Animal(status=data.validated_data.get("status")).is_valid_status():
+            logger.error(f"Invalid status: {data.validated_data.get("status")}!")
+            return self.response(WRONG_DATA, status=400)
+
+        relations = await aget_existing_relations(
+            _category_id=data.validated_data.get("category_id"),
+            _mark_id=data.validated_data.get("mark_id"),
+        )
+        if "category" not in relations:
+            logger.error(f"The category {data.validated_data.get("category_id")} doesn't exist!")
+            return self.response(WRONG_DATA, status=400)
+        if "mark" not in relations:
+            logger.error(f"The mark {data.validated_data.get("mark_id")} doesn't exist!")
+            return self.response(WRONG_DATA, status=400)
+
+        try:
+            await acreate_animal(
+                _animal_id=data.validated_data.get("animal_id"),
+                _name=data.validated_data.get("name"),
+                _status=data.validated_data.get("status"),
+                _category_id=data.validated_data.get("category_id"),
+                _mark_id=data.validated_data.get("mark_id"),
+            )
+        except IntegrityError as ex:
+            logger.error(f"Duplicate animal_id: {data.validated_data.get("animal_id")}! ex:{ex}")
+            return self.response(WRONG_DATA, status=400)
+
+        return self.response(ANIMAL_SUCCESSFULLY_CREATED, status=201)
@@ -1,13 +1,44 @@
+from datetime import datetime
+
 from category.models import Category
+from pet_shop.cache import ModelLookupCache
+from pet_shop.routers import read_replica
+
+category_cache = ModelLookupCache(model=Category)
 
 
+@read_replica
 def get_category_by_name(_name: str) -> Category | None:
     return Category.objects.filter(name=_name).first()
 
 
 def get_category_by_id(_id: int) -> Category | None:
-    return Category.objects.filter(id=_id).first()
+    return category_cache.get_by_id(_id=_id)
+
+
+async def aget_category_by_name(_name: str) -> Category | None:
+    return await Category.objects.filter(name=_name).afirst()
+
+
+async def aget_category_by_id(_id: int) -> Category | None:
+    return await Category.objects.filter(id=_id).afirst()
 
 
+async def acreate_category(_name: str) -> Category:
+    return await Category.objects.acreate(name=_name)
+
+
+@read_replica
+def get_existing_category_ids(_ids: set[int]) -> set[int]:
+    return set(Category.objects.filter(id__in=_ids).values_list("id", flat=True))
+
+
+@read_replica
 def get_all_categories() -> list[Category] | None:
     return Category.objects.all()
+
+
+# The changes are read from the primary database, the next sync starts at synced_at
+# and the rows missing on the lagging replica would be skipped
+def get_categories_modified_since(_modified_since: datetime) -> list[Category]:
+    return Category.objects.filter(modified_at__gte=_modified_since).order_by("modified_at", "id")
@@ -3,6 +3,7 @@ from rest_framework.fields import CharField
 
 from category.models import Category
 from category.queries import get_category_by_name
+from sync.serializers import ChangesSerializer
 
 
 class CategorySerializer(serializers.HyperlinkedModelSerializer):
@@ -17,6 +18,11 @@ class CategorySerializer(serializers.HyperlinkedModelSerializer):
         ]
 
 
+class CategoryChangesSerializer(ChangesSerializer):
+
+    changed = CategorySerializer(many=True)
+
+
 class NewCategorySerializer(serializers.Serializer):
 
     name: CharField = serializers.CharField(help_text="The name of the category")
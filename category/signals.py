@@ -0,0 +1,13 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from category.models import Category
+from pet_shop.conditional import bump_table_version
+
+
+@receiver([post_save, post_delete], sender=Category)
+def bump_category_version(sender, **kwargs):
+    bump_table_version(Category)
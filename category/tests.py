@@ -1,13 +1,25 @@
 import json
+from datetime import timedelta
+from unittest.mock import patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
+from animal.models import Animal
 from category.models import Category
-from category.queries import get_category_by_id
+from category.queries import (
+    category_cache,
+    get_category_by_id,
+)
 from pet_shop.error_messages import *
 from pet_shop.ok_messages import *
+from pet_shop.settings import SYNC_TOMBSTONE_RETENTION
 from pet_shop.tests import (
     BaseTestCase,
+    async_client,
+    call_async,
     client,
 )
 
@@ -36,6 +48,149 @@ class TestCategoryListApiView(BaseTestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(content, CATEGORIES_NOT_FOUND)
 
+    def test_get_pass_cursor_pagination(self):
+
+        for number in range(1, 4):
+            category = Category(name=f"test_category_{number}")
+            category.save()
+
+        response = client.get(path=reverse("all_categories"), data={"page_size": 2})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content), 2)
+        self.assertIn('rel="next"', response.headers.get("Link"))
+
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = client.get(path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content), 1)
+        self.assertEqual(content[0].get("name"), "test_category_3")
+
+    def test_get_not_modified(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        response = client.get(path=reverse("all_categories"))
+        etag = response.headers.get("ETag")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(etag)
+        self.assertIsNotNone(response.headers.get("Last-Modified"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path=reverse("all_categories"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path=reverse("all_categories"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(json.loads(response.content)[0].get("name"), category.name)
+
+        response = client.patch(
+            path=reverse("edit_category", kwargs={'_id': category.id}),
+            data=json.dumps({"name": "test_category_updated"}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.get(path=reverse("all_categories"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get("ETag"), etag)
+        self.assertEqual(json.loads(response.content)[0].get("name"), "test_category_updated")
+
+
+class TestCategoryExportApiView(BaseTestCase):
+
+    def test_get_pass(self):
+
+        for number in range(1, 4):
+            category = Category(name=f"test_category_{number}")
+            category.save()
+
+        response = client.get(path=reverse("export_categories"))
+        content = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(type(content), list)
+        self.assertEqual([category.get("name") for category in content], [f"test_category_{number}" for number in range(1, 4)])
+
+    def test_get_pass_empty(self):
+
+        response = client.get(path=reverse("export_categories"))
+        content = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, [])
+
+
+class TestCategoryChangesApiView(BaseTestCase):
+
+    @patch("sync.helper.SYNC_SAFETY_MARGIN", 0)
+    def test_get_pass(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        category_2 = Category(name="test_category_2")
+        category_2.save()
+
+        modified_since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = client.get(path=reverse("changes_categories"), data={"modified_since": modified_since})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content.get("changed")), 2)
+        self.assertEqual(content.get("deleted"), [])
+
+        synced_at = content.get("synced_at")
+
+        response = client.patch(
+            path=reverse("edit_category", kwargs={'_id': category.id}),
+            data=json.dumps({"name": "test_category_updated"}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.delete(path=reverse("delete_category", kwargs={'_id': category_2.id}))
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.get(path=reverse("changes_categories"), data={"modified_since": synced_at})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([category.get("name") for category in content.get("changed")], ["test_category_updated"])
+        self.assertEqual(content.get("deleted"), [category_2.id])
+
+    def test_get_full_sync_required(self):
+
+        modified_since = timezone.now() - timedelta(seconds=SYNC_TOMBSTONE_RETENTION + 1)
+        response = client.get(path=reverse("changes_categories"), data={"modified_since": modified_since.isoformat()})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(content, FULL_SYNC_REQUIRED)
+
+    def test_get_wrong_data_without_modified_since(self):
+
+        response = client.get(path=reverse("changes_categories"))
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
 
 class TestNewCategoryApiView(BaseTestCase):
 
@@ -170,6 +325,25 @@ class TestDeleteCategoryApiView(BaseTestCase):
 
         self.assertEqual(category, None)
 
+    def test_delete_pass_animals_not_fetched(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        for animal_id in range(1, 4):
+            Animal(name="test_animal_name", animal_id=animal_id, status="set", category=category).save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.delete(path=reverse("delete_category", kwargs={'_id': category.id}))
+
+        self.assertEqual(response.status_code, 204)
+        # The animals lose the category by one UPDATE without the SELECT of the animals
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and 'FROM "animal_animal"' in query["sql"]
+        ])
+        self.assertEqual(Animal.objects.filter(category__isnull=True).count(), 3)
+
     def test_delete_not_found(self):
 
         response = client.delete(path=reverse("delete_category", kwargs={'_id': 1}))
@@ -203,3 +377,151 @@ class TestCategoryApiView(BaseTestCase):
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(content, CATEGORY_NOT_FOUND)
+
+
+class TestCategoryCache(BaseTestCase):
+
+    def test_get_category_by_id_cached(self):
+
+        category = Category(name="test_category")
+        category.save()
+        category_cache.reset_stats()
+
+        with CaptureQueriesContext(connection) as queries:
+            first = get_category_by_id(_id=category.id)
+            second = get_category_by_id(_id=category.id)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(first, category)
+        self.assertEqual(second, category)
+        self.assertEqual(category_cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_get_category_by_id_invalidated_on_save_and_delete(self):
+
+        category = Category(name="test_category")
+        category.save()
+        get_category_by_id(_id=category.id)
+
+        response = client.patch(
+            path=reverse("edit_category", kwargs={'_id': category.id}),
+            data=json.dumps({"name": "test_category_updated"}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(get_category_by_id(_id=category.id).name, "test_category_updated")
+
+        response = client.delete(path=reverse("delete_category", kwargs={'_id': category.id}))
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(get_category_by_id(_id=category.id), None)
+
+
+    @patch("pet_shop.cache.LOOKUP_CACHE_STATS_INTERVAL", 2)
+    def test_get_category_by_id_stats_logged(self):
+
+        category = Category(name="test_category")
+        category.save()
+        category_cache.reset_stats()
+
+        with self.assertLogs("pet_shop.cache", level="INFO") as logs:
+            get_category_by_id(_id=category.id)
+            get_category_by_id(_id=category.id)
+
+        self.assertEqual(logs.output, ["INFO:pet_shop.cache:Lookup cache category: 1 hits, 1 misses (50.0% hit rate)"])
+
+
+class TestAsyncCategoryViews(BaseTestCase):
+
+    def test_get_list_pass(self):
+
+        for number in range(1, 4):
+            category = Category(name=f"test_category_{number}")
+            category.save()
+
+        response = call_async(async_client.get, path=reverse("all_categories_async"), data={"page_size": 2})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.get("name") for item in content], ["test_category_1", "test_category_2"])
+        self.assertIn('rel="next"', response.headers.get("Link"))
+
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = call_async(async_client.get, path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.get("name") for item in content], ["test_category_3"])
+        self.assertIn('rel="prev"', response.headers.get("Link"))
+
+    def test_get_list_not_found(self):
+
+        response = call_async(async_client.get, path=reverse("all_categories_async"))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), CATEGORIES_NOT_FOUND)
+
+    def test_get_pass(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        response = call_async(async_client.get, path=reverse("get_category_async", kwargs={"_id": category.id}))
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        response = client.get(path=reverse("get_category", kwargs={"_id": category.id}))
+        self.assertEqual(content, json.loads(response.content))
+
+        response = call_async(async_client.get, path=reverse("get_category_async", kwargs={"_id": 100}))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), CATEGORY_NOT_FOUND)
+
+    def test_post_pass(self):
+
+        response = call_async(
+            async_client.post,
+            path=reverse("new_category_async"),
+            data=json.dumps({"name": "test_category"}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), CATEGORY_SUCCESSFULLY_CREATED)
+        self.assertEqual(Category.objects.get().name, "test_category")
+
+    def test_post_wrong_data(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        for data in ("not_json", json.dumps({}), json.dumps({"name": "test_category"})):
+            with self.subTest(data=data):
+                response = call_async(
+                    async_client.post,
+                    path=reverse("new_category_async"),
+                    data=data,
+                    content_type="application/json",
+                )
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content), WRONG_DATA)
+        self.assertEqual(Category.objects.count(), 1)
+
+    def test_post_wrong_data_created_after_check(self):
+
+        category = Category(name="test_category")
+        category.save()
+
+        with patch("category.views.aget_category_by_name", return_value=None):
+            response = call_async(
+                async_client.post,
+                path=reverse("new_category_async"),
+                data=json.dumps({"name": "test_category"}),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), WRONG_DATA)
+        self.assertEqual(Category.objects.count(), 1)
@@ -1,8 +1,13 @@
 from django.urls import path
 
 from category.views import (
+    AsyncCategoryListView,
+    AsyncCategoryView,
+    AsyncNewCategoryView,
     CategoryApiView,
     CategoryListApiView,
+    CategoryExportApiView,
+    CategoryChangesApiView,
     DeleteCategoryApiView,
     EditCategoryApiView,
     NewCategoryApiView,
@@ -10,8 +15,13 @@ from category.views import (
 
 urlpatterns = [
     path('', CategoryListApiView.as_view(), name="all_categories"),
+    path('export', CategoryExportApiView.as_view(), name="export_categories"),
+    path('changes', CategoryChangesApiView.as_view(), name="changes_categories"),
     path('new', NewCategoryApiView.as_view(), name="new_category"),
     path('<int:_id>', CategoryApiView.as_view(), name="get_category"),
     path('<int:_id>/edit', EditCategoryApiView.as_view(), name="edit_category"),
     path('<int:_id>/delete', DeleteCategoryApiView.as_view(), name="delete_category"),
+    path('async', AsyncCategoryListView.as_view(), name="all_categories_async"),
+    path('async/new', AsyncNewCategoryView.as_view(), name="new_category_async"),
+    path('async/<int:_id>', AsyncCategoryView.as_view(), name="get_category_async"),
 ]
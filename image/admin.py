@@ -1,5 +1,9 @@
 from django.contrib import admin
 
-from image.models import Image
+from image.models import (
+    Image,
+    ImageJob,
+)
 
 admin.site.register(Image)
+admin.site.register(ImageJob)
@@ -0,0 +1,294 @@
+import logging
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+from typing import Callable
+
+from django.core.files.uploadedfile import UploadedFile
+from django.db import (
+    connections,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from animal.models import Animal
+from animal.queries import (
+    get_animals_by_ids,
+    get_animals_for_update,
+)
+from image.helper import (
+    get_content_hash,
+    remove_image,
+    remove_image_files,
+)
+from image.models import Image
+from image.pipeline import (
+    create_image,
+    get_upload_path,
+    remove_upload,
+    save_image_files,
+    save_upload,
+    verify_upload,
+)
+from image.queries import (
+    get_image_by_name,
+    get_images_by_names,
+)
+from pet_shop.conditional import bump_table_version
+from pet_shop.error_messages import *
+from pet_shop.settings import (
+    IMAGE_WORKERS,
+    MAX_IMAGE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# The image is mapped to the animal by the file name, <ID of the animal record>.<extension>, e.g. 15.jpeg
+BULK_IMAGE_FILE_NAME_RE = re.compile(r"^(\d+)\.[a-z]+$", re.IGNORECASE)
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+
+def get_bulk_animal_id(file_name: str) -> int | None:
+    match = BULK_IMAGE_FILE_NAME_RE.match(os.path.basename(file_name))
+    return int(match.group(1)) if match else None
+
+
+def get_max_image_size() -> int:
+    return int(MAX_IMAGE_SIZE * 1024 * 1024)
+
+
+class BulkImageItem:
+    """
+    One image of the bulk upload, extract() stores the image into UPLOAD_ROOT and returns its path
+    """
+
+    def __init__(self, index: int, file_name: str, extract: Callable[[], str]):
+        self.index = index
+        self.file_name = file_name
+        self.extract = extract
+        self.animal_id = get_bulk_animal_id(file_name=file_name)
+        self.upload_path = None
+        self.name = None
+        self.image = None
+        self.error = None
+
+    @property
+    def status(self) -> str:
+        return "failed" if self.error else "done"
+
+
+def save_multipart_image(upload: UploadedFile) -> str:
+    if upload.size > get_max_image_size():
+        raise ValueError(f"The image has the size: {upload.size} higher than maximum size!")
+    return save_upload(upload=upload)
+
+
+def get_multipart_items(uploads: list[UploadedFile]) -> list[BulkImageItem]:
+    return [
+        BulkImageItem(index=index, file_name=upload.name, extract=lambda upload=upload: save_multipart_image(upload))
+        for index, upload in enumerate(uploads)
+    ]
+
+
+def is_archive_image(info: zipfile.ZipInfo) -> bool:
+    # The directories and the metadata of macOS (__MACOSX/, ._<name>) aren't the images
+    return (
+        not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and not os.path.basename(info.filename).startswith(".")
+    )
+
+
+def extract_archive_image(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    """
+    Decompress the image of the archive into UPLOAD_ROOT in chunks. The real size is counted,
+    the size in the archive could be faked (zip bomb).
+    :return: str - the path of the extracted image
+    :raise ValueError: if the image is bigger than MAX_IMAGE_SIZE
+    """
+    max_size = get_max_image_size()
+    if info.file_size > max_size:
+        raise ValueError(f"The image has the size: {info.file_size} higher than maximum size!")
+    upload_path = get_upload_path()
+    size = 0
+    try:
+        with archive.open(info) as source, open(upload_path, "wb") as target:
+            while chunk := source.read(ARCHIVE_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError(f"The image has the size higher than maximum size: {max_size}!")
+                target.write(chunk)
+    except Exception:
+        remove_upload(upload_path=upload_path)
+        raise
+    return upload_path
+
+
+def get_archive_items(archive: zipfile.ZipFile) -> list[BulkImageItem]:
+    """
+    The images are listed from the central directory of the archive, they are extracted
+    one by one while the previous images are processing
+    :return: list[BulkImageItem]
+    """
+    return [
+        BulkImageItem(
+            index=index,
+            file_name=info.filename,
+            extract=lambda info=info: extract_archive_image(archive=archive, info=info),
+        )
+        for index, info in enumerate(info for info in archive.infolist() if is_archive_image(info=info))
+    ]
+
+
+class BulkImageUpload:
+    """
+    Save the batch of the images and link them to the animals. The images are extracted one by one
+    and processed on the pool of the workers meanwhile, at most 2 * workers extracted images wait on the disk.
+    The same image in the batch is saved only once. All animals are linked to their images
+    in one transaction at the end, the failed images are only reported.
+    """
+
+    def __init__(self, items: list[BulkImageItem], workers: int = IMAGE_WORKERS):
+        self.items = items
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(2 * workers)
+        self._lock = threading.Lock()
+        # The content hash -> (format, renditions) of the saved image or None if the image already exists
+        self._saved: dict[str, Future] = {}
+
+    def check_animals(self) -> None:
+        """
+        Check the animals of all images with one query, the images of the missing animals aren't extracted
+        """
+        animal_ids = get_animals_by_ids(_ids={item.animal_id for item in self.items if item.animal_id}).keys()
+        seen = set()
+        for item in self.items:
+            if item.animal_id is None:
+                item.error = WRONG_DATA
+            elif item.animal_id not in animal_ids:
+                item.error = ANIMAL_NOT_FOUND
+            elif item.animal_id in seen:
+                item.error = DUPLICATE_ANIMAL_IMAGE
+            seen.add(item.animal_id)
+
+    def _save_files(self, name: str, upload_path: str) -> tuple[str, list[dict]] | None:
+        with self._lock:
+            future = self._saved.get(name)
+            owner = future is None
+            if owner:
+                future = self._saved[name] = Future()
+        if not owner:
+            # The same image is saved by another worker
+            return future.result()
+        try:
+            result = None if get_image_by_name(_name=name) else save_image_files(upload_path=upload_path, name=name)
+        except Exception as ex:
+            future.set_exception(ex)
+            raise
+        future.set_result(result)
+        return result
+
+    def _process(self, item: BulkImageItem) -> None:
+        try:
+            if not verify_upload(upload_path=item.upload_path):
+                raise ValueError("The upload isn't the supported image!")
+            item.name = get_content_hash(path=item.upload_path)
+            self._save_files(name=item.name, upload_path=item.upload_path)
+        except Exception as ex:
+            logger.error(f"The image {item.file_name} cannot be saved! ex:{ex}")
+            item.error = WRONG_DATA
+        finally:
+            remove_upload(upload_path=item.upload_path)
+            # Every worker thread has own database connections
+            connections.close_all()
+            self._slots.release()
+
+    def _get_saved(self) -> dict[str, tuple[str, list[dict]]]:
+        return {
+            name: future.result()
+            for name, future in self._saved.items()
+            if future.done() and not future.exception() and future.result()
+        }
+
+    def link(self) -> None:
+        """
+        Link the animals to the images in one transaction, one UPDATE per image. The animals are locked,
+        so the image linked by the concurrent image job is released and not overwritten.
+        """
+        items = [item for item in self.items if not item.error]
+        saved = self._get_saved()
+        try:
+            with transaction.atomic():
+                animals = get_animals_for_update(_ids={item.animal_id for item in items})
+                images = get_images_by_names(_names={item.name for item in items})
+                links: dict[str, list[BulkImageItem]] = {}
+                old_images = []
+                for item in items:
+                    animal = animals.get(item.animal_id)
+                    if not animal:
+                        # The animal is deleted in the meantime
+                        item.error = ANIMAL_NOT_FOUND
+                    elif animal.image and animal.image.name == item.name:
+                        item.image = animal.image
+                    elif item.name not in images and item.name not in saved:
+                        # The existing image is deleted after it is checked
+                        item.error = WRONG_DATA
+                    else:
+                        links.setdefault(item.name, []).append(item)
+                        if animal.image:
+                            old_images.append(animal.image)
+
+                now = timezone.now()
+                for name, linked in links.items():
+                    image = images.get(name)
+                    references = len(linked)
+                    if not image:
+                        image_format, renditions = saved[name]
+                        image = create_image(name=name, image_format=image_format, renditions=renditions)
+                        if not image:
+                            raise ValueError(f"The image {name} cannot be created!")
+                        references -= 1
+                    if references:
+                        Image.objects.filter(id=image.id).update(references=F("references") + references)
+                    Animal.objects.filter(id__in=[item.animal_id for item in linked]).update(
+                        image=image, modified_at=now)
+                    for item in linked:
+                        item.image = image
+                for old_image in old_images:
+                    remove_image(image=old_image)
+        except Exception as ex:
+            logger.error(f"The images cannot be linked to the animals! ex:{ex}")
+            for item in items:
+                item.image = None
+                item.error = WRONG_DATA
+        finally:
+            # The saved images which aren't linked to any animal
+            existing = get_images_by_names(_names=set(saved.keys()))
+            for name, (image_format, renditions) in saved.items():
+                if name not in existing:
+                    remove_image_files(image=Image(name=name, format=image_format, renditions=renditions))
+        bump_table_version(Animal, Image)
+
+    def run(self) -> list[BulkImageItem]:
+        self.check_animals()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-image") as executor:
+            for item in self.items:
+                if item.error:
+                    continue
+                self._slots.acquire()
+                try:
+                    item.upload_path = item.extract()
+                except Exception as ex:
+                    logger.error(f"The image {item.file_name} cannot be extracted! ex:{ex}")
+                    item.error = WRONG_DATA
+                    self._slots.release()
+                    continue
+                executor.submit(self._process, item)
+        self.link()
+        return self.items
@@ -0,0 +1,213 @@
+import logging
+import os
+import time
+from datetime import timedelta
+from itertools import islice
+from typing import Iterator
+
+from django.db import transaction
+from django.db.models import (
+    Count,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from animal.models import Animal
+from image.helper import remove_image_files
+from image.models import (
+    Image,
+    ImageJob,
+)
+from image.storage import get_image_storage
+from pet_shop import settings
+from pet_shop.settings import (
+    IMAGE_GC_BATCH_SIZE,
+    IMAGE_GC_GRACE_PERIOD,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def iter_batches(items: Iterator, batch_size: int) -> Iterator[list]:
+    while batch := list(islice(items, batch_size)):
+        yield batch
+
+
+def get_image_name(file_name: str) -> str:
+    """
+    The name of the image of the file, ab/cd/<name>.jpeg and ab/cd/<name>_64.webp (rendition) -> <name>
+    :return: str
+    """
+    return os.path.basename(file_name).split(".", 1)[0].split("_", 1)[0]
+
+
+def collect_orphan_files(
+        grace_period: int = IMAGE_GC_GRACE_PERIOD,
+        batch_size: int = IMAGE_GC_BATCH_SIZE,
+        pause: float = 0,
+        dry_run: bool = False,
+) -> int:
+    """
+    Remove the files of the storage without the row of the image. The storage is listed as a stream
+    and every batch of the files is checked by one query.
+    :return: int - the number of the orphan files
+    """
+    storage = get_image_storage()
+    modified_before = time.time() - grace_period
+    removed = 0
+    for batch in iter_batches(items=storage.iter_files(), batch_size=batch_size):
+        files = {
+            file_name: get_image_name(file_name=file_name)
+            for file_name, modified_at in batch
+            if modified_at < modified_before
+        }
+        names = set(Image.objects.filter(name__in=set(files.values())).values_list("name", flat=True))
+        for file_name, name in files.items():
+            if name in names:
+                continue
+            logger.info(f"The file {file_name} is orphan!")
+            removed += 1
+            if not dry_run:
+                storage.delete(file_name=file_name)
+        time.sleep(pause)
+    return removed
+
+
+def collect_orphan_images(
+        grace_period: int = IMAGE_GC_GRACE_PERIOD,
+        batch_size: int = IMAGE_GC_BATCH_SIZE,
+        pause: float = 0,
+        dry_run: bool = False,
+) -> int:
+    """
+    Delete the images without any animal and without any reference with their files, every batch is deleted
+    in a short transaction, so the requests aren't blocked for long
+    :return: int - the number of the orphan images
+    """
+    orphans = Image.objects.filter(
+        animal__isnull=True,
+        created_at__lt=timezone.now() - timedelta(seconds=grace_period),
+    ).order_by("id")
+    removed = 0
+    last_id = 0
+    while True:
+        images = list(orphans.filter(id__gt=last_id)[:batch_size])
+        if not images:
+            return removed
+        last_id = images[-1].id
+        if dry_run:
+            removed += len(images)
+            continue
+        with transaction.atomic():
+            # The image could get the animal or the reference (acquire_image) in the meantime, the locked rows
+            # can't be taken until the commit, so the deleted image is never linked to the new animal.
+            # The references are fixed before, the dry run counts the images with the wrong references too.
+            deleted = set(
+                orphans.filter(id__in=[image.id for image in images], references=0)
+                .select_for_update(of=("self",)).values_list("id", flat=True)
+            )
+            Image.objects.filter(id__in=deleted, references=0).delete()
+        for image in images:
+            if image.id in deleted:
+                logger.info(f"The image {image.id} is orphan!")
+                remove_image_files(image=image)
+        removed += len(deleted)
+        time.sleep(pause)
+
+
+def fix_image_references(batch_size: int = IMAGE_GC_BATCH_SIZE, pause: float = 0, dry_run: bool = False) -> int:
+    """
+    Set Image.references to the real number of the animals, the images are updated
+    by the ranges of the IDs with one statement per range
+    :return: int - the number of the images with the wrong number of the references
+    """
+    references = Coalesce(
+        Subquery(
+            Animal.objects.filter(image_id=OuterRef("id")).order_by().values("image_id")
+            .annotate(count=Count("id")).values("count")
+        ),
+        0,
+    )
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = list(Image.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return fixed
+        last_id = ids[-1]
+        wrong = Image.objects.filter(id__in=ids).exclude(references=references)
+        if dry_run:
+            fixed += wrong.count()
+        else:
+            fixed += wrong.update(references=references)
+        time.sleep(pause)
+
+
+def collect_interrupted_jobs(grace_period: int = IMAGE_GC_GRACE_PERIOD, dry_run: bool = False) -> int:
+    """
+    Fail the jobs pending or processing longer than the grace period, e.g. the jobs which didn't fit
+    into the queue after the restart, and remove their uploads, the clients stop waiting for them
+    :return: int - the number of the interrupted jobs
+    """
+    jobs = ImageJob.objects.filter(
+        status__in=["pending", "processing"],
+        modified_at__lt=timezone.now() - timedelta(seconds=grace_period),
+    )
+    interrupted = 0
+    for job_id, upload_path in list(jobs.values_list("id", "upload_path")):
+        if dry_run:
+            interrupted += 1
+            continue
+        # The job could be taken by the worker in the meantime
+        failed = jobs.filter(id=job_id).update(
+            status="failed", error="The job is interrupted!", modified_at=timezone.now())
+        if failed:
+            interrupted += 1
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+    return interrupted
+
+
+def collect_stale_uploads(grace_period: int = IMAGE_GC_GRACE_PERIOD, dry_run: bool = False) -> int:
+    """
+    Remove the uploads left by the interrupted jobs
+    :return: int - the number of the stale uploads
+    """
+    modified_before = time.time() - grace_period
+    running = set(
+        ImageJob.objects.filter(status__in=["pending", "processing"]).values_list("upload_path", flat=True)
+    )
+    removed = 0
+    with os.scandir(settings.UPLOAD_ROOT) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.path in running or entry.stat().st_mtime >= modified_before:
+                continue
+            logger.info(f"The upload {entry.name} is stale!")
+            removed += 1
+            if not dry_run:
+                os.remove(entry.path)
+    return removed
+
+
+def collect_garbage(
+        grace_period: int = IMAGE_GC_GRACE_PERIOD,
+        batch_size: int = IMAGE_GC_BATCH_SIZE,
+        pause: float = 0,
+        dry_run: bool = False,
+) -> dict[str, int]:
+    """
+    Reconcile the storage with the images: fix the references, delete the images without animals,
+    remove the files without images, fail the interrupted jobs and remove the stale uploads
+    :return: dict[str, int] - the numbers of the fixed/removed items
+    """
+    return {
+        "references": fix_image_references(batch_size=batch_size, pause=pause, dry_run=dry_run),
+        "images": collect_orphan_images(
+            grace_period=grace_period, batch_size=batch_size, pause=pause, dry_run=dry_run),
+        "files": collect_orphan_files(
+            grace_period=grace_period, batch_size=batch_size, pause=pause, dry_run=dry_run),
+        "jobs": collect_interrupted_jobs(grace_period=grace_period, dry_run=dry_run),
+        "uploads": collect_stale_uploads(grace_period=grace_period, dry_run=dry_run),
+    }
@@ -0,0 +1,187 @@
+import datetime
+import hashlib
+import threading
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from urllib.parse import (
+    parse_qs,
+    unquote,
+    urlsplit,
+)
+from xml.etree import ElementTree
+
+from django.utils.crypto import get_random_string
+
+S3_XML_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def get_timestamp() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _parse(self) -> tuple[str, str, dict[str, str]]:
+        url = urlsplit(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        query = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        return bucket, key, query
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", f"{len(body)}")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith(f"AWS4-HMAC-SHA256 Credential={self.server.access_key}/"):
+            self._send(status=403, body=b"<Error><Code>AccessDenied</Code></Error>")
+            return False
+        return True
+
+    def do_PUT(self):
+        if not self._authorized():
+            return
+        bucket, key, query = self._parse()
+        body = self._body()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self.server.lock:
+            if "uploadId" in query:
+                upload = self.server.uploads.get(query["uploadId"])
+                if upload is None:
+                    return self._send(status=404, body=b"<Error><Code>NoSuchUpload</Code></Error>")
+                upload[int(query["partNumber"])] = (etag, body)
+            else:
+                self.server.objects[(bucket, key)] = body
+                self.server.modified_at[(bucket, key)] = get_timestamp()
+        self._send(status=200, headers={"ETag": etag})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        bucket, key, query = self._parse()
+        body = self._body()
+        if "uploads" in query:
+            upload_id = get_random_string(length=32)
+            with self.server.lock:
+                self.server.uploads[upload_id] = {}
+            result = (
+                f'<InitiateMultipartUploadResult xmlns="{S3_XML_NAMESPACE}">'
+                f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                f"</InitiateMultipartUploadResult>"
+            )
+            return self._send(status=200, body=result.encode())
+        with self.server.lock:
+            upload = self.server.uploads.pop(query.get("uploadId"), None)
+            if upload is None:
+                return self._send(status=404, body=b"<Error><Code>NoSuchUpload</Code></Error>")
+            parts = []
+            for part in ElementTree.fromstring(body).iter("Part"):
+                part_number = int(part.findtext("PartNumber"))
+                etag, data = upload[part_number]
+                if etag != part.findtext("ETag"):
+                    return self._send(status=400, body=b"<Error><Code>InvalidPart</Code></Error>")
+                parts.append(data)
+            self.server.objects[(bucket, key)] = b"".join(parts)
+            self.server.modified_at[(bucket, key)] = get_timestamp()
+            self.server.multipart_uploads += 1
+        self._send(status=200, body=f'<CompleteMultipartUploadResult xmlns="{S3_XML_NAMESPACE}"/>'.encode())
+
+    def _list(self, bucket: str, query: dict[str, str]) -> None:
+        page_size = int(query.get("max-keys", 1000))
+        start = query.get("continuation-token", "")
+        with self.server.lock:
+            keys = sorted(key for _bucket, key in self.server.objects if _bucket == bucket and key > start)
+            modified_at = self.server.modified_at
+        page = keys[:page_size]
+        contents = "".join(
+            f"<Contents><Key>{key}</Key><LastModified>{modified_at[(bucket, key)]}</LastModified></Contents>"
+            for key in page
+        )
+        truncated = len(keys) > page_size
+        token = f"<NextContinuationToken>{page[-1]}</NextContinuationToken>" if truncated else ""
+        result = (
+            f'<ListBucketResult xmlns="{S3_XML_NAMESPACE}"><Name>{bucket}</Name>'
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{token}{contents}</ListBucketResult>"
+        )
+        self._send(status=200, body=result.encode())
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        bucket, key, query = self._parse()
+        if not key and query.get("list-type") == "2":
+            return self._list(bucket=bucket, query=query)
+        with self.server.lock:
+            body = self.server.objects.get((bucket, key))
+        if body is None:
+            return self._send(status=404, body=b"<Error><Code>NoSuchKey</Code></Error>")
+        self._send(status=200, body=body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        bucket, key, query = self._parse()
+        with self.server.lock:
+            if "uploadId" in query:
+                self.server.uploads.pop(query["uploadId"], None)
+            else:
+                self.server.objects.pop((bucket, key), None)
+                self.server.modified_at.pop((bucket, key), None)
+        self._send(status=204)
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    """
+    In-process stand-in of S3 compatible object store (the subset used by image.storage.S3Storage):
+    put/get/head/delete of the objects and the multipart upload, the objects are kept in the memory.
+    It counts the TCP connections, so the pooling of the connections can be checked.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, access_key: str = "test_access_key"):
+        super().__init__(("127.0.0.1", 0), FakeS3Handler)
+        self.access_key = access_key
+        self.lock = threading.Lock()
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.modified_at: dict[tuple[str, str], str] = {}
+        self.uploads: dict[str, dict[int, tuple[str, bytes]]] = {}
+        self.connections = 0
+        self.multipart_uploads = 0
+        self._thread = None
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeS3Server":
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
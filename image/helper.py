@@ -1,16 +1,88 @@
+import hashlib
 import logging
 import os
 
+from django.db import transaction
+from django.db.models import F
+from django.utils.crypto import get_random_string
+
+from image.models import Image
+from image.storage import get_image_storage
 from pet_shop import settings
 
 logger = logging.getLogger(__name__)
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_content_hash(path: str) -> str:
+    """
+    SHA-256 of the file, it is the name of the image so the same uploads are stored once
+    :return: str - 64 hex characters
+    """
+    content_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def get_image_dir(name: str) -> str:
+    """
+    The images are sharded into the subdirectories by the first characters of the name (ab/cd/abcd...),
+    so none directory holds all images
+    :return: str - the directory relative to the root of the storage
+    """
+    return os.path.join(name[:2], name[2:4])
+
+
+def get_image_file_name(name: str, extension: str) -> str:
+    return os.path.join(get_image_dir(name=name), f"{name}.{extension}")
+
+
+def get_rendition_file_name(name: str, size: int, rendition_format: str) -> str:
+    return os.path.join(get_image_dir(name=name), f"{name}_{size}.{rendition_format}")
 
-def remove_image(path: str) -> bool:
-    try:
-        file_path = os.path.join(settings.MEDIA_ROOT, f"{path}")
-        os.remove(file_path)
-        return True
-    except Exception as ex:
-        logger.debug(f"The image cannot be removed! ex:{ex}")
+
+def get_tmp_file_path(file_name: str) -> str:
+    """
+    The local file in UPLOAD_ROOT where the file is prepared before it is moved into the storage
+    :return: str
+    """
+    return os.path.join(settings.UPLOAD_ROOT, f"{get_random_string(length=16)}_{os.path.basename(file_name)}.tmp")
+
+
+def remove_file(file_name: str) -> bool:
+    return get_image_storage().delete(file_name=file_name)
+
+
+def remove_renditions(name: str, renditions: list[dict]) -> None:
+    for rendition in renditions:
+        remove_file(
+            file_name=get_rendition_file_name(name=name, size=rendition["size"], rendition_format=rendition["format"]),
+        )
+
+
+def remove_image_files(image: Image) -> bool:
+    """
+    Remove the file of the image and the files of its renditions
+    :return: bool - whether the file of the image is removed
+    """
+    if not remove_file(file_name=get_image_file_name(name=image.name, extension=image.format)):
         return False
+    remove_renditions(name=image.name, renditions=image.renditions)
+    return True
+
+
+def remove_image(image: Image) -> bool:
+    """
+    Release one reference of the image, the row and the files are deleted only with the last reference.
+    The row is deleted only if nobody took the new reference in the meantime.
+    :return: bool - whether the image is deleted
+    """
+    with transaction.atomic():
+        Image.objects.filter(id=image.id, references__gt=0).update(references=F("references") - 1)
+        deleted, _ = Image.objects.filter(id=image.id, references=0).delete()
+        if deleted:
+            transaction.on_commit(lambda: remove_image_files(image=image))
+    return bool(deleted)
@@ -0,0 +1,129 @@
+from typing import NamedTuple
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+SOS = 0xDA
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# The markers without the length and the data
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+# Start of frame markers (SOF0-SOF15), DHT (C4), JPG (C8) and DAC (CC) use the same range
+FRAME_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Baseline, extended and progressive Huffman frames, they are supported by all browsers
+SUPPORTED_FRAME_MARKERS = {0xC0, 0xC1, 0xC2}
+# APP1 (EXIF, XMP), APP13 (IPTC) and COM, the same metadata are dropped by Pillow when it saves the image,
+# APP0 (JFIF), APP2 (ICC profile) and APP14 (Adobe colour transform) are needed to show the image correctly
+METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+
+
+class JpegInfo(NamedTuple):
+    frame_marker: int
+    precision: int
+    width: int
+    height: int
+    components: int
+    # (marker, offset, length) of the segments before the scan, without SOI
+    segments: list[tuple[int, int, int]]
+    # The offset of SOS, the scan is copied from there up to the end of the file
+    scan_offset: int
+
+
+def read_jpeg_info(path: str) -> JpegInfo:
+    """
+    Walk the markers of the JPEG file up to the first scan, the pixel data isn't decoded.
+    The file has to start with SOI, have a frame and end with EOI.
+    :return: JpegInfo
+    :raise ValueError: if the structure of the file is invalid
+    """
+    with open(path, "rb") as file:
+        if file.read(2) != SOI:
+            raise ValueError("The file doesn't start with SOI!")
+        frame = None
+        segments = []
+        while True:
+            offset = file.tell()
+            prefix = file.read(1)
+            if prefix != b"\xff":
+                raise ValueError(f"Invalid marker at {offset}!")
+            marker = file.read(1)
+            # Fill bytes
+            while marker == b"\xff":
+                marker = file.read(1)
+            if not marker:
+                raise ValueError("The file ends before the scan!")
+            marker = marker[0]
+            if marker in STANDALONE_MARKERS:
+                continue
+            length = int.from_bytes(file.read(2), "big")
+            if length < 2:
+                raise ValueError(f"Invalid length of the segment at {offset}!")
+            data = file.read(length - 2)
+            if len(data) != length - 2:
+                raise ValueError("The file ends before the scan!")
+            if marker in FRAME_MARKERS:
+                if len(data) < 6:
+                    raise ValueError("Invalid frame!")
+                frame = (
+                    marker,
+                    data[0],
+                    int.from_bytes(data[3:5], "big"),
+                    int.from_bytes(data[1:3], "big"),
+                    data[5],
+                )
+            segments.append((marker, offset, file.tell() - offset))
+            if marker == SOS:
+                break
+        if frame is None:
+            raise ValueError("The file has no frame!")
+        scan_start = file.tell()
+
+        # Trailing zeros are written by some cameras
+        file.seek(0, 2)
+        end = file.tell()
+        file.seek(max(end - 1024, scan_start))
+        if not file.read().rstrip(b"\x00").endswith(EOI):
+            raise ValueError("The file doesn't end with EOI!")
+
+    frame_marker, precision, width, height, components = frame
+    if not width or not height:
+        raise ValueError("Invalid dimensions!")
+    return JpegInfo(
+        frame_marker=frame_marker,
+        precision=precision,
+        width=width,
+        height=height,
+        components=components,
+        segments=segments[:-1],
+        scan_offset=segments[-1][1],
+    )
+
+
+def can_pass_through(info: JpegInfo, max_dimension: int) -> bool:
+    """
+    Whether the original bytes can be stored without the decoding and the encoding,
+    otherwise the image has to be resized or converted
+    :return: bool
+    """
+    return (
+        info.frame_marker in SUPPORTED_FRAME_MARKERS
+        and info.precision == 8
+        # Grayscale or YCbCr, CMYK isn't shown by all browsers
+        and info.components in (1, 3)
+        and max(info.width, info.height) <= max_dimension
+    )
+
+
+def copy_jpeg(info: JpegInfo, source_path: str, target_path: str) -> None:
+    """
+    Copy the JPEG file without the metadata segments, the scan data is copied as it is
+    """
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        target.write(SOI)
+        for marker, offset, length in info.segments:
+            if marker in METADATA_MARKERS:
+                continue
+            source.seek(offset)
+            target.write(source.read(length))
+        source.seek(info.scan_offset)
+        while chunk := source.read(COPY_CHUNK_SIZE):
+            target.write(chunk)
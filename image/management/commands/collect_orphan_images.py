@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from image.collector import collect_garbage
+from pet_shop.settings import (
+    IMAGE_GC_BATCH_SIZE,
+    IMAGE_GC_GRACE_PERIOD,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the image storage with the Image table: fix the references, delete the images without animals, "
+        "remove the files without images, fail the interrupted image jobs and remove the stale uploads. "
+        "With --interval it runs periodically, e.g. as a separate process next to the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report the orphans")
+        parser.add_argument("--batch-size", type=int, default=IMAGE_GC_BATCH_SIZE, help="The files/rows per query")
+        parser.add_argument(
+            "--grace-period", type=int, default=IMAGE_GC_GRACE_PERIOD, help="Keep the younger orphans (s)")
+        parser.add_argument("--pause", type=float, default=0, help="The pause between the batches (s)")
+        parser.add_argument("--interval", type=int, default=0, help="Repeat the collection every interval (s)")
+
+    def handle(self, *args, **options):
+        while True:
+            report = collect_garbage(
+                grace_period=options["grace_period"],
+                batch_size=options["batch_size"],
+                pause=options["pause"],
+                dry_run=options["dry_run"],
+            )
+            prefix = "Found" if options["dry_run"] else "Collected"
+            self.stdout.write(
+                f"{prefix}: {report['references']} wrong references, {report['images']} orphan images, "
+                f"{report['files']} orphan files, {report['uploads']} stale uploads, "
+                f"{report['jobs']} interrupted jobs"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from image.pipeline import ImagePipeline
+from pet_shop.settings import (
+    IMAGE_QUEUE_SIZE,
+    IMAGE_WORKERS,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Process the pending image jobs of the previous run of the server, e.g. after the restart or the crash. "
+        "Run it once after the start of the server (after migrate), the jobs queued by the running server "
+        "are claimed atomically, so every job is processed once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=IMAGE_WORKERS, help="The images processed at once")
+
+    def handle(self, *args, **options):
+        pipeline = ImagePipeline(workers=options["workers"], queue_size=IMAGE_QUEUE_SIZE)
+        resumed = 0
+        while True:
+            # The jobs which don't fit into the queue are queued after the previous ones are processed
+            queued = pipeline.resume()
+            pipeline.wait_all()
+            resumed += queued
+            if not queued:
+                break
+        self.stdout.write(f"Resumed: {resumed} pending image jobs")
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import mimetypes
+import os
+import re
+import stat as stat_types
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterator,
+)
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from pet_shop import settings
+from pet_shop.settings import (
+    MEDIA_ACCEL_REDIRECT_PREFIX,
+    MEDIA_CACHE_MAX_AGE,
+    MEDIA_SENDFILE_MODE,
+)
+
+logger = logging.getLogger(__name__)
+
+RANGE_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def get_media_etag(path: str) -> str:
+    """
+    The files are named by the content hash (see image.helper.get_content_hash) and never change,
+    so the name is the strong ETag of the file
+    :return: str
+    """
+    return f'"{os.path.basename(path)}"'
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse the single range of the Range header, the multiple ranges aren't supported
+    and the whole file is returned for them
+    :return: tuple[int, int] | None - the first and the last byte of the range
+    :raise ValueError: if the range is unsatisfiable
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # The suffix range, the last bytes of the file
+        length = int(end)
+        if not length:
+            raise ValueError("Empty suffix range!")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(f"Unsatisfiable range: {header}!")
+    return start, end
+
+
+def iter_range(file_path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def aiter_range(file_path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    """
+    iter_range for ASGI, the file is read in the threads of the default executor,
+    so the event loop isn't blocked by the disk
+    """
+    file = await asyncio.to_thread(open, file_path, "rb")
+    try:
+        await asyncio.to_thread(file.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(file.read, min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def set_cache_headers(response: HttpResponse, etag: str, last_modified: float) -> HttpResponse:
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = f"public, max-age={MEDIA_CACHE_MAX_AGE}, immutable"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def get_media_path(path: str) -> str:
+    try:
+        return safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        logger.error(f"The media {path} is outside of MEDIA_ROOT!")
+        raise Http404("The file doesn't exist!")
+
+
+def check_media_file(stat: os.stat_result | None) -> None:
+    if stat is None or not stat_types.S_ISREG(stat.st_mode):
+        raise Http404("The file doesn't exist!")
+
+
+def get_file_stat(file_path: str) -> os.stat_result | None:
+    try:
+        return os.stat(file_path)
+    except OSError:
+        return None
+
+
+def get_media_response(
+        request,
+        path: str,
+        file_path: str,
+        stat: os.stat_result,
+        iter_file: Callable | None = None,
+) -> HttpResponse:
+    """
+    The response of the media file with the strong ETag, the immutable Cache-Control and the Range requests.
+    The file is read by iter_file(file_path, start, end), the sync view sends the whole file by FileResponse.
+    """
+    etag = get_media_etag(path=file_path)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        return set_cache_headers(response=response, etag=etag, last_modified=stat.st_mtime)
+
+    content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+    if MEDIA_SENDFILE_MODE == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = f"{MEDIA_ACCEL_REDIRECT_PREFIX}{path}"
+        return set_cache_headers(response=response, etag=etag, last_modified=stat.st_mtime)
+    if MEDIA_SENDFILE_MODE == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = file_path
+        return set_cache_headers(response=response, etag=etag, last_modified=stat.st_mtime)
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    # The range of the old version of the file isn't returned
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(header=range_header, size=stat.st_size)
+        except ValueError as ex:
+            logger.debug(f"The range cannot be returned! ex:{ex}")
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return set_cache_headers(response=response, etag=etag, last_modified=stat.st_mtime)
+
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            (iter_file or iter_range)(file_path=file_path, start=start, end=end),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = f"{end - start + 1}"
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    elif iter_file:
+        response = StreamingHttpResponse(
+            iter_file(file_path=file_path, start=0, end=stat.st_size - 1),
+            content_type=content_type,
+        )
+        response["Content-Length"] = f"{stat.st_size}"
+    else:
+        response = FileResponse(open(file_path, "rb"), content_type=content_type)
+    return set_cache_headers(response=response, etag=etag, last_modified=stat.st_mtime)
+
+
+@require_safe
+def serve_media(request, path: str) -> HttpResponse:
+    """
+    Serve the file of MEDIA_ROOT with the strong ETag, the immutable Cache-Control and the Range requests.
+    With MEDIA_SENDFILE_MODE the front proxy sends the file (X-Accel-Redirect for nginx,
+    X-Sendfile for Apache/lighttpd), otherwise FileResponse uses the sendfile of the server if it has one.
+    """
+    file_path = get_media_path(path=path)
+    stat = get_file_stat(file_path=file_path)
+    check_media_file(stat=stat)
+    return get_media_response(request=request, path=path, file_path=file_path, stat=stat)
+
+
+async def aserve_media(request, path: str) -> HttpResponse:
+    """
+    serve_media for ASGI (ASYNC_MEDIA), the disk is accessed in the threads of the default executor
+    and the file is streamed by the async iterator, so the event loop isn't blocked
+    """
+    # require_safe of Django 4.2 doesn't support the async views
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    file_path = get_media_path(path=path)
+    stat = await asyncio.to_thread(get_file_stat, file_path=file_path)
+    check_media_file(stat=stat)
+    return get_media_response(request=request, path=path, file_path=file_path, stat=stat, iter_file=aiter_range)
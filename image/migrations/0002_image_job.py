@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animal', '0004_animal_name_nocase_index'),
+        ('image', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('upload_path', models.CharField(max_length=255)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+                ('animal', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='animal.animal')),
+                ('image', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='image.image')),
+            ],
+        ),
+    ]
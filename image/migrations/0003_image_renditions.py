@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image', '0002_image_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='renditions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image', '0003_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='references',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='name',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+    ]
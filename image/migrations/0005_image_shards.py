@@ -0,0 +1,90 @@
+import logging
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+def get_file_names(image) -> list[str]:
+    file_names = [f"{image.name}.{image.format}"]
+    file_names += [f"{image.name}_{rendition['size']}.{rendition['format']}" for rendition in image.renditions]
+    return file_names
+
+
+def move_files(image, from_dir: str, to_dir: str) -> None:
+    """
+    Move the files of the image, the files already moved by the interrupted run are skipped
+    """
+    for file_name in get_file_names(image=image):
+        old_path = os.path.join(settings.MEDIA_ROOT, from_dir, file_name)
+        new_path = os.path.join(settings.MEDIA_ROOT, to_dir, file_name)
+        if not os.path.exists(old_path) or os.path.exists(new_path):
+            continue
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(old_path, new_path)
+
+
+def is_filesystem_storage() -> bool:
+    """
+    The files are moved under MEDIA_ROOT only, the objects of the other storages (S3) are kept in place
+    together with the paths of their images
+    """
+    if settings.IMAGE_STORAGE_BACKEND == "filesystem":
+        return True
+    logger.warning(f"The images of the {settings.IMAGE_STORAGE_BACKEND} storage aren't moved into the shards!")
+    return False
+
+
+def move_path(image, from_dir: str, to_dir: str) -> None:
+    old_prefix = f"/{from_dir}/{image.name}" if from_dir else f"/{image.name}"
+    new_prefix = f"/{to_dir}/{image.name}" if to_dir else f"/{image.name}"
+    image.path = image.path.replace(old_prefix, new_prefix)
+    for rendition in image.renditions:
+        rendition['path'] = rendition['path'].replace(old_prefix, new_prefix)
+
+
+def move_into_shards(apps, schema_editor):
+    """
+    Move the files of the existing images from MEDIA_ROOT into the shards (ab/cd/abcd...). Every image is saved
+    right after its files are moved (the migration isn't atomic), so the interrupted run can be run again.
+    """
+    if not is_filesystem_storage():
+        return
+    Image = apps.get_model('image', 'Image')
+    for image in Image.objects.all().iterator():
+        shard = os.path.join(image.name[:2], image.name[2:4])
+        move_files(image=image, from_dir="", to_dir=shard)
+        if f"/{shard}/{image.name}" not in image.path:
+            move_path(image=image, from_dir="", to_dir=shard)
+            image.save(update_fields=['path', 'renditions'])
+
+
+def move_out_of_shards(apps, schema_editor):
+    """
+    Move the files of the images from the shards back into MEDIA_ROOT
+    """
+    if not is_filesystem_storage():
+        return
+    Image = apps.get_model('image', 'Image')
+    for image in Image.objects.all().iterator():
+        shard = os.path.join(image.name[:2], image.name[2:4])
+        move_files(image=image, from_dir=shard, to_dir="")
+        if f"/{shard}/{image.name}" in image.path:
+            move_path(image=image, from_dir=shard, to_dir="")
+            image.save(update_fields=['path', 'renditions'])
+
+
+class Migration(migrations.Migration):
+
+    # The moved files cannot be rolled back with the transaction
+    atomic = False
+
+    dependencies = [
+        ('image', '0004_image_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_into_shards, move_out_of_shards),
+    ]
@@ -11,9 +11,14 @@ class Image(models.Model):
     ]
 
     created_at = models.DateTimeField(default=timezone.now, editable=False)
-    name = models.CharField(max_length=64)
+    # SHA-256 of the uploaded file, see image.helper.get_content_hash
+    name = models.CharField(max_length=64, unique=True)
     path = models.CharField(max_length=255)
     format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    # The smaller copies of the image, see image.renditions
+    renditions = models.JSONField(default=list, blank=True)
+    # The number of the animals with the image, the files are removed with the last one
+    references = models.PositiveIntegerField(default=1)
 
     def __str__(self):
         return f"{self.name}.{self.format}"
@@ -22,3 +27,29 @@ class Image(models.Model):
         if self.format not in dict(self.FORMAT_CHOICES).keys():
             raise ValidationError("Invalid format!")
         super().save(*args, **kwargs)
+
+
+class ImageJob(models.Model):
+    """
+    The processing of the uploaded image, the upload is stored as it is and it is decoded,
+    validated and saved as the image of the animal in the background
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    modified_at = models.DateTimeField(auto_now=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="pending")
+    upload_path = models.CharField(max_length=255)
+    error = models.CharField(max_length=255, blank=True, default="")
+    # Relationships
+    animal = models.ForeignKey("animal.Animal", on_delete=models.SET_NULL, null=True)
+    image = models.ForeignKey(Image, on_delete=models.SET_NULL, null=True)
+
+    def __str__(self):
+        return f"{self.id} - {self.status}"
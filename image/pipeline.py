@@ -0,0 +1,318 @@
+import logging
+import os
+import threading
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+
+from PIL import Image as PilImage
+from django.db import (
+    IntegrityError,
+    close_old_connections,
+    transaction,
+)
+from django.db.models import F
+from django.utils.crypto import get_random_string
+
+from animal.queries import (
+    get_animal_for_update,
+    set_animal_image,
+)
+from image.helper import (
+    get_content_hash,
+    get_image_file_name,
+    get_tmp_file_path,
+    remove_image,
+    remove_image_files,
+    remove_renditions,
+)
+from image.jpeg import (
+    can_pass_through,
+    copy_jpeg,
+    read_jpeg_info,
+)
+from image.models import (
+    Image,
+    ImageJob,
+)
+from image.queries import (
+    claim_image_job,
+    get_image_by_name,
+    get_image_job_by_id,
+    get_pending_image_job_ids,
+)
+from image.renditions import create_renditions
+from image.storage import get_image_storage
+from pet_shop import settings
+from pet_shop.settings import (
+    IMAGE_MAX_DIMENSION,
+    IMAGE_QUEUE_SIZE,
+    IMAGE_RENDITION_SIZES,
+    IMAGE_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_upload_path() -> str:
+    return os.path.join(settings.UPLOAD_ROOT, f"{get_random_string(length=64)}.upload")
+
+
+def save_upload(upload) -> str:
+    """
+    Store the uploaded file as it is, without decoding. The file streamed to the disk
+    by the upload handler is moved (renamed), only the file in the memory is written.
+    :return: str - the path of the stored file
+    """
+    upload_path = get_upload_path()
+    if hasattr(upload, "temporary_file_path"):
+        os.replace(upload.temporary_file_path(), upload_path)
+        return upload_path
+    with open(upload_path, "wb") as file:
+        for chunk in upload.chunks():
+            file.write(chunk)
+    return upload_path
+
+
+def verify_upload(upload_path: str) -> bool:
+    """
+    Check the header of the uploaded image, the pixel data isn't read (Pillow opens the images lazily),
+    so the invalid uploads are rejected before they are queued
+    :return: bool - whether the upload is the image in the supported format
+    """
+    try:
+        with PilImage.open(upload_path) as image:
+            image_format = (image.format or "").lower()
+    except Exception as ex:
+        logger.error(f"The upload isn't the image! ex:{ex}")
+        return False
+    if image_format not in dict(Image.FORMAT_CHOICES).keys():
+        logger.error(f"Invalid format: {image_format}!")
+        return False
+    return True
+
+
+def remove_upload(upload_path: str) -> None:
+    try:
+        os.remove(upload_path)
+    except OSError as ex:
+        logger.debug(f"The upload cannot be removed! ex:{ex}")
+
+
+def save_image_file(image: PilImage.Image, file_path: str) -> None:
+    """
+    Encode the image into the file, the image bigger than IMAGE_MAX_DIMENSION is resized
+    """
+    image_format = image.format
+    if max(image.size) > IMAGE_MAX_DIMENSION:
+        image = image.copy()
+        image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), PilImage.Resampling.LANCZOS, reducing_gap=2.0)
+    image.save(file_path, format=image_format)
+
+
+def save_image_files(upload_path: str, name: str) -> tuple[str, list[dict]]:
+    """
+    Save the uploaded image and its renditions into the storage, in the shard of the name. The valid JPEG image
+    within the limits is stored as it is (only the metadata are dropped) without decoding,
+    the other images are decoded and encoded again.
+    The file is prepared in a local temporary file and moved into the storage, so the readers never see
+    a partial file. The image is the last one, so its file isn't stored without the renditions.
+    :return: tuple[str, list[dict]] - the format and the renditions of the image
+    """
+    with PilImage.open(upload_path) as image:
+        image_format = (image.format or "").lower()
+        if image_format not in dict(Image.FORMAT_CHOICES).keys():
+            raise ValueError(f"Invalid format: {image_format}!")
+        try:
+            info = read_jpeg_info(path=upload_path)
+        except ValueError as ex:
+            # E.g. the trailer of the camera after EOI, the image is decoded and encoded again
+            # and only the image which Pillow can't decode is rejected
+            logger.info(f"The JPEG structure isn't valid, the image is encoded again! ex:{ex}")
+            info = None
+
+    file_name = get_image_file_name(name=name, extension=image_format)
+    tmp_path = get_tmp_file_path(file_name=file_name)
+    renditions = []
+    try:
+        if info and can_pass_through(info=info, max_dimension=IMAGE_MAX_DIMENSION):
+            copy_jpeg(info=info, source_path=upload_path, target_path=tmp_path)
+        else:
+            with PilImage.open(upload_path) as image:
+                save_image_file(image=image, file_path=tmp_path)
+
+        with PilImage.open(tmp_path) as image:
+            # The renditions are smaller, so JPEG is decoded in the reduced scale (1/2, 1/4 or 1/8)
+            image.draft(image.mode, (max(IMAGE_RENDITION_SIZES), max(IMAGE_RENDITION_SIZES)))
+            renditions = create_renditions(image=image, name=name, image_format=image_format)
+
+        get_image_storage().save(file_name=file_name, source_path=tmp_path)
+    except Exception:
+        remove_renditions(name=name, renditions=renditions)
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            remove_upload(upload_path=tmp_path)
+    return image_format, renditions
+
+
+def acquire_image(name: str) -> Image | None:
+    """
+    Take one reference of the existing image with the name
+    :return: Image | None - None if the image doesn't exist
+    """
+    if Image.objects.filter(name=name).update(references=F("references") + 1):
+        return get_image_by_name(_name=name)
+    return None
+
+
+def create_image(name: str, image_format: str, renditions: list[dict]) -> Image:
+    """
+    Create the row of the saved image with one reference
+    :return: Image
+    """
+    try:
+        with transaction.atomic():
+            image = Image(
+                name=name,
+                path=get_image_storage().url(file_name=get_image_file_name(name=name, extension=image_format)),
+                format=image_format,
+                renditions=renditions,
+                references=1,
+            )
+            image.save()
+            return image
+    except IntegrityError:
+        # The same image is created by another job in the meantime
+        return acquire_image(name=name)
+
+
+def process_image_job(job_id: int) -> None:
+    """
+    Save the uploaded image and link it to the animal, the reference of the old image of the animal
+    is released. The images are stored by the content hash, so the upload of the existing image
+    isn't decoded again and reuses the file and the row of the image.
+    """
+    if not claim_image_job(_id=job_id):
+        logger.error(f"The image job {job_id} doesn't exist or it is already taken!")
+        return
+    job = get_image_job_by_id(_id=job_id)
+
+    saved_image = None
+    try:
+        name = get_content_hash(path=job.upload_path)
+        if not get_image_by_name(_name=name):
+            image_format, renditions = save_image_files(upload_path=job.upload_path, name=name)
+            saved_image = Image(name=name, format=image_format, renditions=renditions)
+
+        with transaction.atomic():
+            animal = get_animal_for_update(_id=job.animal_id)
+            if not animal:
+                raise ValueError(f"The animal {job.animal_id} doesn't exist!")
+            if animal.image and animal.image.name == name:
+                image = animal.image
+            else:
+                image = acquire_image(name=name)
+                if not image:
+                    if not saved_image:
+                        # The image is deleted after the check above
+                        image_format, renditions = save_image_files(upload_path=job.upload_path, name=name)
+                        saved_image = Image(name=name, format=image_format, renditions=renditions)
+                    image = create_image(
+                        name=name,
+                        image_format=saved_image.format,
+                        renditions=saved_image.renditions,
+                    )
+                set_animal_image(_id=animal.id, _image_id=image.id)
+                if animal.image:
+                    remove_image(image=animal.image)
+            job.image = image
+            job.status = "done"
+            job.save()
+    except Exception as ex:
+        logger.error(f"The image of the job {job_id} cannot be saved! ex:{ex}")
+        if saved_image and not get_image_by_name(_name=saved_image.name):
+            remove_image_files(image=saved_image)
+        job.status = "failed"
+        job.error = f"{ex}"[:255]
+        job.save()
+    finally:
+        remove_upload(upload_path=job.upload_path)
+
+
+class ImagePipeline:
+    """
+    Bounded pool of the image workers, at most `workers` images are processed at once
+    and at most `queue_size` images are waiting, the next images are rejected.
+    """
+
+    def __init__(self, workers: int = IMAGE_WORKERS, queue_size: int = IMAGE_QUEUE_SIZE):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._futures: dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image")
+            return self._executor
+
+    def _run(self, job_id: int) -> None:
+        try:
+            process_image_job(job_id=job_id)
+        finally:
+            # The worker threads live as long as the pipeline, their connections are reused
+            # like the persistent connections of the requests (CONN_MAX_AGE)
+            close_old_connections()
+
+    def _done(self, job_id: int) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+        self._slots.release()
+
+    def submit(self, job: ImageJob) -> bool:
+        """
+        Put the job into the queue
+        :return: bool - False if the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            return False
+        future = self.executor.submit(self._run, job.id)
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda _: self._done(job_id=job.id))
+        return True
+
+    def resume(self) -> int:
+        """
+        Queue the pending jobs of the previous run of the server, e.g. after the restart or the crash,
+        the jobs which don't fit into the queue wait for the next call (see the command resume_image_jobs).
+        Every job is claimed atomically by its worker, the job queued by more processes is processed once.
+        :return: int - the number of the queued jobs
+        """
+        queued = 0
+        for job_id in get_pending_image_job_ids():
+            if not self.submit(job=ImageJob(id=job_id)):
+                logger.error(f"The queue is full, the pending image jobs from {job_id} aren't resumed!")
+                break
+            queued += 1
+        return queued
+
+    def wait(self, job_id: int, timeout: float | None = None) -> None:
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future:
+            future.result(timeout=timeout)
+
+    def wait_all(self) -> None:
+        with self._lock:
+            futures = list(self._futures.values())
+        for future in futures:
+            future.result()
+
+
+image_pipeline = ImagePipeline()
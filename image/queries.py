@@ -1,5 +1,36 @@
-from image.models import Image
+from django.utils import timezone
+
+from image.models import (
+    Image,
+    ImageJob,
+)
 
 
 def get_image_by_id(_id: int) -> Image | None:
     return Image.objects.filter(id=_id).first()
+
+
+def get_image_by_name(_name: str) -> Image | None:
+    return Image.objects.filter(name=_name).first()
+
+
+def get_images_by_names(_names: set[str]) -> dict[str, Image]:
+    return Image.objects.in_bulk(_names, field_name="name")
+
+
+def get_image_job_by_id(_id: int) -> ImageJob | None:
+    return ImageJob.objects.filter(id=_id).first()
+
+
+def get_pending_image_job_ids() -> list[int]:
+    return list(ImageJob.objects.filter(status="pending").order_by("id").values_list("id", flat=True))
+
+
+def claim_image_job(_id: int) -> bool:
+    """
+    Move the pending job to processing, only one worker (also of another process) takes the job
+    :return: bool - False if the job doesn't exist or it is already taken
+    """
+    return bool(
+        ImageJob.objects.filter(id=_id, status="pending").update(status="processing", modified_at=timezone.now())
+    )
@@ -0,0 +1,80 @@
+import logging
+import os
+
+from PIL import Image as PilImage
+from PIL import features
+
+from image.helper import (
+    get_rendition_file_name,
+    get_tmp_file_path,
+    remove_renditions,
+)
+from image.storage import get_image_storage
+from pet_shop.settings import (
+    IMAGE_RENDITION_EXTRA_FORMATS,
+    IMAGE_RENDITION_QUALITY,
+    IMAGE_RENDITION_SIZES,
+)
+
+logger = logging.getLogger(__name__)
+
+# The modes which can be saved as WebP, the other modes are converted to RGB
+WEBP_MODES = ["RGB", "RGBA"]
+
+
+def get_rendition_formats(image_format: str) -> list[str]:
+    formats = [image_format]
+    for extra_format in IMAGE_RENDITION_EXTRA_FORMATS:
+        if not features.check(extra_format):
+            logger.warning(f"The format {extra_format} isn't supported by Pillow, the renditions are skipped!")
+            continue
+        formats.append(extra_format)
+    return formats
+
+
+def save_rendition(image: PilImage.Image, file_name: str, rendition_format: str) -> None:
+    tmp_path = get_tmp_file_path(file_name=file_name)
+    try:
+        if rendition_format == "webp":
+            if image.mode not in WEBP_MODES:
+                image = image.convert("RGB")
+            image.save(tmp_path, format="WEBP", quality=IMAGE_RENDITION_QUALITY, method=4)
+        else:
+            image.save(tmp_path, format="JPEG", quality=IMAGE_RENDITION_QUALITY, optimize=True)
+        get_image_storage().save(file_name=file_name, source_path=tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def create_renditions(image: PilImage.Image, name: str, image_format: str) -> list[dict]:
+    """
+    Save the smaller copies of the image into the storage next to the image. Every size is resized from
+    the previous (bigger) rendition instead of the full image, so only the first resize reads all pixels.
+    If some rendition cannot be saved, the saved renditions are removed.
+    :return: list[dict] - the renditions from the smallest, they are stored as Image.renditions
+    """
+    renditions = []
+    source = image
+    try:
+        for size in sorted(IMAGE_RENDITION_SIZES, reverse=True):
+            if max(image.size) <= size:
+                # The image isn't upscaled
+                continue
+            resized = source.copy()
+            resized.thumbnail((size, size), PilImage.Resampling.LANCZOS, reducing_gap=2.0)
+            for rendition_format in get_rendition_formats(image_format=image_format):
+                file_name = get_rendition_file_name(name=name, size=size, rendition_format=rendition_format)
+                save_rendition(image=resized, file_name=file_name, rendition_format=rendition_format)
+                renditions.append({
+                    "size": size,
+                    "format": rendition_format,
+                    "width": resized.width,
+                    "height": resized.height,
+                    "path": get_image_storage().url(file_name=file_name),
+                })
+            source = resized
+    except Exception:
+        remove_renditions(name=name, renditions=renditions)
+        raise
+    return sorted(renditions, key=lambda rendition: (rendition["size"], rendition["format"]))
@@ -1,11 +1,97 @@
 from rest_framework import serializers
 from rest_framework.fields import (
-    ImageField,
+    CharField,
+    ChoiceField,
+    FileField,
     IntegerField,
+    ListField,
 )
 
+from image.models import (
+    Image,
+    ImageJob,
+)
+from pet_shop.settings import MAX_BULK_IMAGES
+
 
 class NewImageSerializer(serializers.Serializer):
 
-    image: ImageField = serializers.ImageField(help_text="The image of the animal")
+    # The image is decoded and validated in the background, see image.pipeline
+    image: FileField = serializers.FileField(help_text="The image of the animal")
     id: IntegerField = serializers.IntegerField(help_text="The ID of the animal record")
+
+
+class ImageRenditionSerializer(serializers.Serializer):
+    size: IntegerField = serializers.IntegerField(help_text="The maximal size (px) of the longest side")
+    format: CharField = serializers.CharField(help_text="The format of the file, e.g. jpeg or webp")
+    width: IntegerField = serializers.IntegerField(help_text="The width (px)")
+    height: IntegerField = serializers.IntegerField(help_text="The height (px)")
+    path: CharField = serializers.CharField(help_text="The URL of the file")
+
+
+class ImageJobImageSerializer(serializers.HyperlinkedModelSerializer):
+    renditions = ImageRenditionSerializer(many=True, help_text="The smaller copies of the image from the smallest")
+
+    class Meta:
+        model = Image
+        fields = [
+            "id",
+            "path",
+            "renditions",
+        ]
+
+
+class ImageJobSerializer(serializers.HyperlinkedModelSerializer):
+    status: ChoiceField = serializers.ChoiceField(
+        choices=ImageJob.STATUS_CHOICES,
+        help_text="The status of the processing, could be pending/processing/done/failed",
+    )
+    animal_id: IntegerField = serializers.IntegerField(help_text="The ID of the animal record")
+    image = ImageJobImageSerializer(many=False, help_text="The created image when the status is done")
+    error: CharField = serializers.CharField(help_text="The reason of the failure when the status is failed")
+
+    class Meta:
+        model = ImageJob
+        fields = [
+            "id",
+            "created_at",
+            "modified_at",
+            "status",
+            "animal_id",
+            "image",
+            "error",
+        ]
+
+
+class BulkNewImageSerializer(serializers.Serializer):
+
+    images: ListField = serializers.ListField(
+        child=serializers.FileField(),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_BULK_IMAGES,
+        help_text="The images named by the ID of the animal record, e.g. 15.jpeg")
+    archive: FileField = serializers.FileField(
+        required=False, help_text="The zip archive of the images named by the ID of the animal record")
+
+    def validate(self, attrs):
+        if bool(attrs.get("images")) == bool(attrs.get("archive")):
+            raise serializers.ValidationError("The images or the archive is required!")
+        return attrs
+
+
+class BulkImageItemSerializer(serializers.Serializer):
+    index: IntegerField = serializers.IntegerField(help_text="The position of the image in the request or the archive")
+    file_name: CharField = serializers.CharField(help_text="The file name of the image")
+    animal_id: IntegerField = serializers.IntegerField(
+        allow_null=True, help_text="The ID of the animal record from the file name")
+    status: ChoiceField = serializers.ChoiceField(
+        choices=[("done", "Done"), ("failed", "Failed")], help_text="The result of the image, could be done/failed")
+    image = ImageJobImageSerializer(many=False, allow_null=True, help_text="The image of the animal when it is done")
+    error: CharField = serializers.CharField(allow_null=True, help_text="The reason of the failure")
+
+
+class BulkNewImageResultSerializer(serializers.Serializer):
+    linked: IntegerField = serializers.IntegerField(help_text="The number of the animals with the new image")
+    failed: IntegerField = serializers.IntegerField(help_text="The number of the failed images")
+    items = BulkImageItemSerializer(many=True)
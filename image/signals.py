@@ -0,0 +1,13 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from image.models import Image
+from pet_shop.conditional import bump_table_version
+
+
+@receiver([post_save, post_delete], sender=Image)
+def bump_image_version(sender, **kwargs):
+    bump_table_version(Image)
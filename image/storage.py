@@ -0,0 +1,431 @@
+import abc
+import datetime
+import hashlib
+import hmac
+import http.client
+import logging
+import mimetypes
+import os
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import (
+    quote,
+    urlsplit,
+)
+from xml.etree import ElementTree
+
+from django.utils.crypto import get_random_string
+
+from pet_shop import settings
+from pet_shop.settings import (
+    DEFAULT_MEDIA_URL,
+    IMAGE_STORAGE_BACKEND,
+    S3_ACCESS_KEY,
+    S3_BUCKET,
+    S3_ENDPOINT_URL,
+    S3_PART_SIZE,
+    S3_POOL_SIZE,
+    S3_REGION,
+    S3_SECRET_KEY,
+    S3_UPLOAD_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+S3_XML_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+S3_LIST_PAGE_SIZE = 1000
+
+
+class StorageError(Exception):
+    pass
+
+
+class ImageStorage(abc.ABC):
+    """
+    The storage of the image files, the file names are relative (ab/cd/<hash>.jpeg).
+    The files are prepared in a local temporary file and moved into the storage by save.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def url(self, file_name: str) -> str:
+        return f"{self.base_url}{file_name}"
+
+    @abc.abstractmethod
+    def save(self, file_name: str, source_path: str) -> None:
+        """
+        Move the local file into the storage, the local file is removed.
+        It returns after the file is stored, the caller links the file right after.
+        """
+
+    @abc.abstractmethod
+    def delete(self, file_name: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def exists(self, file_name: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def read(self, file_name: str) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def iter_files(self) -> Iterator[tuple[str, float]]:
+        """
+        Stream all files of the storage without loading the whole listing
+        :return: Iterator[tuple[str, float]] - the file name and the timestamp of the last modification
+        """
+
+
+class FileSystemStorage(ImageStorage):
+    """
+    The files are stored in MEDIA_ROOT and served by image.media.serve_media
+    """
+
+    def __init__(self, root: str, base_url: str):
+        super().__init__(base_url=base_url)
+        self.root = root
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.root, file_name)
+
+    def save(self, file_name: str, source_path: str) -> None:
+        file_path = self.path(file_name=file_name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        try:
+            # The rename is atomic and without a copy if both paths are on the same filesystem
+            os.replace(source_path, file_path)
+        except OSError:
+            tmp_path = f"{file_path}.{get_random_string(length=8)}.tmp"
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, file_path)
+            os.remove(source_path)
+
+    def delete(self, file_name: str) -> bool:
+        try:
+            os.remove(self.path(file_name=file_name))
+            return True
+        except OSError as ex:
+            logger.debug(f"The file {file_name} cannot be removed! ex:{ex}")
+            return False
+
+    def exists(self, file_name: str) -> bool:
+        return os.path.isfile(self.path(file_name=file_name))
+
+    def read(self, file_name: str) -> bytes:
+        with open(self.path(file_name=file_name), "rb") as file:
+            return file.read()
+
+    def iter_files(self) -> Iterator[tuple[str, float]]:
+        directories = [self.root]
+        while directories:
+            directory = directories.pop()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield os.path.relpath(entry.path, self.root), entry.stat().st_mtime
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP connections to the object store, at most `size` connections are open
+    and the requests wait for a free connection
+    """
+
+    def __init__(self, endpoint_url: str, size: int, timeout: float = 30):
+        endpoint = urlsplit(endpoint_url)
+        self.scheme = endpoint.scheme
+        self.host = endpoint.hostname
+        self.port = endpoint.port
+        self.timeout = timeout
+        self._connections = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _create(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                connection = self._connections.get_nowait()
+            except queue.Empty:
+                connection = self._create()
+            try:
+                yield connection
+            except Exception:
+                # The state of the connection is unknown
+                connection.close()
+                raise
+            self._connections.put_nowait(connection)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def get_query_string(query: dict[str, str]) -> str:
+    return "&".join(f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}" for name, value in query.items())
+
+
+def sign_request(
+        method: str,
+        path: str,
+        query: dict[str, str],
+        headers: dict[str, str],
+        payload_hash: str,
+        access_key: str,
+        secret_key: str,
+        region: str,
+        now: datetime.datetime,
+) -> str:
+    """
+    AWS Signature Version 4 of the request, the headers have to contain host and x-amz-date
+    :return: str - the value of the Authorization header
+    """
+    date = now.strftime("%Y%m%d")
+    scope = f"{date}/{region}/s3/aws4_request"
+    signed_headers = ";".join(sorted(name.lower() for name in headers))
+    canonical_headers = "".join(
+        f"{name.lower()}:{' '.join(str(value).split())}\n"
+        for name, value in sorted(headers.items(), key=lambda header: header[0].lower())
+    )
+    canonical_query = get_query_string(query=dict(sorted(query.items())))
+    canonical_request = "\n".join([
+        method,
+        quote(path, safe="/-_.~"),
+        canonical_query,
+        canonical_headers,
+        signed_headers,
+        payload_hash,
+    ])
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        headers["x-amz-date"],
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    key = f"AWS4{secret_key}".encode()
+    for part in [date, region, "s3", "aws4_request"]:
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    return f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, SignedHeaders={signed_headers}, Signature={signature}"
+
+
+class S3Storage(ImageStorage):
+    """
+    The files are stored in the bucket of S3 compatible object store (AWS S3, MinIO...) with the path-style URLs.
+    The files bigger than part_size are uploaded by the multipart upload with the parts uploaded in parallel.
+    """
+
+    def __init__(
+            self,
+            endpoint_url: str,
+            bucket: str,
+            access_key: str,
+            secret_key: str,
+            region: str,
+            base_url: str,
+            pool_size: int = S3_POOL_SIZE,
+            part_size: int = S3_PART_SIZE,
+            workers: int = S3_UPLOAD_WORKERS,
+    ):
+        super().__init__(base_url=base_url)
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = part_size
+        self.pool = ConnectionPool(endpoint_url=endpoint_url, size=pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3")
+
+    def _request(
+            self,
+            method: str,
+            file_name: str = "",
+            query: dict[str, str] | None = None,
+            body: bytes = b"",
+            headers: dict[str, str] | None = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        query = query or {}
+        path = f"/{self.bucket}/{file_name}" if file_name else f"/{self.bucket}"
+        payload_hash = hashlib.sha256(body).hexdigest()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        headers = {
+            **(headers or {}),
+            "host": urlsplit(self.endpoint_url).netloc,
+            "x-amz-date": now.strftime("%Y%m%dT%H%M%SZ"),
+            "x-amz-content-sha256": payload_hash,
+        }
+        headers["Authorization"] = sign_request(
+            method=method,
+            path=path,
+            query=query,
+            headers=headers,
+            payload_hash=payload_hash,
+            access_key=self.access_key,
+            secret_key=self.secret_key,
+            region=self.region,
+            now=now,
+        )
+        url = quote(path, safe="/-_.~")
+        if query:
+            url = f"{url}?{get_query_string(query=query)}"
+
+        # The kept connection could be closed by the server, the request is repeated once with the new one
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as connection:
+                    connection.request(method, url, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    return response.status, dict(response.getheaders()), data
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if attempt:
+                    raise
+
+    def _check(self, status: int, data: bytes, action: str) -> None:
+        if status >= 300:
+            raise StorageError(f"{action} failed with the status {status}: {data[:200]!r}")
+
+    def save(self, file_name: str, source_path: str) -> None:
+        """
+        Upload the local file, the big file is uploaded by the parts in parallel, but the call blocks
+        until all parts are uploaded, so it is called by the worker threads of the image pipeline and the bulk upload
+        """
+        content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        try:
+            size = os.path.getsize(source_path)
+            if size <= self.part_size:
+                with open(source_path, "rb") as file:
+                    status, _, data = self._request(
+                        method="PUT",
+                        file_name=file_name,
+                        body=file.read(),
+                        headers={"Content-Type": content_type},
+                    )
+                self._check(status=status, data=data, action=f"The upload of {file_name}")
+            else:
+                self._save_multipart(file_name=file_name, source_path=source_path, size=size, content_type=content_type)
+        finally:
+            os.remove(source_path)
+
+    def _save_multipart(self, file_name: str, source_path: str, size: int, content_type: str) -> None:
+        status, _, data = self._request(
+            method="POST",
+            file_name=file_name,
+            query={"uploads": ""},
+            headers={"Content-Type": content_type},
+        )
+        self._check(status=status, data=data, action=f"The multipart upload of {file_name}")
+        upload_id = ElementTree.fromstring(data).findtext(f"{S3_XML_NAMESPACE}UploadId")
+
+        def upload_part(part_number: int) -> str:
+            with open(source_path, "rb") as file:
+                file.seek((part_number - 1) * self.part_size)
+                body = file.read(self.part_size)
+            part_status, part_headers, part_data = self._request(
+                method="PUT",
+                file_name=file_name,
+                query={"partNumber": f"{part_number}", "uploadId": upload_id},
+                body=body,
+            )
+            self._check(status=part_status, data=part_data, action=f"The part {part_number} of {file_name}")
+            return {name.lower(): value for name, value in part_headers.items()}["etag"]
+
+        part_numbers = range(1, (size + self.part_size - 1) // self.part_size + 1)
+        try:
+            etags = list(self._executor.map(upload_part, part_numbers))
+            body = "".join(
+                f"<Part><PartNumber>{part_number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for part_number, etag in zip(part_numbers, etags)
+            )
+            status, _, data = self._request(
+                method="POST",
+                file_name=file_name,
+                query={"uploadId": upload_id},
+                body=f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode(),
+            )
+            self._check(status=status, data=data, action=f"The completion of {file_name}")
+        except Exception:
+            self._request(method="DELETE", file_name=file_name, query={"uploadId": upload_id})
+            raise
+
+    def delete(self, file_name: str) -> bool:
+        try:
+            status, _, _ = self._request(method="DELETE", file_name=file_name)
+        except OSError as ex:
+            logger.debug(f"The file {file_name} cannot be removed! ex:{ex}")
+            return False
+        return status in (200, 204)
+
+    def exists(self, file_name: str) -> bool:
+        status, _, _ = self._request(method="HEAD", file_name=file_name)
+        return status == 200
+
+    def read(self, file_name: str) -> bytes:
+        status, _, data = self._request(method="GET", file_name=file_name)
+        self._check(status=status, data=data, action=f"The download of {file_name}")
+        return data
+
+    def iter_files(self) -> Iterator[tuple[str, float]]:
+        # The listing is read by the pages of S3_LIST_PAGE_SIZE objects
+        query = {"list-type": "2", "max-keys": f"{S3_LIST_PAGE_SIZE}"}
+        while True:
+            status, _, data = self._request(method="GET", query=query)
+            self._check(status=status, data=data, action="The listing of the bucket")
+            result = ElementTree.fromstring(data)
+            for content in result.iter(f"{S3_XML_NAMESPACE}Contents"):
+                modified_at = datetime.datetime.fromisoformat(content.findtext(f"{S3_XML_NAMESPACE}LastModified"))
+                yield content.findtext(f"{S3_XML_NAMESPACE}Key"), modified_at.timestamp()
+            token = result.findtext(f"{S3_XML_NAMESPACE}NextContinuationToken")
+            if result.findtext(f"{S3_XML_NAMESPACE}IsTruncated") != "true" or not token:
+                return
+            query = {**query, "continuation-token": token}
+
+
+def create_storage(backend: str) -> ImageStorage:
+    if backend == "filesystem":
+        return FileSystemStorage(root=settings.MEDIA_ROOT, base_url=DEFAULT_MEDIA_URL)
+    if backend == "s3":
+        return S3Storage(
+            endpoint_url=S3_ENDPOINT_URL,
+            bucket=S3_BUCKET,
+            access_key=S3_ACCESS_KEY,
+            secret_key=S3_SECRET_KEY,
+            region=S3_REGION,
+            base_url=DEFAULT_MEDIA_URL,
+        )
+    raise ValueError(f"Invalid storage backend: {backend}!")
+
+
+_storage: ImageStorage | None = None
+_storage_lock = threading.Lock()
+
+
+def get_image_storage() -> ImageStorage:
+    """
+    The storage of IMAGE_STORAGE_BACKEND, it is created on the first use
+    :return: ImageStorage
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage(backend=IMAGE_STORAGE_BACKEND)
+        return _storage
@@ -0,0 +1,64 @@
+import logging
+
+from django.core.files.uploadhandler import (
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from rest_framework.parsers import MultiPartParser
+
+from pet_shop.settings import MAX_IMAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# The room for the other fields and the boundaries of the multipart body
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def get_max_upload_size() -> int:
+    return int(MAX_IMAGE_SIZE * 1024 * 1024)
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream the uploaded file into a temporary file in FILE_UPLOAD_TEMP_DIR (UPLOAD_ROOT) instead of
+    the memory, so it can be moved into place without a copy. The upload is stopped as soon as
+    it is bigger than MAX_IMAGE_SIZE, also for the chunked requests without Content-Length.
+    """
+
+    def __init__(self, request=None, max_size: int | None = None):
+        super().__init__(request=request)
+        self.max_size = max_size if max_size is not None else get_max_upload_size()
+        self.received = 0
+        self.too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            # The body isn't read at all
+            logger.error(f"The request has the size: {content_length} higher than maximum size!")
+            self.too_large = True
+            return QueryDict(encoding=encoding), MultiValueDict()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            logger.error(f"The image has the size higher than maximum size: {self.max_size}!")
+            self.too_large = True
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data=raw_data, start=start)
+
+
+class ImageMultiPartParser(MultiPartParser):
+    """
+    MultiPartParser with ImageUploadHandler as the only upload handler,
+    the handler is available as request.image_upload_handler.
+    The view can raise the limit of the upload by the attribute max_upload_size (bytes).
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        max_size = getattr(parser_context.get("view"), "max_upload_size", None)
+        request.image_upload_handler = ImageUploadHandler(request=request, max_size=max_size)
+        request.upload_handlers = [request.image_upload_handler]
+        return super().parse(stream=stream, media_type=media_type, parser_context=parser_context)
@@ -1,11 +1,15 @@
 from django.urls import path
 
 from image.views import (
+    BulkNewImageApiView,
     NewImageApiView,
     DeleteImageApiView,
+    ImageJobApiView,
 )
 
 urlpatterns = [
     path('new', NewImageApiView.as_view(), name="new_image"),
+    path('bulk', BulkNewImageApiView.as_view(), name="bulk_new_images"),
     path('<int:_id>/delete', DeleteImageApiView.as_view(), name="delete_image"),
+    path('jobs/<int:_id>', ImageJobApiView.as_view(), name="get_image_job"),
 ]
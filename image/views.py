@@ -1,24 +1,40 @@
 import logging
-import os
+import zipfile
 
-from PIL import Image as PilImage
-from django.utils.crypto import get_random_string
 from drf_spectacular.utils import extend_schema
-from rest_framework.decorators import parser_classes
-from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from animal.queries import get_animal_by_id
-from image.helper import remove_image
-from image.models import Image
-from image.queries import get_image_by_id
-from image.serializers import NewImageSerializer
-from pet_shop import settings
+from image.bulk import (
+    BulkImageUpload,
+    get_archive_items,
+    get_multipart_items,
+)
+from image.helper import remove_image_files
+from image.models import ImageJob
+from image.pipeline import (
+    image_pipeline,
+    remove_upload,
+    save_upload,
+    verify_upload,
+)
+from image.queries import (
+    get_image_by_id,
+    get_image_job_by_id,
+)
+from image.serializers import (
+    BulkNewImageResultSerializer,
+    BulkNewImageSerializer,
+    ImageJobSerializer,
+    NewImageSerializer,
+)
+from image.upload_handlers import ImageMultiPartParser
 from pet_shop.error_messages import *
 from pet_shop.ok_messages import *
 from pet_shop.settings import (
-    DEFAULT_MEDIA_URL,
+    MAX_BULK_IMAGES,
+    MAX_BULK_IMAGE_UPLOAD_SIZE,
     MAX_IMAGE_SIZE,
 )
 
@@ -26,25 +42,34 @@ logger = logging.getLogger(__name__)
 
 
 class NewImageApiView(APIView):
+    parser_classes = [ImageMultiPartParser]
 
     @extend_schema(
         methods=["post"],
         description=f"""
             - An endpoint to create new image for some animal.
             - If one of the body data is wrong it will return an error 400 - {WRONG_DATA}
+            - The image bigger than {MAX_IMAGE_SIZE} MB or not JPG/JPEG image will return an error 400 - {WRONG_DATA},
+              the big image is rejected by Content-Length or while it is uploading.
+            - The image is processed in the background, the endpoint returns the job of the processing (202)
+              and the status of the job can be checked by the endpoint images/jobs/<id>.
+            - If too many images are processing it will return an error 503 - {IMAGE_PROCESSING_BUSY}
             - Adding new image on some animal that has the image, old image will be deleted and new will be created.
             - To use binary field (button) change the body from application/json to multipart/form-data
             """,
         request=NewImageSerializer(many=False),
         responses={
-            201: {"description": IMAGE_SUCCESSFULLY_CREATED},
+            202: ImageJobSerializer(many=False),
             400: {"description": WRONG_DATA},
+            503: {"description": IMAGE_PROCESSING_BUSY},
         },
     )
-    @parser_classes([MultiPartParser])
     def post(self, request, *args, **kwargs):
 
         data = NewImageSerializer(data=request.data)
+        upload_handler = getattr(request, "image_upload_handler", None)
+        if upload_handler and upload_handler.too_large:
+            return Response(WRONG_DATA, status=400)
         if not data.is_valid():
             logger.error("The data is wrong!")
             return Response(WRONG_DATA, status=400)
@@ -58,30 +83,114 @@ class NewImageApiView(APIView):
         if size_in_mb > MAX_IMAGE_SIZE:
             logger.error(f"The image has the size: {size_in_mb} higher than maximum size!")
             return Response(WRONG_DATA, status=400)
-        file_name = get_random_string(length=64)
+
         try:
-            image = PilImage.open(data.validated_data.get("image"))
-            image_format = image.format.lower()
-            file_path = os.path.join(settings.MEDIA_ROOT, f"{file_name}.{image_format}")
-            image.save(file_path)
-            path = f"{DEFAULT_MEDIA_URL}{file_name}.{image_format}"
-            new_image = Image(
-                name=file_name,
-                path=path,
-                format=image_format,
-            )
-            new_image.save()
-        except Exception as ex:
-            logger.error(f"The image cannot be saved! ex:{ex}")
+            upload_path = save_upload(upload=data.validated_data.get("image"))
+        except OSError as ex:
+            logger.error(f"The upload cannot be saved! ex:{ex}")
+            return Response(WRONG_DATA, status=400)
+        if not verify_upload(upload_path=upload_path):
+            remove_upload(upload_path=upload_path)
+            return Response(WRONG_DATA, status=400)
+
+        job = ImageJob(
+            animal=animal,
+            upload_path=upload_path,
+        )
+        job.save()
+
+        if not image_pipeline.submit(job=job):
+            logger.error(f"The image job {job.id} is rejected, the queue is full!")
+            remove_upload(upload_path=upload_path)
+            job.delete()
+            return Response(IMAGE_PROCESSING_BUSY, status=503)
+
+        return Response(ImageJobSerializer(job, many=False).data, status=202)
+
+
+class BulkNewImageApiView(APIView):
+    parser_classes = [ImageMultiPartParser]
+    max_upload_size = int(MAX_BULK_IMAGE_UPLOAD_SIZE * 1024 * 1024)
+
+    @extend_schema(
+        methods=["post"],
+        description=f"""
+            - An endpoint to add the images to many animals at once (at most {MAX_BULK_IMAGES} per request).
+            - The images are sent as the files of the field images or as one zip archive in the field archive,
+            every image is named by the ID of the animal record, e.g. 15.jpeg.
+            - The images are processed in parallel while the archive is extracted and all animals are linked 
+            to their images in one transaction. The result of every image is in the report, 
+            the failed images are reported with the reason and the other images are saved.
+            - The request bigger than {MAX_BULK_IMAGE_UPLOAD_SIZE} MB, the image bigger than {MAX_IMAGE_SIZE} MB 
+            or not JPG/JPEG image is failed.
+            - If the body is wrong, the archive is invalid or has too many images 
+            it will return an error 400 - {WRONG_DATA}
+            - To use binary field (button) change the body from application/json to multipart/form-data
+            """,
+        request=BulkNewImageSerializer(many=False),
+        responses={
+            200: BulkNewImageResultSerializer(many=False),
+            400: {"description": WRONG_DATA},
+        },
+    )
+    def post(self, request, *args, **kwargs):
+
+        data = BulkNewImageSerializer(data=request.data)
+        upload_handler = getattr(request, "image_upload_handler", None)
+        if upload_handler and upload_handler.too_large:
+            return Response(WRONG_DATA, status=400)
+        if not data.is_valid():
+            logger.error("The data is wrong!")
             return Response(WRONG_DATA, status=400)
 
-        if animal.image:
-            if remove_image(path=f"{animal.image.name}.{animal.image.format}"):
-                animal.image.delete()
-        animal.image = new_image
-        animal.save()
+        if data.validated_data.get("images"):
+            items = BulkImageUpload(items=get_multipart_items(uploads=data.validated_data.get("images"))).run()
+        else:
+            try:
+                with zipfile.ZipFile(data.validated_data.get("archive")) as archive:
+                    items = get_archive_items(archive=archive)
+                    if not items or len(items) > MAX_BULK_IMAGES:
+                        logger.error(f"The archive has {len(items)} images!")
+                        return Response(WRONG_DATA, status=400)
+                    items = BulkImageUpload(items=items).run()
+            except zipfile.BadZipFile as ex:
+                logger.error(f"The archive is invalid! ex:{ex}")
+                return Response(WRONG_DATA, status=400)
+
+        failed = sum(1 for item in items if item.error)
+        response = BulkNewImageResultSerializer(
+            instance={
+                "linked": len(items) - failed,
+                "failed": failed,
+                "items": items,
+            },
+            many=False,
+        ).data
+
+        return Response(data=response, status=200)
+
+
+class ImageJobApiView(APIView):
+
+    @extend_schema(
+        methods=["get"],
+        description=f"""
+            - An endpoint to get the status of the image processing (by ID - record of the job).
+            - If non existing job is trying to get it will return an error 404 - {IMAGE_JOB_NOT_FOUND}.
+            """,
+        responses={
+            200: ImageJobSerializer(many=False),
+            404: {"description": IMAGE_JOB_NOT_FOUND},
+        },
+    )
+    def get(self, request, _id, *args, **kwargs):
+
+        job = get_image_job_by_id(_id=_id)
+        if not job:
+            logger.error(f"The image job {_id} doesn't exist!")
+            return Response(data=IMAGE_JOB_NOT_FOUND, status=404)
 
-        return Response(IMAGE_SUCCESSFULLY_CREATED, status=201)
+        return Response(ImageJobSerializer(job, many=False).data, status=200)
 
 
 class DeleteImageApiView(APIView):
@@ -90,6 +199,7 @@ class DeleteImageApiView(APIView):
         methods=["delete"],
         description=f"""
             - An endpoint to delete existing image (by ID - record of the image).
+            - The image is removed from all animals with the same image.
             - If non existing image is trying to delete it will return an error 404 - {IMAGE_NOT_FOUND}.
             """,
         responses={
@@ -103,7 +213,7 @@ class DeleteImageApiView(APIView):
         if not image:
             logger.error(f"The image {_id} doesn't exist!")
             return Response(data=IMAGE_NOT_FOUND, status=404)
-        if not remove_image(path=f"{image.name}.{image.format}"):
+        if not remove_image_files(image=image):
             return Response(WRONG_DATA, status=400)
         image.delete()
 
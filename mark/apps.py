@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MarkConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mark'
+
+    def ready(self):
+        from mark import signals  # noqa: F401
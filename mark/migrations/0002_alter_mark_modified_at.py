@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mark', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mark',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
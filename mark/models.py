@@ -5,7 +5,7 @@ from django.utils import timezone
 class Mark(models.Model):
 
     created_at = models.DateTimeField(default=timezone.now, editable=False)
-    modified_at = models.DateTimeField(default=timezone.now)
+    modified_at = models.DateTimeField(auto_now=True, db_index=True)
     name = models.CharField(max_length=32, unique=True)
 
     def __str__(self):
@@ -1,13 +1,44 @@
+from datetime import datetime
+
 from mark.models import Mark
+from pet_shop.cache import ModelLookupCache
+from pet_shop.routers import read_replica
+
+mark_cache = ModelLookupCache(model=Mark)
 
 
+@read_replica
 def get_mark_by_name(_name: str) -> Mark | None:
     return Mark.objects.filter(name=_name).first()
 
 
 def get_mark_by_id(_id: int) -> Mark | None:
-    return Mark.objects.filter(id=_id).first()
+    return mark_cache.get_by_id(_id=_id)
+
+
+async def aget_mark_by_name(_name: str) -> Mark | None:
+    return await Mark.objects.filter(name=_name).afirst()
+
+
+async def aget_mark_by_id(_id: int) -> Mark | None:
+    return await Mark.objects.filter(id=_id).afirst()
 
 
+async def acreate_mark(_name: str) -> Mark:
+    return await Mark.objects.acreate(name=_name)
+
+
+@read_replica
+def get_existing_mark_ids(_ids: set[int]) -> set[int]:
+    return set(Mark.objects.filter(id__in=_ids).values_list("id", flat=True))
+
+
+@read_replica
 def get_all_marks() -> list[Mark] | None:
     return Mark.objects.all()
+
+
+# The changes are read from the primary database, the next sync starts at synced_at
+# and the rows missing on the lagging replica would be skipped
+def get_marks_modified_since(_modified_since: datetime) -> list[Mark]:
+    return Mark.objects.filter(modified_at__gte=_modified_since).order_by("modified_at", "id")
@@ -3,6 +3,7 @@ from rest_framework.fields import CharField
 
 from mark.models import Mark
 from mark.queries import get_mark_by_name
+from sync.serializers import ChangesSerializer
 
 
 class MarkSerializer(serializers.HyperlinkedModelSerializer):
@@ -17,6 +18,11 @@ class MarkSerializer(serializers.HyperlinkedModelSerializer):
         ]
 
 
+class MarkChangesSerializer(ChangesSerializer):
+
+    changed = MarkSerializer(many=True)
+
+
 class NewMarkSerializer(serializers.Serializer):
 
     name: CharField = serializers.CharField(help_text="The name of the mark")
@@ -1,13 +1,24 @@
 import json
+from datetime import timedelta
+from unittest.mock import patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
 from mark.models import Mark
-from mark.queries import get_mark_by_id
+from mark.queries import (
+    mark_cache,
+    get_mark_by_id,
+)
 from pet_shop.error_messages import *
 from pet_shop.ok_messages import *
+from pet_shop.settings import SYNC_TOMBSTONE_RETENTION
 from pet_shop.tests import (
     BaseTestCase,
+    async_client,
+    call_async,
     client,
 )
 
@@ -36,6 +47,149 @@ class TestMarkListApiView(BaseTestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(content, MARKS_NOT_FOUND)
 
+    def test_get_pass_cursor_pagination(self):
+
+        for number in range(1, 4):
+            mark = Mark(name=f"test_mark_{number}")
+            mark.save()
+
+        response = client.get(path=reverse("all_marks"), data={"page_size": 2})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content), 2)
+        self.assertIn('rel="next"', response.headers.get("Link"))
+
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = client.get(path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content), 1)
+        self.assertEqual(content[0].get("name"), "test_mark_3")
+
+    def test_get_not_modified(self):
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        response = client.get(path=reverse("all_marks"))
+        etag = response.headers.get("ETag")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(etag)
+        self.assertIsNotNone(response.headers.get("Last-Modified"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path=reverse("all_marks"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path=reverse("all_marks"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(json.loads(response.content)[0].get("name"), mark.name)
+
+        response = client.patch(
+            path=reverse("edit_mark", kwargs={'_id': mark.id}),
+            data=json.dumps({"name": "test_mark_updated"}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.get(path=reverse("all_marks"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get("ETag"), etag)
+        self.assertEqual(json.loads(response.content)[0].get("name"), "test_mark_updated")
+
+
+class TestMarkExportApiView(BaseTestCase):
+
+    def test_get_pass(self):
+
+        for number in range(1, 4):
+            mark = Mark(name=f"test_mark_{number}")
+            mark.save()
+
+        response = client.get(path=reverse("export_marks"))
+        content = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(type(content), list)
+        self.assertEqual([mark.get("name") for mark in content], [f"test_mark_{number}" for number in range(1, 4)])
+
+    def test_get_pass_empty(self):
+
+        response = client.get(path=reverse("export_marks"))
+        content = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, [])
+
+
+class TestMarkChangesApiView(BaseTestCase):
+
+    @patch("sync.helper.SYNC_SAFETY_MARGIN", 0)
+    def test_get_pass(self):
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        mark_2 = Mark(name="test_mark_2")
+        mark_2.save()
+
+        modified_since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = client.get(path=reverse("changes_marks"), data={"modified_since": modified_since})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content.get("changed")), 2)
+        self.assertEqual(content.get("deleted"), [])
+
+        synced_at = content.get("synced_at")
+
+        response = client.patch(
+            path=reverse("edit_mark", kwargs={'_id': mark.id}),
+            data=json.dumps({"name": "test_mark_updated"}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.delete(path=reverse("delete_mark", kwargs={'_id': mark_2.id}))
+
+        self.assertEqual(response.status_code, 204)
+
+        response = client.get(path=reverse("changes_marks"), data={"modified_since": synced_at})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([mark.get("name") for mark in content.get("changed")], ["test_mark_updated"])
+        self.assertEqual(content.get("deleted"), [mark_2.id])
+
+    def test_get_full_sync_required(self):
+
+        modified_since = timezone.now() - timedelta(seconds=SYNC_TOMBSTONE_RETENTION + 1)
+        response = client.get(path=reverse("changes_marks"), data={"modified_since": modified_since.isoformat()})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(content, FULL_SYNC_REQUIRED)
+
+    def test_get_wrong_data_without_modified_since(self):
+
+        response = client.get(path=reverse("changes_marks"))
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, WRONG_DATA)
+
 
 class TestNewMarkApiView(BaseTestCase):
 
@@ -207,3 +361,137 @@ class TestMarkApiView(BaseTestCase):
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(content, MARK_NOT_FOUND)
+
+
+class TestMarkCache(BaseTestCase):
+
+    def test_get_mark_by_id_cached(self):
+
+        mark = Mark(name="test_mark")
+        mark.save()
+        mark_cache.reset_stats()
+
+        with CaptureQueriesContext(connection) as queries:
+            first = get_mark_by_id(_id=mark.id)
+            second = get_mark_by_id(_id=mark.id)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(first, mark)
+        self.assertEqual(second, mark)
+        self.assertEqual(mark_cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_get_mark_by_id_invalidated_on_save_and_delete(self):
+
+        mark = Mark(name="test_mark")
+        mark.save()
+        get_mark_by_id(_id=mark.id)
+
+        response = client.patch(
+            path=reverse("edit_mark", kwargs={'_id': mark.id}),
+            data=json.dumps({"name": "test_mark_updated"}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(get_mark_by_id(_id=mark.id).name, "test_mark_updated")
+
+        response = client.delete(path=reverse("delete_mark", kwargs={'_id': mark.id}))
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(get_mark_by_id(_id=mark.id), None)
+
+
+class TestAsyncMarkViews(BaseTestCase):
+
+    def test_get_list_pass(self):
+
+        for number in range(1, 4):
+            mark = Mark(name=f"test_mark_{number}")
+            mark.save()
+
+        response = call_async(async_client.get, path=reverse("all_marks_async"), data={"page_size": 2})
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.get("name") for item in content], ["test_mark_1", "test_mark_2"])
+        self.assertIn('rel="next"', response.headers.get("Link"))
+
+        next_link = response.headers.get("Link").split(">")[0].lstrip("<")
+        response = call_async(async_client.get, path=next_link)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.get("name") for item in content], ["test_mark_3"])
+        self.assertIn('rel="prev"', response.headers.get("Link"))
+
+    def test_get_list_not_found(self):
+
+        response = call_async(async_client.get, path=reverse("all_marks_async"))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), MARKS_NOT_FOUND)
+
+    def test_get_pass(self):
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        response = call_async(async_client.get, path=reverse("get_mark_async", kwargs={"_id": mark.id}))
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        response = client.get(path=reverse("get_mark", kwargs={"_id": mark.id}))
+        self.assertEqual(content, json.loads(response.content))
+
+        response = call_async(async_client.get, path=reverse("get_mark_async", kwargs={"_id": 100}))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), MARK_NOT_FOUND)
+
+    def test_post_pass(self):
+
+        response = call_async(
+            async_client.post,
+            path=reverse("new_mark_async"),
+            data=json.dumps({"name": "test_mark"}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), MARK_SUCCESSFULLY_CREATED)
+        self.assertEqual(Mark.objects.get().name, "test_mark")
+
+    def test_post_wrong_data(self):
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        for data in ("not_json", json.dumps({}), json.dumps({"name": "test_mark"})):
+            with self.subTest(data=data):
+                response = call_async(
+                    async_client.post,
+                    path=reverse("new_mark_async"),
+                    data=data,
+                    content_type="application/json",
+                )
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content), WRONG_DATA)
+        self.assertEqual(Mark.objects.count(), 1)
+
+    def test_post_wrong_data_created_after_check(self):
+
+        mark = Mark(name="test_mark")
+        mark.save()
+
+        with patch("mark.views.aget_mark_by_name", return_value=None):
+            response = call_async(
+                async_client.post,
+                path=reverse("new_mark_async"),
+                data=json.dumps({"name": "test_mark"}),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), WRONG_DATA)
+        self.assertEqual(Mark.objects.count(), 1)
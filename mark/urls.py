@@ -1,18 +1,28 @@
 from django.urls import path
 
 from mark.views import (
+    AsyncMarkListView,
+    AsyncMarkView,
+    AsyncNewMarkView,
     MarkApiView,
     DeleteMarkApiView,
     EditMarkApiView,
     NewMarkApiView,
     MarkListApiView,
+    MarkExportApiView,
+    MarkChangesApiView,
 )
 
 
 urlpatterns = [
     path('', MarkListApiView.as_view(), name="all_marks"),
+    path('export', MarkExportApiView.as_view(), name="export_marks"),
+    path('changes', MarkChangesApiView.as_view(), name="changes_marks"),
     path('new', NewMarkApiView.as_view(), name="new_mark"),
     path('<int:_id>', MarkApiView.as_view(), name="get_mark"),
     path('<int:_id>/edit', EditMarkApiView.as_view(), name="edit_mark"),
     path('<int:_id>/delete', DeleteMarkApiView.as_view(), name="delete_mark"),
+    path('async', AsyncMarkListView.as_view(), name="all_marks_async"),
+    path('async/new', AsyncNewMarkView.as_view(), name="new_mark_async"),
+    path('async/<int:_id>', AsyncMarkView.as_view(), name="get_mark_async"),
 ]
@@ -1,21 +1,42 @@
 import logging
 
+from django.db import IntegrityError
 from drf_spectacular.utils import extend_schema
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from mark.models import Mark
 from mark.queries import (
+    acreate_mark,
+    aget_mark_by_id,
+    aget_mark_by_name,
     get_all_marks,
     get_mark_by_id,
+    get_marks_modified_since,
 )
 from mark.serializers import (
+    MarkChangesSerializer,
     MarkSerializer,
     NewMarkSerializer,
     EditMarkSerializer,
 )
+from pet_shop.async_views import AsyncApiView
+from pet_shop.coalescing import run_write
+from pet_shop.conditional import conditional_get
 from pet_shop.error_messages import *
 from pet_shop.ok_messages import *
+from pet_shop.pagination import (
+    CURSOR_PAGINATION_PARAMETERS,
+    IdCursorPagination,
+)
+from pet_shop.streaming import streaming_json_response
+from sync.helper import (
+    MODIFIED_SINCE_PARAMETER,
+    get_synced_at,
+    is_full_sync_required,
+    parse_modified_since,
+)
+from sync.queries import get_deleted_ids_since
 
 logger = logging.getLogger(__name__)
 
@@ -26,21 +47,94 @@ class MarkListApiView(APIView):
         methods=["get"],
         description=f"""
             - An endpoint to retrieve all existing marks.
+            - The marks are paginated by ID, the cursors of the next/previous page are in the Link header.
+            - The response has ETag and Last-Modified headers, if the marks aren't changed since then 
+            the request with If-None-Match or If-Modified-Since header will return 304 - Not Modified.
             - If there is no marks it will return an error 404 - {MARKS_NOT_FOUND}
             """,
+        parameters=CURSOR_PAGINATION_PARAMETERS,
         responses={
             200: MarkSerializer(many=True),
+            304: {"description": NOT_MODIFIED},
             404: {"description": MARKS_NOT_FOUND},
         },
     )
+    @conditional_get(Mark)
     def get(self, request, *args, **kwargs):
 
-        marks = get_all_marks()
+        paginator = IdCursorPagination()
+        marks = paginator.paginate_queryset(get_all_marks(), request, view=self)
         if not marks:
             return Response(MARKS_NOT_FOUND, status=404)
         response = MarkSerializer(instance=marks, many=True).data
 
-        return Response(data=response, status=200)
+        return paginator.get_paginated_response(response)
+
+
+class MarkExportApiView(APIView):
+
+    @extend_schema(
+        methods=["get"],
+        description="""
+            - An endpoint to export all existing marks at once.
+            - The response is streamed as a JSON array, the marks are serialized in chunks.
+            - If there is no marks it will return an empty list.
+            """,
+        responses={
+            200: MarkSerializer(many=True),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+
+        return streaming_json_response(queryset=get_all_marks(), serializer_class=MarkSerializer)
+
+
+class MarkChangesApiView(APIView):
+
+    @extend_schema(
+        methods=["get"],
+        description=f"""
+            - An endpoint for incremental sync, it retrieves the marks created or edited since modified_since 
+            and IDs of the marks deleted since modified_since.
+            - The next sync should use synced_at of the response as modified_since. synced_at is earlier than 
+            the time of the request by the safety margin, so the marks changed shortly before the sync are 
+            returned by the next sync again, the client should update them by ID.
+            - The changed marks are paginated by the time of the modification, the cursor of the next page 
+            is in the Link header. The deleted IDs are returned with the first page only and the next sync 
+            should use synced_at of the first page.
+            - If modified_since is missing or it isn't valid datetime it will return an error 400 - {WRONG_DATA}
+            - The deletions are kept for SYNC_TOMBSTONE_RETENTION, if modified_since is older it will return 
+            an error 410 - {FULL_SYNC_REQUIRED}.
+            """,
+        parameters=[MODIFIED_SINCE_PARAMETER] + CURSOR_PAGINATION_PARAMETERS,
+        responses={
+            200: MarkChangesSerializer(many=False),
+            400: {"description": WRONG_DATA},
+            410: {"description": FULL_SYNC_REQUIRED},
+        },
+    )
+    def get(self, request, *args, **kwargs):
+
+        modified_since = parse_modified_since(value=request.query_params.get("modified_since"))
+        if not modified_since:
+            logger.error(f"Invalid modified_since: {request.query_params.get("modified_since")}!")
+            return Response(WRONG_DATA, status=400)
+        if is_full_sync_required(modified_since=modified_since):
+            logger.error(f"The deletions since {modified_since} aren't kept!")
+            return Response(FULL_SYNC_REQUIRED, status=410)
+
+        synced_at = get_synced_at()
+        paginator = IdCursorPagination(ordering="modified_at")
+        changed = paginator.paginate_queryset(
+            get_marks_modified_since(_modified_since=modified_since), request, view=self)
+        # The next pages are read after synced_at of the first page, their deletions come with the next sync
+        deleted = [] if paginator.cursor else get_deleted_ids_since(_model=Mark, _deleted_since=modified_since)
+        response = MarkChangesSerializer(
+            instance={"synced_at": synced_at, "changed": changed, "deleted": deleted},
+            many=False,
+        ).data
+
+        return paginator.get_paginated_response(response)
 
 
 class NewMarkApiView(APIView):
@@ -69,7 +163,7 @@ class NewMarkApiView(APIView):
         if data.duplicate_mark(_name=data.validated_data.get("name")):
             logger.error(f"The mark {data.validated_data.get("name")} already exists!")
             return Response(WRONG_DATA, status=400)
-        mark.save()
+        run_write(mark.save)
 
         return Response(MARK_SUCCESSFULLY_CREATED, status=201)
 
@@ -105,7 +199,7 @@ class EditMarkApiView(APIView):
         if data.duplicate_mark(_name=data.validated_data.get("name"), _id=mark.id):
             logger.error(f"The mark {data.validated_data.get("name")} already exists!")
             return Response(WRONG_DATA, status=400)
-        mark.save()
+        run_write(mark.save)
 
         return Response(MARK_SUCCESSFULLY_EDITED, status=204)
 
@@ -156,3 +250,61 @@ class MarkApiView(APIView):
         response = MarkSerializer(instance=mark, many=False).data
 
         return Response(data=response, status=200)
+
+
+class AsyncMarkListView(AsyncApiView):
+    """
+    The async variant of MarkListApiView for ASGI, without the conditional GET
+    """
+
+    async def get(self, request, *args, **kwargs):
+
+        query_request = self.get_query_request(request=request)
+        paginator = IdCursorPagination()
+        marks = await paginator.apaginate_queryset(get_all_marks(), query_request, view=self)
+        if not marks:
+            return self.response(MARKS_NOT_FOUND, status=404)
+        response = MarkSerializer(instance=marks, many=True).data
+
+        return self.response(response, status=200, headers=paginator.get_paginated_headers())
+
+
+class AsyncMarkView(AsyncApiView):
+    """
+    The async variant of MarkApiView for ASGI
+    """
+
+    async def get(self, request, _id, *args, **kwargs):
+
+        mark = await aget_mark_by_id(_id=_id)
+        if not mark:
+            logger.error(f"The mark {_id} doesn't exist!")
+            return self.response(MARK_NOT_FOUND, status=404)
+        response = MarkSerializer(instance=mark, many=False).data
+
+        return self.response(response, status=200)
+
+
+class AsyncNewMarkView(AsyncApiView):
+    """
+    The async variant of NewMarkApiView for ASGI, the body is JSON
+    """
+
+    async def post(self, request, *args, **kwargs):
+
+        data = NewMarkSerializer(data=self.parse_json(request=request))
+        if not data.is_valid():
+            logger.error("The data is wrong!")
+            return self.response(WRONG_DATA, status=400)
+
+        if await aget_mark_by_name(_name=data.validated_data.get("name")):
+            logger.error(f"The mark {data.validated_data.get("name")} already exists!")
+            return self.response(WRONG_DATA, status=400)
+        try:
+            await acreate_mark(_name=data.validated_data.get("name"))
+        except IntegrityError as ex:
+            # The mark with the same name is created in the meantime
+            logger.error(f"The mark {data.validated_data.get("name")} already exists! ex:{ex}")
+            return self.response(WRONG_DATA, status=400)
+
+        return self.response(MARK_SUCCESSFULLY_CREATED, status=201)
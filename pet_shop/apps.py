@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PetShopConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'pet_shop'
+
+    def ready(self):
+        from pet_shop import signals  # noqa: F401
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pet_shop.settings')
+# The media files are served by the async view without blocking the event loop
+os.environ.setdefault('ASYNC_MEDIA', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,42 @@
+import json
+import logging
+from typing import Any
+
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncApiView(View):
+    """
+    Base of the native async views. DRF APIView is synchronous, so under ASGI every request of APIView
+    is handed to the thread executor, these views run on the event loop and use the async ORM.
+    The responses have the same body as the responses of APIView (JSON), the views are not CSRF protected
+    like APIView without the session authentication.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    @staticmethod
+    def get_query_request(request) -> Request:
+        # The query_params of DRF request are used by the pagination, the body isn't parsed
+        return Request(request)
+
+    @staticmethod
+    def parse_json(request) -> Any | None:
+        try:
+            return json.loads(request.body or b"null")
+        except ValueError as ex:
+            logger.error(f"The body isn't valid JSON! ex:{ex}")
+            return None
+
+    @staticmethod
+    def response(data: Any, status: int = 200, headers: dict[str, str] | None = None) -> JsonResponse:
+        return JsonResponse(data, status=status, headers=headers, safe=False, encoder=JSONEncoder)
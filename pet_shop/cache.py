@@ -0,0 +1,118 @@
+import logging
+import threading
+from typing import (
+    Any,
+    Callable,
+)
+
+from django.core.cache import (
+    BaseCache,
+    caches,
+)
+from django.db.models import Model
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+
+from pet_shop.settings import (
+    LOOKUP_CACHE_ALIAS,
+    LOOKUP_CACHE_STATS_INTERVAL,
+    LOOKUP_CACHE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ReadThroughCache:
+    """
+    Read-through cache on top of Django's cache framework.
+    The backend, the size limit and the eviction are configured by the alias in CACHES,
+    the entries are invalidated by the model signals of the cached records.
+    """
+
+    def __init__(self, prefix: str, timeout: int = LOOKUP_CACHE_TIMEOUT, alias: str = LOOKUP_CACHE_ALIAS):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.alias]
+
+    def make_key(self, key: Any) -> str:
+        return f"{self.prefix}:{key}"
+
+    def peek(self, key: Any) -> Any:
+        """
+        Return the cached value without loading it
+        :return: Any - None if the value isn't cached
+        """
+        value = self.cache.get(self.make_key(key=key))
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            lookups = self.hits + self.misses
+            stats = self.stats_message() if lookups % LOOKUP_CACHE_STATS_INTERVAL == 0 else None
+        if stats:
+            logger.info(stats)
+        return value
+
+    def get(self, key: Any, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value or load it, a missing value (None) is not cached
+        :return: Any
+        """
+        value = self.peek(key=key)
+        if value is not None:
+            return value
+        value = loader()
+        if value is not None:
+            self.cache.set(self.make_key(key=key), value, timeout=self.timeout)
+        return value
+
+    def invalidate(self, key: Any) -> None:
+        self.cache.delete(self.make_key(key=key))
+
+    def stats_message(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0
+        return f"Lookup cache {self.prefix}: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate)"
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class ModelLookupCache(ReadThroughCache):
+    """
+    Read-through cache of the records of the model by ID,
+    the entries are invalidated by the post_save/post_delete signals of the model.
+    """
+
+    def __init__(self, model: type[Model], **kwargs):
+        super().__init__(prefix=model._meta.model_name, **kwargs)
+        self.model = model
+        for signal in (post_save, post_delete):
+            signal.connect(self._invalidate_instance, sender=model, weak=False,
+                           dispatch_uid=f"invalidate_{self.prefix}_cache")
+
+    def _invalidate_instance(self, sender, instance: Model, **kwargs):
+        self.invalidate(key=instance.pk)
+
+    # The cached lookup is read from the primary database, the old row of the replica would stay in the cache
+    def get_by_id(self, _id: int) -> Model | None:
+        return self.get(key=_id, loader=lambda: self.model.objects.filter(pk=_id).first())
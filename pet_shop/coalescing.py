@@ -0,0 +1,121 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Callable,
+)
+
+from django.conf import settings
+from django.db import (
+    close_old_connections,
+    connections,
+    transaction,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WriteCoalescer:
+    """
+    The group commit of the writes. The writes are run by one writer thread, every write which comes while
+    the previous commit is running waits and all of them are committed together in the next transaction.
+    SQLite has only one writer at a time, so the writes don't wait for the lock of each other
+    and the cost of the commit (fsync) is shared. Every write has own savepoint, the failed write
+    is rolled back alone and its error is raised to the caller.
+    """
+
+    def __init__(self, max_batch: int):
+        self.max_batch = max_batch
+        self.batches = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _put(self, item: tuple[Callable[[], Any], Future]) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, args=(self._queue,), name="write-coalescer", daemon=True)
+                self._thread.start()
+            self._queue.put(item)
+
+    def stop(self) -> None:
+        """
+        Stop the writer thread after the queued writes, the next write starts new thread with new queue
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            writes, self._queue = self._queue, queue.SimpleQueue()
+        if thread:
+            writes.put(None)
+            thread.join()
+
+    def submit(self, write: Callable[[], Any]) -> Any:
+        """
+        Run the write in the next batch and wait for its commit
+        :return: Any - the result of the write
+        :raise Exception: the error of the write or of the commit
+        """
+        future = Future()
+        self._put(item=(write, future))
+        return future.result()
+
+    def _get_batch(self, writes: queue.SimpleQueue) -> list:
+        batch = [writes.get()]
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            try:
+                batch.append(writes.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self, writes: queue.SimpleQueue) -> None:
+        while True:
+            batch = self._get_batch(writes=writes)
+            stopped = batch[-1] is None
+            if stopped:
+                batch.pop()
+            if batch:
+                self._write(batch=batch)
+            if stopped:
+                # The writer thread has own database connections
+                connections.close_all()
+                return
+
+    def _write(self, batch: list[tuple[Callable[[], Any], Future]]) -> None:
+        close_old_connections()
+        results = []
+        try:
+            with transaction.atomic():
+                for write, future in batch:
+                    try:
+                        with transaction.atomic():
+                            results.append((future, write(), None))
+                    except Exception as ex:
+                        results.append((future, None, ex))
+        except Exception as ex:
+            logger.error(f"The batch of {len(batch)} writes cannot be committed! ex:{ex}")
+            for _, future in batch:
+                future.set_exception(ex)
+            return
+        self.batches += 1
+        for future, result, error in results:
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+write_coalescer = WriteCoalescer(max_batch=settings.WRITE_COALESCING_MAX_BATCH)
+
+
+def run_write(write: Callable[[], Any]) -> Any:
+    """
+    Run the write, with WRITE_COALESCING it is committed together with the concurrent writes
+    :return: Any - the result of the write
+    """
+    if not settings.WRITE_COALESCING:
+        return write()
+    return write_coalescer.submit(write=write)
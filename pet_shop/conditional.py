@@ -0,0 +1,136 @@
+import hashlib
+import time
+import uuid
+from contextlib import nullcontext
+from functools import wraps
+from typing import Callable
+
+from django.core.cache import (
+    BaseCache,
+    caches,
+)
+from django.db import transaction
+from django.db.models import Model
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+)
+from django.utils.http import (
+    http_date,
+    quote_etag,
+)
+from rest_framework.response import Response
+
+from pet_shop.routers import replica_reads
+from pet_shop.settings import (
+    REPLICA_MAX_LAG,
+    RESPONSE_CACHE_ALIAS,
+    RESPONSE_CACHE_TIMEOUT,
+    VERSION_CACHE_ALIAS,
+)
+
+
+def get_cache() -> BaseCache:
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def get_version_cache() -> BaseCache:
+    # The versions are shared by all workers, a stale version of one worker would return the old response
+    return caches[VERSION_CACHE_ALIAS]
+
+
+def _version_key(model: type[Model]) -> str:
+    return f"version:{model._meta.db_table}"
+
+
+def bump_table_version(*models: type[Model]) -> None:
+    """
+    Mark the tables as changed, every write into the tables has to call it (the signals of the models
+    and the bulk queries which skip the signals), the version is a new random token so it never repeats
+    even when the cache is cleared. The version is changed after the commit of the transaction,
+    before it the readers could cache the old rows with the new version.
+    """
+    transaction.on_commit(lambda: _set_table_versions(*models))
+
+
+def _set_table_versions(*models: type[Model]) -> None:
+    # The time of the commit, the rows are visible to the readers since then (their modified_at is earlier)
+    get_version_cache().set_many(
+        {_version_key(model=model): (uuid.uuid4().hex, time.time()) for model in models},
+        timeout=None,
+    )
+
+
+def get_table_versions(*models: type[Model]) -> list[tuple[str, float]]:
+    """
+    Return the version token and the time of the last change of the tables
+    :return: list[tuple[str, float]]
+    """
+    cache = get_version_cache()
+    keys = [_version_key(model=model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Nothing is known about the table yet, start from now
+            cache.add(key, (uuid.uuid4().hex, time.time()), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_last_modified(changed_at: float) -> int:
+    """
+    Last-Modified has whole-second resolution, the change in the current second gets the previous second,
+    so the next change in the same second is newer than If-Modified-Since of the client
+    :return: int
+    """
+    if int(time.time()) > int(changed_at):
+        return int(changed_at)
+    return int(changed_at) - 1
+
+
+def conditional_get(*models: type[Model]) -> Callable:
+    """
+    Decorator of the GET method of the view which response depends only on the tables of the models.
+    - The ETag is made from the path, the query string and the versions of the tables, the Last-Modified
+    is the time of the last change of the tables, a matching If-None-Match/If-Modified-Since returns 304
+    without calling the view.
+    - The successful responses are cached by the ETag, so the old bodies are never returned after a write.
+    - The tables changed in the last REPLICA_MAX_LAG seconds are read from the primary database.
+    """
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            versions = get_table_versions(*models)
+            etag = hashlib.sha256(
+                "|".join([request.get_full_path()] + [version for version, _ in versions]).encode()
+            ).hexdigest()
+            changed_at = max(changed_at for _, changed_at in versions)
+            last_modified = get_last_modified(changed_at=changed_at)
+
+            response = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+            if response is None:
+                cache = get_cache()
+                cached = cache.get(f"response:{etag}")
+                if cached is not None:
+                    response = Response(data=cached.get("data"), status=200, headers=cached.get("headers"))
+                else:
+                    # The replicas could miss the last change of the tables, the old rows would be cached
+                    # with the new version
+                    recently_changed = time.time() - changed_at < REPLICA_MAX_LAG
+                    with replica_reads(alias=None) if recently_changed else nullcontext():
+                        response = method(self, request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    headers = {"Link": response["Link"]} if response.has_header("Link") else None
+                    cache.set(
+                        f"response:{etag}",
+                        {"data": response.data, "headers": headers},
+                        timeout=RESPONSE_CACHE_TIMEOUT,
+                    )
+
+            response["ETag"] = quote_etag(etag)
+            response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
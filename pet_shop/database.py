@@ -0,0 +1,123 @@
+import copy
+from pathlib import Path
+from typing import Mapping
+
+from django.core.exceptions import ImproperlyConfigured
+
+DATABASE_ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+}
+# The tuned SQLite, the readers don't wait for the writer (WAL) and the commit doesn't wait for fsync
+# (NORMAL is durable in WAL except for the power loss), every value can be changed by DB_SQLITE_<PRAGMA>
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    # 256 MB of the database file is read through the memory map
+    "mmap_size": 256 * 1024 * 1024,
+    # 64 MB of the page cache per connection (the negative value is in KiB)
+    "cache_size": -64 * 1024,
+    # The time (ms) to wait for the lock of another writer instead of the error "database is locked"
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+# The defaults of SQLite, the benchmark compares them with the tuned pragmas
+SQLITE_DEFAULT_PRAGMAS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+}
+
+
+def get_bool(environ: Mapping[str, str], name: str, default: bool) -> bool:
+    value = environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def get_conn_max_age(environ: Mapping[str, str]) -> int | None:
+    # 0 closes the connection after every request like Django, "none" keeps the connections open without the limit
+    value = environ.get("DB_CONN_MAX_AGE", "0")
+    return None if value.lower() == "none" else int(value)
+
+
+def get_sqlite_pragmas(environ: Mapping[str, str]) -> dict[str, str | int]:
+    """
+    The pragmas applied on every new SQLite connection, they are enabled by DB_SQLITE_TUNING
+    :return: dict[str, str | int] - empty if the tuning is disabled
+    """
+    if not get_bool(environ=environ, name="DB_SQLITE_TUNING", default=False):
+        return {}
+    return {
+        pragma: environ.get(f"DB_SQLITE_{pragma.upper()}") or value
+        for pragma, value in SQLITE_PRAGMAS.items()
+    }
+
+
+def apply_sqlite_pragmas(connection, pragmas: Mapping[str, str | int]) -> None:
+    with connection.cursor() as cursor:
+        for pragma, value in pragmas.items():
+            if pragma not in SQLITE_PRAGMAS:
+                raise ImproperlyConfigured(f"The SQLite pragma {pragma} isn't supported!")
+            # The pragmas cannot be parameterized, only the known pragmas and plain values are used
+            if not str(value).lstrip("-").isalnum():
+                raise ImproperlyConfigured(f"The value {value} of the SQLite pragma {pragma} is wrong!")
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def get_database_settings(environ: Mapping[str, str], base_dir: Path) -> dict:
+    """
+    The default database from the environment:
+    - DB_ENGINE: sqlite (default, BASE_DIR/db.sqlite3) or postgresql
+    - DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT: the connection of PostgreSQL, DB_NAME also of SQLite
+    - DB_CONN_MAX_AGE: the lifetime (s) of the persistent connections, 0 (default) closes the connection
+    after every request
+    - DB_CONN_HEALTH_CHECKS: the persistent connection is checked before it is reused by the next request
+    - DB_PGBOUNCER: the server side cursors are disabled for pgbouncer in the transaction pooling mode,
+    the connections of PostgreSQL are pooled by pgbouncer (Django 4.2 has no own pool)
+    :return: dict
+    :raise ImproperlyConfigured: if the engine isn't supported
+    """
+    engine = environ.get("DB_ENGINE", "sqlite")
+    if engine not in DATABASE_ENGINES:
+        raise ImproperlyConfigured(f"DB_ENGINE has to be one of {', '.join(DATABASE_ENGINES)}, not {engine}!")
+
+    database = {
+        "ENGINE": DATABASE_ENGINES[engine],
+        "CONN_MAX_AGE": get_conn_max_age(environ=environ),
+        "CONN_HEALTH_CHECKS": get_bool(environ=environ, name="DB_CONN_HEALTH_CHECKS", default=True),
+    }
+    if engine == "sqlite":
+        database["NAME"] = environ.get("DB_NAME") or base_dir / "db.sqlite3"
+        return database
+
+    database.update({
+        "NAME": environ.get("DB_NAME", "pet_shop"),
+        "USER": environ.get("DB_USER", "pet_shop"),
+        "PASSWORD": environ.get("DB_PASSWORD", ""),
+        "HOST": environ.get("DB_HOST", "localhost"),
+        "PORT": environ.get("DB_PORT", "5432"),
+        "OPTIONS": {
+            "connect_timeout": int(environ.get("DB_CONNECT_TIMEOUT", 5)),
+        },
+    })
+    if get_bool(environ=environ, name="DB_PGBOUNCER", default=False):
+        database["DISABLE_SERVER_SIDE_CURSORS"] = True
+    return database
+
+
+def get_replica_settings(environ: Mapping[str, str], default: dict) -> dict[str, dict]:
+    """
+    The read replicas from DB_REPLICAS, the comma separated files of SQLite or hosts of PostgreSQL,
+    the rest of the settings is the same as of the default database
+    :return: dict[str, dict] - the replicas by their aliases replica_1, replica_2...
+    """
+    replicas = {}
+    locations = [location.strip() for location in environ.get("DB_REPLICAS", "").split(",") if location.strip()]
+    for index, location in enumerate(locations, start=1):
+        replica = copy.deepcopy(default)
+        replica["NAME" if default["ENGINE"] == DATABASE_ENGINES["sqlite"] else "HOST"] = location
+        # The tests run against the default database only
+        replica["TEST"] = {"MIRROR": "default"}
+        replicas[f"replica_{index}"] = replica
+    return replicas
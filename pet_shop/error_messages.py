@@ -1,4 +1,5 @@
 WRONG_DATA = "Wrong data"
+FULL_SYNC_REQUIRED = "The changes since modified_since aren't kept, retrieve all records again!"
 PAGE_NOT_FOUND = "This page doesn't exist!"
 ANIMALS_NOT_FOUND = "The animals don't exist!"
 ANIMAL_NOT_FOUND = "The animal doesn't exist!"
@@ -7,3 +8,8 @@ CATEGORY_NOT_FOUND = "The category doesn't exist!"
 MARKS_NOT_FOUND = "The marks don't exist!"
 MARK_NOT_FOUND = "The mark doesn't exist!"
 IMAGE_NOT_FOUND = "The image doesn't exist!"
+IMAGE_JOB_NOT_FOUND = "The image job doesn't exist!"
+IMAGE_PROCESSING_BUSY = "Too many images are processing, try it later!"
+DUPLICATE_ANIMAL_IMAGE = "The animal has more images in the request!"
+INVALID_STATUS = "The status is invalid!"
+DUPLICATE_ANIMAL_ID = "The animal with this animal_id already exists!"
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import connections
+from django.test import (
+    Client,
+    override_settings,
+)
+from django.urls import reverse
+
+from animal.models import Animal
+from category.models import Category
+from mark.models import Mark
+from pet_shop.coalescing import write_coalescer
+from pet_shop.database import (
+    SQLITE_DEFAULT_PRAGMAS,
+    SQLITE_PRAGMAS,
+)
+from sync.models import Tombstone
+
+# (name, the pragmas of the connections, the write coalescing)
+BENCHMARK_PROFILES = [
+    ("default", SQLITE_DEFAULT_PRAGMAS, False),
+    ("tuned", SQLITE_PRAGMAS, False),
+    ("tuned+batch", SQLITE_PRAGMAS, True),
+]
+# The animal_id of the created animals, they are deleted after every profile
+BENCHMARK_ANIMAL_ID = 4_000_000_000
+
+
+def get_p95(latencies: list[float]) -> float:
+    if not latencies:
+        return 0.0
+    latencies = sorted(latencies)
+    return latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the readers (the list of animals) and the writers (the new animals) running "
+        "at the same time on SQLite with the default pragmas, the tuned pragmas and the tuned pragmas with "
+        "the write coalescing. The requests are handled in the process (the test clients) like in benchmark_views. "
+        "Run it on the copy of the database with the data, the database stays in WAL mode after the benchmark."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--duration", type=float, default=5, help="The seconds per profile")
+        parser.add_argument("--readers", type=int, default=8, help="The concurrent readers")
+        parser.add_argument("--writers", type=int, default=8, help="The concurrent writers")
+        parser.add_argument("--page-size", type=int, default=100, help="The page size of the list")
+
+    def run_profile(self, options: dict, category: Category, mark: Mark) -> dict[str, float]:
+        deadline = time.perf_counter() + options["duration"]
+        local = threading.local()
+        lock = threading.Lock()
+        counter = iter(range(BENCHMARK_ANIMAL_ID, BENCHMARK_ANIMAL_ID + 10_000_000))
+        latencies = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        read_path = f"{reverse('all_animals')}?page_size={options['page_size']}"
+
+        def get_client() -> Client:
+            if not hasattr(local, "client"):
+                local.client = Client(raise_request_exception=False)
+            return local.client
+
+        def read(index: int) -> bool:
+            # Every request has own URL, so the responses aren't taken from the cache
+            response = get_client().get(path=f"{read_path}&request={index}")
+            return response.status_code == 200
+
+        def write(index: int) -> bool:
+            with lock:
+                animal_id = next(counter)
+            response = get_client().post(
+                path=reverse("new_animal"),
+                data=json.dumps({
+                    "name": f"benchmark {index}",
+                    "animal_id": animal_id,
+                    "status": "set",
+                    "category_id": category.id,
+                    "mark_id": mark.id,
+                }),
+                content_type="application/json",
+            )
+            return response.status_code == 201
+
+        def run(kind: str, request) -> None:
+            index = 0
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    ok = request(index)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        if ok:
+                            latencies[kind].append(elapsed)
+                        else:
+                            errors[kind] += 1
+                    index += 1
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["readers"] + options["writers"]) as executor:
+            for _ in range(options["readers"]):
+                executor.submit(run, "read", read)
+            for _ in range(options["writers"]):
+                executor.submit(run, "write", write)
+        elapsed = time.perf_counter() - started
+        return {
+            "reads": len(latencies["read"]) / elapsed,
+            "read_p95": get_p95(latencies=latencies["read"]),
+            "read_errors": errors["read"],
+            "writes": len(latencies["write"]) / elapsed,
+            "write_p95": get_p95(latencies=latencies["write"]),
+            "write_errors": errors["write"],
+        }
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("The benchmark runs only on SQLite!")
+        category = Category.objects.order_by("id").first()
+        mark = Mark.objects.order_by("id").first()
+        if not category or not mark:
+            raise CommandError("Run it on the database with the categories and the marks!")
+
+        self.stdout.write(
+            f"{'profile':<12} {'reads/s':>9} {'p95 ms':>9} {'errors':>7} {'writes/s':>9} {'p95 ms':>9} {'errors':>7}"
+        )
+        for name, pragmas, coalescing in BENCHMARK_PROFILES:
+            # The journal mode of the database is changed only without other connections
+            connections.close_all()
+            with override_settings(SQLITE_PRAGMAS=pragmas, WRITE_COALESCING=coalescing):
+                try:
+                    stats = self.run_profile(options=options, category=category, mark=mark)
+                finally:
+                    write_coalescer.stop()
+                    animals = Animal.objects.filter(animal_id__gte=BENCHMARK_ANIMAL_ID)
+                    ids = list(animals.values_list("id", flat=True))
+                    animals.delete()
+                    Tombstone.objects.filter(table=Animal._meta.db_table, record_id__in=ids).delete()
+                    connections.close_all()
+            self.stdout.write(
+                f"{name:<12} {stats['reads']:>9.1f} {stats['read_p95']:>9.2f} {stats['read_errors']:>7} "
+                f"{stats['writes']:>9.1f} {stats['write_p95']:>9.2f} {stats['write_errors']:>7}"
+            )
@@ -0,0 +1,121 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import (
+    AsyncClient,
+    Client,
+)
+from django.urls import reverse
+
+from animal.models import Animal
+from category.models import Category
+from mark.models import Mark
+
+# (name, the sync view, the async view, the model of the detail)
+BENCHMARK_VIEWS = [
+    ("animals list", "all_animals", "all_animals_async", None),
+    ("animal detail", "get_animal", "get_animal_async", Animal),
+    ("categories list", "all_categories", "all_categories_async", None),
+    ("category detail", "get_category", "get_category_async", Category),
+    ("marks list", "all_marks", "all_marks_async", None),
+    ("mark detail", "get_mark", "get_mark_async", Mark),
+]
+
+
+def get_request_path(path: str, index: int) -> str:
+    # Every request has own URL, so the responses of the conditional GET aren't taken from the cache
+    return f"{path}{'&' if '?' in path else '?'}request={index}"
+
+
+def get_stats(latencies: list[float], elapsed: float) -> dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def run_sync(path: str, requests: int, concurrency: int) -> dict[str, float]:
+    """
+    The WSGI handler with the sync DRF view, the concurrent requests run in the threads like in a threaded server
+    """
+    local = threading.local()
+
+    def get(index: int) -> float:
+        if not hasattr(local, "client"):
+            local.client = Client()
+        started = time.perf_counter()
+        local.client.get(path=get_request_path(path=path, index=index))
+        return time.perf_counter() - started
+
+    def close() -> None:
+        connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(get, range(requests)))
+        list(executor.map(lambda _: close(), range(concurrency)))
+    return get_stats(latencies=latencies, elapsed=time.perf_counter() - started)
+
+
+async def run_async(path: str, requests: int, concurrency: int) -> dict[str, float]:
+    """
+    The ASGI handler with the async view, the concurrent requests run on one event loop
+    """
+    client = AsyncClient()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def get(index: int) -> float:
+        async with slots:
+            started = time.perf_counter()
+            await client.get(path=get_request_path(path=path, index=index))
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(get(index=index) for index in range(requests)))
+    return get_stats(latencies=list(latencies), elapsed=time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the sync views under WSGI and the async views under ASGI with the concurrent "
+        "requests. The requests are handled in the process (the test clients), so the numbers show the cost "
+        "of the handlers, the views and the queries without the network and the server. "
+        "Run it on the database with the data, e.g. the copy of the production database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="The requests per view and handler")
+        parser.add_argument("--concurrency", type=int, default=16, help="The concurrent requests")
+        parser.add_argument("--page-size", type=int, default=100, help="The page size of the lists")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'view':<16} {'handler':<12} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}"
+        )
+        for name, sync_view, async_view, model in BENCHMARK_VIEWS:
+            if model:
+                _id = model.objects.order_by("id").values_list("id", flat=True).first()
+                if _id is None:
+                    self.stdout.write(f"{name:<16} skipped, there are no records")
+                    continue
+                paths = [reverse(view, kwargs={"_id": _id}) for view in (sync_view, async_view)]
+            else:
+                paths = [f"{reverse(view)}?page_size={options['page_size']}" for view in (sync_view, async_view)]
+
+            results = [
+                ("wsgi-sync", run_sync(
+                    path=paths[0], requests=options["requests"], concurrency=options["concurrency"])),
+                ("asgi-async", asyncio.run(run_async(
+                    path=paths[1], requests=options["requests"], concurrency=options["concurrency"]))),
+            ]
+            for handler, stats in results:
+                self.stdout.write(
+                    f"{name:<16} {handler:<12} {stats['rps']:>9.1f} {stats['p50']:>9.2f} {stats['p95']:>9.2f}"
+                )
@@ -1,14 +1,76 @@
 import logging
 
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+)
+
+from pet_shop.routers import (
+    REPLICA_SAFE_METHODS,
+    choose_replica,
+    replica_reads,
+    stick_to_primary,
+)
+
 logger = logging.getLogger(__name__)
 
 
 class CustomMiddleware:
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            # The async views under ASGI are called without the sync_to_async thread
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        self.set_current_url(request=request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.set_current_url(request=request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def set_current_url(request) -> None:
         current_url = request.path_info.split("v1/")[-1]
         request.current_url = current_url
-        return self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Choose the replica of the request, after the successful write the client reads from the primary database
+    for REPLICA_MAX_LAG seconds (read-your-writes)
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with replica_reads(alias=choose_replica(request=request)):
+            response = self.get_response(request)
+        return self.process_response(request=request, response=response)
+
+    async def __acall__(self, request):
+        # The ContextVar is copied into the sync_to_async threads of the async queries
+        with replica_reads(alias=choose_replica(request=request)):
+            response = await self.get_response(request)
+        return self.process_response(request=request, response=response)
+
+    @staticmethod
+    def process_response(request, response):
+        if request.method not in REPLICA_SAFE_METHODS and response.status_code < 400:
+            stick_to_primary(response=response)
+        return response
@@ -15,3 +15,4 @@ MARK_SUCCESSFULLY_EDITED = "The mark has successfully edited!"
 MARK_SUCCESSFULLY_DELETED = "The mark has successfully deleted!"
 IMAGE_SUCCESSFULLY_CREATED = "The image has successfully created!"
 IMAGE_SUCCESSFULLY_DELETED = "The image has successfully deleted!"
+NOT_MODIFIED = "Not modified"
@@ -0,0 +1,142 @@
+from django.db.models import QuerySet
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.pagination import (
+    CursorPagination,
+    _reverse_ordering,
+)
+from rest_framework.response import Response
+
+from pet_shop.settings import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
+
+CURSOR_PAGINATION_PARAMETERS = [
+    OpenApiParameter(
+        name="cursor",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        description="The opaque cursor from the Link header of the previous response",
+    ),
+    OpenApiParameter(
+        name="page_size",
+        type=OpenApiTypes.INT,
+        location=OpenApiParameter.QUERY,
+        description=f"The number of records per page, default {DEFAULT_PAGE_SIZE}, maximum {MAX_PAGE_SIZE}",
+    ),
+]
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key (or other ordering field), every page is fetched
+    with `WHERE id > ? LIMIT ?` so deep pages are as fast as the first one.
+    The body stays a plain list, the next/prev cursors are returned in the Link header.
+    """
+
+    ordering = "id"
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+    def __init__(self, ordering: str = "id"):
+        if ordering.lstrip("-") != "id":
+            # The records with the same value are kept in stable order by ID
+            ordering = (ordering, "-id" if ordering.startswith("-") else "id")
+        self.ordering = ordering
+
+    def get_page_queryset(self, queryset: QuerySet, request, view=None) -> QuerySet:
+        """
+        The first half of CursorPagination.paginate_queryset, the query of the page
+        and one extra record, which tells whether there is the next page
+        :return: QuerySet
+        """
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith("-")
+            order_attr = order.lstrip("-")
+            if self.cursor.reverse != is_reversed:
+                queryset = queryset.filter(**{f"{order_attr}__lt": current_position})
+            else:
+                queryset = queryset.filter(**{f"{order_attr}__gt": current_position})
+
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results: list) -> list:
+        """
+        The second half of CursorPagination.paginate_queryset, the page and the positions of the cursors
+        :return: list - the page
+        """
+        (offset, reverse, current_position) = self.cursor or (0, False, None)
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> list:
+        return self.set_page(results=list(self.get_page_queryset(queryset=queryset, request=request, view=view)))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request, view=None) -> list:
+        """
+        paginate_queryset for the async views, the page is read by the async ORM
+        :return: list
+        """
+        page_queryset = self.get_page_queryset(queryset=queryset, request=request, view=view)
+        return self.set_page(results=[item async for item in page_queryset.aiterator()])
+
+    def get_links(self) -> str:
+        links = []
+        next_link = self.get_next_link()
+        if next_link:
+            links.append(f'<{next_link}>; rel="next"')
+        previous_link = self.get_previous_link()
+        if previous_link:
+            links.append(f'<{previous_link}>; rel="prev"')
+        return ", ".join(links)
+
+    def get_paginated_headers(self) -> dict[str, str] | None:
+        links = self.get_links()
+        return {"Link": links} if links else None
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(data=data, status=200, headers=self.get_paginated_headers())
@@ -0,0 +1,116 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import (
+    Callable,
+    Iterator,
+)
+
+from django.db import connections
+from django.db.models import QuerySet
+
+from pet_shop.settings import (
+    DATABASE_REPLICAS,
+    REPLICA_MAX_LAG,
+)
+
+REPLICA_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# The cookie of the client which wrote recently, its value is the time until it reads from the primary database
+PRIMARY_COOKIE = "db_primary_until"
+
+# The replica of the current request, None reads from the primary database
+_read_replica: ContextVar[str | None] = ContextVar("read_replica", default=None)
+# Inside the query function marked by read_replica
+_replica_query: ContextVar[bool] = ContextVar("replica_query", default=False)
+
+
+@contextmanager
+def replica_reads(alias: str | None) -> Iterator[None]:
+    """
+    The queries marked by read_replica read from the replica, None reads from the primary database
+    """
+    token = _read_replica.set(alias)
+    try:
+        yield
+    finally:
+        _read_replica.reset(token)
+
+
+def read_replica(function: Callable) -> Callable:
+    """
+    Decorator of the query function which can read from the replica. The returned QuerySet is bound
+    to the database right away, it is evaluated later outside the function.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _replica_query.set(True)
+        try:
+            result = function(*args, **kwargs)
+            if isinstance(result, QuerySet) and result._db is None:
+                result = result.using(result.db)
+            return result
+        finally:
+            _replica_query.reset(token)
+    return wrapper
+
+
+def is_primary_client(request) -> bool:
+    try:
+        return float(request.COOKIES.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def choose_replica(request) -> str | None:
+    """
+    The replica for the request, the writes and the reads of the client after its own write
+    use the primary database
+    :return: str | None
+    """
+    if not DATABASE_REPLICAS or request.method not in REPLICA_SAFE_METHODS or is_primary_client(request=request):
+        return None
+    # The same replica for all queries of the request, e.g. the page and its cursors
+    return random.choice(DATABASE_REPLICAS)
+
+
+def stick_to_primary(response) -> None:
+    """
+    The next requests of the client read from the primary database until the replicas have its write
+    """
+    if DATABASE_REPLICAS:
+        response.set_cookie(
+            PRIMARY_COOKIE, str(time.time() + REPLICA_MAX_LAG), max_age=REPLICA_MAX_LAG, httponly=True,
+            samesite="Lax",
+        )
+
+
+class ReplicaRouter:
+    """
+    The queries marked by read_replica read from the replica chosen for the request,
+    all other queries and all writes use the default (primary) database
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        alias = _read_replica.get()
+        if not alias or not _replica_query.get():
+            return None
+        # The reads inside the transaction have to see its writes
+        if connections["default"].in_atomic_block:
+            return "default"
+        return alias
+
+    def db_for_write(self, model, **hints) -> str:
+        # The instances read from the replica are saved to the primary database too
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        databases = {"default", *DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        # The replicas get the schema by the replication
+        return db == "default"
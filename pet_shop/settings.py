@@ -12,6 +12,13 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import os
 from pathlib import Path
 
+from pet_shop.database import (
+    get_bool,
+    get_database_settings,
+    get_replica_settings,
+    get_sqlite_pragmas,
+)
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -21,8 +28,72 @@ MEDIA_URL = '/media/'
 if not os.path.exists(MEDIA_ROOT):
     os.makedirs(MEDIA_ROOT)
 
-DEFAULT_MEDIA_URL = "http://127.0.0.1:8000/media/"
+# The uploaded images waiting for the processing, they aren't served
+UPLOAD_ROOT = os.path.join(BASE_DIR, 'uploads')
+
+if not os.path.exists(UPLOAD_ROOT):
+    os.makedirs(UPLOAD_ROOT)
+
+# The uploaded files are streamed into UPLOAD_ROOT, so they are moved into place without a copy
+FILE_UPLOAD_TEMP_DIR = UPLOAD_ROOT
+
+SITE_URL = os.environ.get("SITE_URL", "http://127.0.0.1:8000")
+
+# The storage of the image files, "filesystem" (MEDIA_ROOT) or "s3" (S3 compatible object store)
+IMAGE_STORAGE_BACKEND = os.environ.get("IMAGE_STORAGE_BACKEND", "filesystem")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL", "http://127.0.0.1:9000")
+S3_BUCKET = os.environ.get("S3_BUCKET", "pet-shop")
+S3_ACCESS_KEY = os.environ.get("S3_ACCESS_KEY", "")
+S3_SECRET_KEY = os.environ.get("S3_SECRET_KEY", "")
+S3_REGION = os.environ.get("S3_REGION", "us-east-1")
+# The public URL of the bucket, e.g. CDN in front of the bucket
+S3_PUBLIC_URL = os.environ.get("S3_PUBLIC_URL") or f"{S3_ENDPOINT_URL}/{S3_BUCKET}"
+S3_POOL_SIZE = 10
+S3_PART_SIZE = 8 * 1024 * 1024
+S3_UPLOAD_WORKERS = 4
+
+if IMAGE_STORAGE_BACKEND == "s3":
+    DEFAULT_MEDIA_URL = f"{S3_PUBLIC_URL.rstrip('/')}/"
+else:
+    DEFAULT_MEDIA_URL = f"{SITE_URL}{MEDIA_URL}"
+# The media files never change (they are named by the content hash), so they are cached for a year
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+# None - the files are sent by Django, "x-accel-redirect" - by nginx, "x-sendfile" - by Apache/lighttpd
+MEDIA_SENDFILE_MODE = os.environ.get("MEDIA_SENDFILE_MODE") or None
+# The internal location of nginx with the alias to MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# The async media view for ASGI (set by pet_shop/asgi.py), under WSGI the async stream would be buffered
+ASYNC_MEDIA = os.environ.get("ASYNC_MEDIA") == "1"
 MAX_IMAGE_SIZE = 5
+IMAGE_WORKERS = 4
+IMAGE_QUEUE_SIZE = 64
+# The bulk upload of the images (the multipart batch or the zip archive), the whole request in MB
+MAX_BULK_IMAGES = 100
+MAX_BULK_IMAGE_UPLOAD_SIZE = 200
+# The longest side (px) of the smaller copies of every image, they are stored in the format
+# of the image and in the extra formats, the bigger sizes than the image are skipped
+IMAGE_RENDITION_SIZES = [64, 256, 1024]
+IMAGE_RENDITION_EXTRA_FORMATS = ["webp"]
+IMAGE_RENDITION_QUALITY = 85
+# The orphan files and rows younger than the grace period (s) are kept, they could belong to the running job
+IMAGE_GC_GRACE_PERIOD = 24 * 60 * 60
+IMAGE_GC_BATCH_SIZE = 1000
+# The bigger images (the longest side in px) are resized, the smaller JPEG images are stored as they are
+IMAGE_MAX_DIMENSION = 4096
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+MAX_BULK_SIZE = 1000
+
+LOOKUP_CACHE_ALIAS = "default"
+LOOKUP_CACHE_TIMEOUT = 60 * 60
+# The hits and the misses of the lookup caches are logged after every this many lookups (per worker)
+LOOKUP_CACHE_STATS_INTERVAL = 1000
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 5 * 60
+# The versions of the tables (ETag/Last-Modified of the cached endpoints) are shared by the workers
+VERSION_CACHE_ALIAS = "versions"
 
 BASE_URL = "api/v1/"
 
@@ -53,6 +124,7 @@ INSTALLED_APPS = [
     'mark',
     'animal',
     'image',
+    'sync',
     'pet_shop',
 ]
 
@@ -65,6 +137,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'pet_shop.middleware.CustomMiddleware',
+    'pet_shop.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'pet_shop.urls'
@@ -91,12 +164,70 @@ WSGI_APPLICATION = 'pet_shop.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# The engine and the persistent connections are chosen by the environment, see pet_shop/database.py
 
 DATABASES = {
+    'default': get_database_settings(environ=os.environ, base_dir=BASE_DIR),
+}
+DATABASES.update(get_replica_settings(environ=os.environ, default=DATABASES['default']))
+# The get_* queries of the GET requests are read from the replicas, see pet_shop/routers.py
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['pet_shop.routers.ReplicaRouter']
+# The maximal lag (s) of the replicas, the client reads from the primary database for this time after its write
+# and the tables changed in this time are read from the primary database
+REPLICA_MAX_LAG = int(os.environ.get("DB_REPLICA_MAX_LAG", 5))
+# The pragmas of every new SQLite connection (DB_SQLITE_TUNING=1), see pet_shop/database.py
+SQLITE_PRAGMAS = get_sqlite_pragmas(environ=os.environ)
+# The writes of the create/edit endpoints are committed together by one writer thread (group commit),
+# the writes waiting for the running commit (at most WRITE_COALESCING_MAX_BATCH) share the next one
+WRITE_COALESCING = get_bool(environ=os.environ, name="DB_WRITE_COALESCING", default=False)
+WRITE_COALESCING_MAX_BATCH = 64
+# The synced_at of the incremental sync is earlier than now by the margin (s), the rows of the transactions
+# which commit later than they set modified_at are returned by the next sync again
+SYNC_SAFETY_MARGIN = 60
+# The tombstones of the deleted rows are kept for the retention (s), they are deleted by collect_tombstones,
+# the sync with older modified_since returns 410
+SYNC_TOMBSTONE_RETENTION = 30 * 24 * 60 * 60
+SYNC_TOMBSTONE_BATCH_SIZE = 1000
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory cache is per process, use a shared backend (e.g. Redis or Memcached) with more workers.
+# The table versions have to be shared, they are in the files of VERSION_CACHE_DIR (a shared volume
+# or a shared backend with more hosts).
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pet_shop',
+        'TIMEOUT': LOOKUP_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    VERSION_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get("VERSION_CACHE_DIR") or os.path.join(BASE_DIR, 'cache', 'versions'),
+        'TIMEOUT': None,
+    },
+}
+
+# The hit/miss stats of the lookup caches (LOOKUP_CACHE_STATS_INTERVAL) are logged to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'pet_shop.cache': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
 }
 
 
@@ -156,6 +287,9 @@ SPECTACULAR_SETTINGS = {
     "SORT_OPERATION_PARAMETERS": True,
     "COMPONENT_SPLIT_PATCH": False,
     "COMPONENT_SPLIT_REQUEST": True,
+    "ENUM_NAME_OVERRIDES": {
+        "AnimalStatusEnum": "animal.models.Animal.STATUS_CHOICES",
+    },
 }
 
 SPECTACULAR_DEFAULT_RESPONSE_SERIALIZER_CLASS = 'rest_framework.serializers.JSONRenderer'
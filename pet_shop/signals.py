@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from pet_shop.database import apply_sqlite_pragmas
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == "sqlite" and settings.SQLITE_PRAGMAS:
+        apply_sqlite_pragmas(connection=connection, pragmas=settings.SQLITE_PRAGMAS)
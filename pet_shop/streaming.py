@@ -0,0 +1,47 @@
+from typing import Iterator
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer
+
+from pet_shop.settings import EXPORT_CHUNK_SIZE
+
+
+def _iter_chunks(queryset: QuerySet, chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for instance in queryset.order_by("id").iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_json_array(
+        queryset: QuerySet,
+        serializer_class: type[BaseSerializer],
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Serialize the queryset chunk by chunk and yield it as one JSON array,
+    only one chunk of the rows is held in memory at a time
+    :return: Iterator[bytes]
+    """
+    renderer = JSONRenderer()
+    separator = b""
+    yield b"["
+    for chunk in _iter_chunks(queryset=queryset, chunk_size=chunk_size):
+        # Render the chunk as a JSON list and drop its brackets, the chunks are joined into one array
+        yield separator + renderer.render(serializer_class(instance=chunk, many=True).data)[1:-1]
+        separator = b","
+    yield b"]"
+
+
+def streaming_json_response(queryset: QuerySet, serializer_class: type[BaseSerializer]) -> StreamingHttpResponse:
+    return StreamingHttpResponse(
+        streaming_content=iter_json_array(queryset=queryset, serializer_class=serializer_class),
+        content_type="application/json",
+        status=200,
+    )
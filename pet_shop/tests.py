@@ -1,38 +1,443 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+)
 from unittest import TestCase
+from unittest.mock import patch
 
-from django.db import connections
-from django.test import Client
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+)
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.color import no_style
+from django.db import (
+    IntegrityError,
+    connections,
+    transaction,
+)
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    Client,
+    RequestFactory,
+    override_settings,
+)
+from django.urls import reverse
 
 from animal.models import Animal
+from animal.queries import get_animal_by_id
 from category.models import Category
-from image.models import Image
+from image.models import (
+    Image,
+    ImageJob,
+)
 from mark.models import Mark
+from pet_shop.coalescing import WriteCoalescer
+from pet_shop.conditional import (
+    get_last_modified,
+    get_table_versions,
+)
+from pet_shop.database import (
+    get_database_settings,
+    get_replica_settings,
+    get_sqlite_pragmas,
+)
+from pet_shop.middleware import (
+    CustomMiddleware,
+    ReplicaRoutingMiddleware,
+)
+from pet_shop.routers import (
+    PRIMARY_COOKIE,
+    _read_replica,
+    replica_reads,
+)
+from sync.models import Tombstone
 
-models = [Animal, Category, Mark, Image]
+models = [ImageJob, Animal, Category, Mark, Image, Tombstone]
 tables = [model._meta.db_table for model in models]
 
 client = Client()
+async_client = AsyncClient()
+
+
+def call_async(method: Callable[..., Awaitable], **kwargs) -> Any:
+    """
+    Call the async method (e.g. async_client.get) from the sync test, the ORM of the async views
+    runs in the thread of the test with the same database connection
+    """
+    async def call():
+        return await method(**kwargs)
+    return async_to_sync(call)()
+
+
+def reset_sequences() -> None:
+    """
+    Start the IDs of the tables from 1 again, SQLITE_SEQUENCE on SQLite and the sequences on PostgreSQL
+    """
+    connection = connections['default']
+    sequences = [{"table": table, "column": "id"} for table in tables]
+    with connection.cursor() as cursor:
+        for query in connection.ops.sequence_reset_by_name_sql(no_style(), sequences):
+            cursor.execute(query)
 
 
 class BaseTestCase(TestCase):
 
     def setUp(self):
+        cache.clear()
         for model in models:
             model.objects.all().delete()
 
-        with connections['default'].cursor() as cursor:
-
-            for table in tables:
-                query = "UPDATE SQLITE_SEQUENCE SET " + f"SEQ=0 WHERE NAME='{table}';"
-                cursor.execute(query)
+        reset_sequences()
 
     def tearDown(self):
 
         for model in models:
             model.objects.all().delete()
 
-        with connections['default'].cursor() as cursor:
+        reset_sequences()
+
+
+class TestDatabaseSettings(TestCase):
+
+    def test_sqlite_is_default(self):
+
+        database = get_database_settings(environ={}, base_dir=Path("/app"))
+        self.assertEqual(database["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(database["NAME"], Path("/app/db.sqlite3"))
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+
+    def test_postgresql(self):
+
+        database = get_database_settings(
+            environ={
+                "DB_ENGINE": "postgresql",
+                "DB_NAME": "shop",
+                "DB_HOST": "db",
+                "DB_CONN_MAX_AGE": "none",
+                "DB_PGBOUNCER": "true",
+            },
+            base_dir=Path("/app"),
+        )
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(database["NAME"], "shop")
+        self.assertEqual(database["HOST"], "db")
+        self.assertEqual(database["PORT"], "5432")
+        self.assertIsNone(database["CONN_MAX_AGE"])
+        self.assertTrue(database["DISABLE_SERVER_SIDE_CURSORS"])
+
+    def test_wrong_engine(self):
+
+        with self.assertRaises(ImproperlyConfigured):
+            get_database_settings(environ={"DB_ENGINE": "oracle"}, base_dir=Path("/app"))
+
+    def test_replicas(self):
+
+        default = get_database_settings(environ={}, base_dir=Path("/app"))
+        replicas = get_replica_settings(environ={"DB_REPLICAS": "/data/1.sqlite3, /data/2.sqlite3"}, default=default)
+        self.assertEqual(list(replicas), ["replica_1", "replica_2"])
+        self.assertEqual(replicas["replica_2"]["NAME"], "/data/2.sqlite3")
+        self.assertEqual(default["NAME"], Path("/app/db.sqlite3"))
+
+        default = get_database_settings(environ={"DB_ENGINE": "postgresql"}, base_dir=Path("/app"))
+        replicas = get_replica_settings(environ={"DB_REPLICAS": "replica.db"}, default=default)
+        self.assertEqual(replicas["replica_1"]["HOST"], "replica.db")
+        self.assertEqual(replicas["replica_1"]["NAME"], "pet_shop")
+
+
+class TestSqlitePragmas(TestCase):
+
+    def test_disabled_by_default(self):
+
+        self.assertEqual(get_sqlite_pragmas(environ={}), {})
+
+    def test_enabled(self):
+
+        pragmas = get_sqlite_pragmas(environ={"DB_SQLITE_TUNING": "1", "DB_SQLITE_BUSY_TIMEOUT": "100"})
+        self.assertEqual(pragmas["journal_mode"], "WAL")
+        self.assertEqual(pragmas["synchronous"], "NORMAL")
+        self.assertEqual(pragmas["busy_timeout"], "100")
+
+    def test_applied_on_new_connection(self):
+
+        pragmas = get_sqlite_pragmas(environ={"DB_SQLITE_TUNING": "1"})
+        with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_PRAGMAS=pragmas):
+            handler = ConnectionHandler({
+                "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(directory, "db.sqlite3")},
+            })
+            try:
+                with handler["default"].cursor() as cursor:
+                    values = {}
+                    for pragma in ["journal_mode", "synchronous", "busy_timeout", "temp_store"]:
+                        cursor.execute(f"PRAGMA {pragma}")
+                        values[pragma] = cursor.fetchone()[0]
+            finally:
+                handler.close_all()
+        # synchronous NORMAL is 1 and temp_store MEMORY is 2
+        self.assertEqual(values, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000, "temp_store": 2})
+
+    def test_wrong_value(self):
+
+        with override_settings(SQLITE_PRAGMAS={"journal_mode": "WAL; DROP TABLE animal_animal"}):
+            handler = ConnectionHandler({"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}})
+            with self.assertRaises(ImproperlyConfigured):
+                handler["default"].ensure_connection()
+            handler.close_all()
+
+
+class TestTableVersions(BaseTestCase):
+
+    def test_bumped_after_commit(self):
+
+        version = get_table_versions(Category)[0]
+        with transaction.atomic():
+            Category.objects.create(name="test_category")
+            self.assertEqual(get_table_versions(Category)[0], version)
+
+        self.assertNotEqual(get_table_versions(Category)[0], version)
+
+    def test_not_bumped_after_rollback(self):
+
+        version = get_table_versions(Category)[0]
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Category.objects.create(name="test_category")
+            Category.objects.create(name="test_category")
+
+        self.assertEqual(get_table_versions(Category)[0], version)
+
+    def test_last_modified(self):
+
+        with patch("pet_shop.conditional.time.time", return_value=1000.9):
+            self.assertEqual(get_last_modified(changed_at=999.5), 999)
+            # The next change in the same second has to be newer than the Last-Modified
+            self.assertEqual(get_last_modified(changed_at=1000.2), 999)
+
+
+class TestWriteCoalescer(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.coalescer = WriteCoalescer(max_batch=64)
+
+    def tearDown(self):
+        self.coalescer.stop()
+        super().tearDown()
+
+    def submit_blocked(self, executor: ThreadPoolExecutor, names: list[str]) -> tuple[Future, list[Future]]:
+        """
+        The first write blocks the writer thread until the rest of the writes is queued
+        """
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_write():
+            started.set()
+            release.wait(timeout=5)
+            return Category.objects.create(name="first")
+
+        first = executor.submit(self.coalescer.submit, write=blocking_write)
+        started.wait(timeout=5)
+        futures = [
+            executor.submit(self.coalescer.submit, write=lambda name=name: Category.objects.create(name=name))
+            for name in names
+        ]
+        while self.coalescer._queue.qsize() < len(names):
+            time.sleep(0.001)
+        release.set()
+        return first, futures
+
+    def test_concurrent_writes_are_committed_together(self):
+
+        with ThreadPoolExecutor(max_workers=11) as executor:
+            first, futures = self.submit_blocked(executor=executor, names=[f"category_{i}" for i in range(10)])
+            first.result()
+            categories = [future.result() for future in futures]
+
+        self.assertEqual(self.coalescer.batches, 2)
+        self.assertEqual(Category.objects.count(), 11)
+        self.assertEqual({category.name for category in categories}, {f"category_{i}" for i in range(10)})
+
+    def test_failed_write_is_rolled_back_alone(self):
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first, futures = self.submit_blocked(executor=executor, names=["category", "category", "other"])
+            first.result()
+            results = [future.exception() for future in futures]
+
+        # The names of the categories are unique
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], IntegrityError)
+        self.assertIsNone(results[2])
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)), ["category", "first", "other"])
+
+    def test_write_endpoint(self):
+
+        with override_settings(WRITE_COALESCING=True), patch("pet_shop.coalescing.write_coalescer", self.coalescer):
+            response = client.post(
+                path=reverse("new_category"),
+                data=json.dumps({"name": "test_category"}),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.coalescer.batches, 1)
+        self.assertTrue(Category.objects.filter(name="test_category").exists())
+
+
+class TestReplicaRouter(BaseTestCase):
+    """
+    The default database is the primary one, the replica is the copy of it in another SQLite file
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        connections.settings["replica_1"] = dict(
+            connections.settings["default"], NAME=os.path.join(self.directory.name, "replica.sqlite3"))
+        self.patches = [
+            patch("pet_shop.routers.DATABASE_REPLICAS", ["replica_1"]),
+            # The tables changed in the tests are older than the lag of the replica
+            patch("pet_shop.conditional.REPLICA_MAX_LAG", 0),
+        ]
+        for replica_patch in self.patches:
+            replica_patch.start()
+
+    def tearDown(self):
+        for replica_patch in self.patches:
+            replica_patch.stop()
+        connections["replica_1"].close()
+        del connections["replica_1"]
+        del connections.settings["replica_1"]
+        self.directory.cleanup()
+        super().tearDown()
+
+    def replicate(self):
+        connections["replica_1"].close()
+        connections["default"].ensure_connection()
+        with sqlite3.connect(connections.settings["replica_1"]["NAME"]) as replica:
+            connections["default"].connection.backup(replica)
+        replica.close()
+
+    def get_category_names(self, replica_client: Client) -> list[str]:
+        response = replica_client.get(path=reverse("all_categories"))
+        self.assertEqual(response.status_code, 200)
+        return [category.get("name") for category in json.loads(response.content)]
+
+    def test_get_reads_from_replica(self):
+
+        Category.objects.create(name="replicated")
+        self.replicate()
+        Category.objects.create(name="not_replicated")
+
+        self.assertEqual(self.get_category_names(replica_client=Client()), ["replicated"])
+
+    def test_recently_changed_tables_are_read_from_primary(self):
+
+        Category.objects.create(name="replicated")
+        self.replicate()
+        Category.objects.create(name="not_replicated")
+
+        with patch("pet_shop.conditional.REPLICA_MAX_LAG", 5):
+            names = self.get_category_names(replica_client=Client())
+        self.assertEqual(names, ["replicated", "not_replicated"])
+
+    def test_client_reads_own_writes(self):
+
+        category = Category.objects.create(name="test_category")
+        mark = Mark.objects.create(name="test_mark")
+        Animal.objects.create(animal_id=1, name="replicated", status="set", category=category, mark=mark)
+        self.replicate()
+        writer = Client()
+
+        response = writer.post(
+            path=reverse("new_animal"),
+            data=json.dumps({
+                "name": "written",
+                "animal_id": 2,
+                "status": "set",
+                "category_id": category.id,
+                "mark_id": mark.id,
+            }),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        for replica_client, names in [(writer, ["replicated", "written"]), (Client(), ["replicated"])]:
+            response = replica_client.get(path=reverse("all_animals"))
+            self.assertEqual([animal.get("name") for animal in json.loads(response.content)], names)
+
+    def test_animal_detail_from_replica(self):
+
+        animal = Animal.objects.create(animal_id=1, name="old_name", status="set")
+        self.replicate()
+        Animal.objects.filter(id=animal.id).update(name="new_name")
+
+        response = Client().get(path=reverse("get_animal", kwargs={"_id": animal.id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content).get("name"), "old_name")
+
+    def test_writes_go_to_primary(self):
+
+        animal = Animal.objects.create(animal_id=1, name="old_name", status="set")
+        self.replicate()
+
+        with replica_reads(alias="replica_1"):
+            replica_animal = get_animal_by_id(_id=animal.id)
+            self.assertEqual(replica_animal._state.db, "replica_1")
+            replica_animal.name = "new_name"
+            replica_animal.save()
+            with transaction.atomic():
+                primary_animal = get_animal_by_id(_id=animal.id)
+
+        self.assertEqual(primary_animal._state.db, "default")
+        self.assertEqual(primary_animal.name, "new_name")
+        self.assertEqual(Animal.objects.using("replica_1").get(id=animal.id).name, "old_name")
+
+
+class TestAsyncMiddleware(TestCase):
+
+    def test_custom_middleware(self):
+
+        async def get_response(request):
+            return HttpResponse(request.current_url)
+
+        middleware = CustomMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = async_to_sync(middleware)(RequestFactory().get("/api/v1/animal/all/"))
+        self.assertEqual(response.content, b"animal/all/")
+
+    def test_replica_routing_middleware(self):
+
+        async def get_response(request):
+            return HttpResponse(str(_read_replica.get()))
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        with patch("pet_shop.routers.DATABASE_REPLICAS", ["replica_1"]):
+            response = async_to_sync(middleware)(RequestFactory().get("/api/v1/animal/all/"))
+            self.assertEqual(response.content, b"replica_1")
 
-            for table in tables:
-                query = "UPDATE SQLITE_SEQUENCE SET " + f"SEQ=0 WHERE NAME='{table}';"
-                cursor.execute(query)
+            response = async_to_sync(middleware)(RequestFactory().post("/api/v1/animal/new/"))
+            self.assertEqual(response.content, b"None")
+            self.assertIn(PRIMARY_COOKIE, response.cookies)
@@ -1,12 +1,15 @@
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from drf_spectacular.views import (
     SpectacularSwaggerView,
     SpectacularRedocView,
     SpectacularAPIView,
 )
 
+from image.media import (
+    aserve_media,
+    serve_media,
+)
 from pet_shop import settings
 from pet_shop.settings import BASE_URL
 
@@ -23,8 +26,6 @@ urlpatterns = [
     path('api/schema', SpectacularAPIView.as_view(), name='schema'),
     path('api/doc', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
-
-#if settings.DEBUG:
-#    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', aserve_media if settings.ASYNC_MEDIA else serve_media,
+            name='media'),
+]
@@ -0,0 +1,5 @@
+from django.contrib import admin
+
+from sync.models import Tombstone
+
+admin.site.register(Tombstone)
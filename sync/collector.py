@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from pet_shop.settings import (
+    SYNC_TOMBSTONE_BATCH_SIZE,
+    SYNC_TOMBSTONE_RETENTION,
+)
+from sync.models import Tombstone
+
+
+def collect_expired_tombstones(
+        retention: int = SYNC_TOMBSTONE_RETENTION,
+        batch_size: int = SYNC_TOMBSTONE_BATCH_SIZE,
+        pause: float = 0,
+        dry_run: bool = False,
+) -> int:
+    """
+    Delete the tombstones older than the retention, every batch is deleted by one short statement.
+    The clients which didn't sync for longer than the retention have to sync all records again.
+    :return: int - the number of the expired tombstones
+    """
+    expired = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(seconds=retention))
+    if dry_run:
+        return expired.count()
+    removed = 0
+    while ids := list(expired.order_by("id").values_list("id", flat=True)[:batch_size]):
+        removed += Tombstone.objects.filter(id__in=ids).delete()[0]
+        time.sleep(pause)
+    return removed
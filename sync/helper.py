@@ -0,0 +1,59 @@
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+
+from django.utils import timezone as django_timezone
+from django.utils.dateparse import parse_datetime
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+
+from pet_shop.settings import (
+    SYNC_SAFETY_MARGIN,
+    SYNC_TOMBSTONE_RETENTION,
+)
+
+MODIFIED_SINCE_PARAMETER = OpenApiParameter(
+    name="modified_since",
+    type=OpenApiTypes.DATETIME,
+    location=OpenApiParameter.QUERY,
+    required=True,
+    description="ISO 8601 datetime, usually synced_at of the previous sync, e.g. 2024-01-01T10:00:00Z",
+)
+
+
+def parse_modified_since(value: str | None) -> datetime | None:
+    """
+    Parse ISO 8601 datetime from the query parameter, the datetime without timezone is in UTC
+    :return: datetime | None
+    """
+    if not value:
+        return None
+    try:
+        # The not encoded "+" of the timezone offset comes as a space
+        modified_since = parse_datetime(value.replace(" ", "+"))
+    except ValueError:
+        return None
+    if modified_since and django_timezone.is_naive(modified_since):
+        modified_since = django_timezone.make_aware(modified_since, timezone.utc)
+    return modified_since
+
+
+def get_synced_at() -> datetime:
+    """
+    The modified_since of the next sync, it is earlier than now by SYNC_SAFETY_MARGIN. The row can be committed
+    later than its modified_at is set, so the rows of the margin are returned by the next sync again
+    and the client has to update them by ID.
+    :return: datetime
+    """
+    return django_timezone.now() - timedelta(seconds=SYNC_SAFETY_MARGIN)
+
+
+def is_full_sync_required(modified_since: datetime) -> bool:
+    """
+    The tombstones older than SYNC_TOMBSTONE_RETENTION are deleted, so the deletions since older modified_since
+    can't be returned and the client has to retrieve all records again
+    :return: bool
+    """
+    return modified_since < django_timezone.now() - timedelta(seconds=SYNC_TOMBSTONE_RETENTION)
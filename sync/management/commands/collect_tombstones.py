@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pet_shop.settings import SYNC_TOMBSTONE_BATCH_SIZE
+from sync.collector import collect_expired_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tombstones of the incremental sync older than SYNC_TOMBSTONE_RETENTION, the sync with "
+        "older modified_since returns 410. With --interval it runs periodically, e.g. as a separate process "
+        "next to the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report the expired tombstones")
+        parser.add_argument("--batch-size", type=int, default=SYNC_TOMBSTONE_BATCH_SIZE, help="The rows per query")
+        parser.add_argument("--pause", type=float, default=0, help="The pause between the batches (s)")
+        parser.add_argument("--interval", type=int, default=0, help="Repeat the collection every interval (s)")
+
+    def handle(self, *args, **options):
+        while True:
+            tombstones = collect_expired_tombstones(
+                batch_size=options["batch_size"],
+                pause=options["pause"],
+                dry_run=options["dry_run"],
+            )
+            prefix = "Found" if options["dry_run"] else "Collected"
+            self.stdout.write(f"{prefix}: {tombstones} expired tombstones")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('table', models.CharField(max_length=64)),
+                ('record_id', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['table', 'deleted_at'], name='sync_tombst_table_b7a2ef_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """
+    The record of deleted row, the incremental sync returns the IDs of the rows deleted since the last sync
+    """
+
+    deleted_at = models.DateTimeField(default=timezone.now, editable=False)
+    table = models.CharField(max_length=64)
+    record_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["table", "deleted_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.table} - {self.record_id}"
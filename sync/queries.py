@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from django.db.models import Model
+
+from sync.models import Tombstone
+
+
+def create_tombstone(_model: type[Model], _id: int) -> Tombstone:
+    return Tombstone.objects.create(table=_model._meta.db_table, record_id=_id)
+
+
+def get_deleted_ids_since(_model: type[Model], _deleted_since: datetime) -> list[int]:
+    return list(
+        Tombstone.objects.filter(
+            table=_model._meta.db_table,
+            deleted_at__gte=_deleted_since,
+        ).order_by("deleted_at").values_list("record_id", flat=True)
+    )
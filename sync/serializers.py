@@ -0,0 +1,13 @@
+from rest_framework import serializers
+from rest_framework.fields import (
+    DateTimeField,
+    ListField,
+)
+
+
+class ChangesSerializer(serializers.Serializer):
+
+    synced_at: DateTimeField = serializers.DateTimeField(
+        help_text="The time of the sync minus the safety margin, it should be used as modified_since of the next sync")
+    deleted: ListField = serializers.ListField(
+        child=serializers.IntegerField(), help_text="IDs of the records deleted since modified_since")
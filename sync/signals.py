@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from animal.models import Animal
+from category.models import Category
+from mark.models import Mark
+from sync.queries import create_tombstone
+
+
+@receiver(post_delete, sender=Animal)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Mark)
+def create_deleted_record_tombstone(sender, instance, **kwargs):
+    create_tombstone(_model=sender, _id=instance.id)
@@ -0,0 +1,49 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from animal.models import Animal
+from pet_shop.settings import SYNC_TOMBSTONE_RETENTION
+from pet_shop.tests import BaseTestCase
+from sync.helper import is_full_sync_required
+from sync.models import Tombstone
+
+
+class TestCollectTombstones(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        expired = Tombstone(table=Animal._meta.db_table, record_id=1)
+        expired.save()
+        Tombstone.objects.filter(id=expired.id).update(
+            deleted_at=timezone.now() - timedelta(seconds=SYNC_TOMBSTONE_RETENTION + 1))
+        tombstone = Tombstone(table=Animal._meta.db_table, record_id=2)
+        tombstone.save()
+
+    def test_collect_expired_tombstones(self):
+
+        out = io.StringIO()
+        call_command("collect_tombstones", stdout=out)
+
+        self.assertIn("Collected: 1 expired tombstones", out.getvalue())
+        self.assertEqual(list(Tombstone.objects.values_list("record_id", flat=True)), [2])
+
+    def test_collect_expired_tombstones_dry_run(self):
+
+        out = io.StringIO()
+        call_command("collect_tombstones", "--dry-run", stdout=out)
+
+        self.assertIn("Found: 1 expired tombstones", out.getvalue())
+        self.assertEqual(Tombstone.objects.count(), 2)
+
+
+class TestFullSyncRequired(BaseTestCase):
+
+    def test_is_full_sync_required(self):
+
+        now = timezone.now()
+
+        self.assertFalse(is_full_sync_required(modified_since=now - timedelta(days=1)))
+        self.assertTrue(is_full_sync_required(modified_since=now - timedelta(seconds=SYNC_TOMBSTONE_RETENTION + 1)))